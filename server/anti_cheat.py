@@ -16,6 +16,8 @@ import numpy as np
 from sklearn.ensemble import IsolationForest
 from collections import defaultdict, deque
 
+from heavy_hitters import HeavyHitters
+
 logger = logging.getLogger(__name__)
 
 class AntiCheatSystem:
@@ -37,7 +39,6 @@ class AntiCheatSystem:
         # Player tracking
         self.player_profiles: Dict[int, PlayerProfile] = {}
         self.suspicious_activities: Dict[int, List[Dict]] = defaultdict(list)
-        self.rate_limits: Dict[str, deque] = defaultdict(lambda: deque(maxlen=100))
         
         # Machine learning models
         self.isolation_forest = IsolationForest(
@@ -337,33 +338,6 @@ class AntiCheatSystem:
         
         return hashlib.sha256(data_str.encode()).hexdigest()[:16]
     
-    def check_rate_limit(self, player_id: int, action: str) -> bool:
-        """Check if player is rate limited"""
-        key = f"{player_id}_{action}"
-        now = time.time()
-        
-        # Clean old entries
-        while (self.rate_limits[key] and 
-               now - self.rate_limits[key][0] > self.thresholds['rate_limit_window']):
-            self.rate_limits[key].popleft()
-        
-        # Check limit
-        if len(self.rate_limits[key]) >= self.thresholds['rate_limit_max']:
-            self.log_suspicious_activity(
-                player_id=player_id,
-                activity_type='rate_limit_exceeded',
-                details={
-                    'action': action,
-                    'count': len(self.rate_limits[key]),
-                    'window': self.thresholds['rate_limit_window']
-                }
-            )
-            return False
-        
-        # Add current action
-        self.rate_limits[key].append(now)
-        return True
-    
     def get_player_suspicion_score(self, player_id: int) -> float:
         """Get player's suspicion score"""
         if player_id not in self.player_profiles:
@@ -376,7 +350,7 @@ class AntiCheatSystem:
 # ==================== DETECTION MODULES ====================
 
 
-    class DetectionModule:
+class DetectionModule:
     """Base class for detection modules"""
     
     async def analyze(self, **kwargs) -> Dict:
@@ -687,9 +661,14 @@ class BehavioralAnalyzer(DetectionModule):
 class NetworkAnalyzer(DetectionModule):
     """Analyze network patterns for cheating"""
     
+    FLOOD_THRESHOLD = 200  # Decayed submissions from one IP (hour half-life)
+    
     def __init__(self):
         self.ip_blacklist = self.load_ip_blacklist()
         self.geo_patterns = {}
+        
+        # Submissions per IP in fixed memory, whatever the number of IPs
+        self.submitters = HeavyHitters(k=50, width=2048, half_life=3600)
     
     def load_ip_blacklist(self) -> set:
         """Load IP blacklist"""
@@ -711,6 +690,19 @@ class NetworkAnalyzer(DetectionModule):
                 }
             }
         
+        # Check for submission floods (many accounts or scripts behind one IP)
+        submissions = self.submitters.add(ip_address or '')
+        if submissions >= self.FLOOD_THRESHOLD:
+            return {
+                'suspicious': True,
+                'score': 30,
+                'reason': 'ip_submission_flood',
+                'details': {
+                    'ip_address': ip_address,
+                    'recent_submissions': submissions
+                }
+            }
+        
         # Check for VPN/Tor exit nodes
         if self.is_suspicious_ip(ip_address):
             return {
@@ -907,4 +899,3 @@ if __name__ == "__main__":
             print(f"Penalty applied: {penalty}")
     
     asyncio.run(test())
-```
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# chimera-vx/server/archive_store.py
+# Cold storage for old submissions and cheat logs
+#
+# Rows older than the archive age are moved out of the event database into a
+# separate, append-only SQLite file. Each archival batch is stored as one
+# compressed segment per player, so a player's history reads back with one
+# indexed range scan and a few decompressions.
+
+import json
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List
+import logging
+
+from connection_pool import ConnectionPool
+from blob_store import DEFAULT_CODEC, compress, decompress
+
+logger = logging.getLogger(__name__)
+
+# Archived tables and the timestamp column that ages them
+ARCHIVED_TABLES = {
+    'submissions': 'submitted_at',
+    'cheat_logs': 'detected_at'
+}
+
+class ArchiveStore:
+    """Append-only, compressed per-player segments of archived rows"""
+
+    def __init__(self, archive_path: str, readers: int = 2, level: int = 6):
+        self.archive_path = archive_path
+        self.codec = DEFAULT_CODEC
+        self.level = level
+        self.pool = ConnectionPool(archive_path, readers=readers)
+        self.init_archive()
+
+    def init_archive(self):
+        """Initialize archive schema"""
+        with self.pool.write() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS segments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT NOT NULL,
+                    player_id INTEGER NOT NULL,
+                    first_at INTEGER NOT NULL,
+                    last_at INTEGER NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    codec TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    archived_at INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_segments_player
+                ON segments(source, player_id, last_at)
+            ''')
+
+    def close(self):
+        self.pool.close()
+
+    def append(self, source: str, rows: List[Dict]) -> int:
+        """Store rows as one compressed segment per player; returns segments written"""
+        time_column = ARCHIVED_TABLES[source]
+        by_player = defaultdict(list)
+        for row in rows:
+            by_player[row['player_id']].append(row)
+
+        now = int(time.time())
+        segments = []
+        for player_id, player_rows in by_player.items():
+            times = [row[time_column] for row in player_rows]
+            data = compress(json.dumps(player_rows).encode(), self.codec, self.level)
+            segments.append((source, player_id, min(times), max(times),
+                             len(player_rows), self.codec, data, now))
+
+        with self.pool.write() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('''
+                INSERT INTO segments (source, player_id, first_at, last_at, row_count,
+                                      codec, data, archived_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', segments)
+        return len(segments)
+
+    def fetch(self, source: str, player_id: int, limit: int,
+              exclude_ids: Iterable[int] = ()) -> List[Dict]:
+        """Get a player's newest archived rows, newest first"""
+        time_column = ARCHIVED_TABLES[source]
+        seen = set(exclude_ids)
+        rows: List[Dict] = []
+
+        with self.pool.read() as conn:
+            cursor = conn.execute('''
+                SELECT last_at, codec, data FROM segments
+                WHERE source = ? AND player_id = ?
+                ORDER BY last_at DESC
+            ''', (source, player_id))
+
+            for segment in cursor:
+                # Every remaining segment is older than the rows already kept
+                if len(rows) >= limit and segment['last_at'] < rows[limit - 1][time_column]:
+                    break
+                for row in json.loads(decompress(segment['codec'], segment['data'])):
+                    # A batch interrupted between archive and delete is archived twice
+                    if row['id'] not in seen:
+                        seen.add(row['id'])
+                        rows.append(row)
+                rows.sort(key=lambda row: row[time_column], reverse=True)
+
+        return rows[:limit]
+
+    def delete_player(self, player_id: int) -> int:
+        """Drop all archived rows for a player; returns segments removed"""
+        with self.pool.write() as conn:
+            # One indexed range per source (the index leads with source)
+            return sum(conn.execute(
+                'DELETE FROM segments WHERE source = ? AND player_id = ?', (source, player_id)
+            ).rowcount for source in ARCHIVED_TABLES)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Segments, rows and compressed bytes per source table"""
+        with self.pool.read() as conn:
+            rows = conn.execute('''
+                SELECT source, COUNT(*) AS segments, SUM(row_count) AS rows,
+                       SUM(LENGTH(data)) AS bytes
+                FROM segments GROUP BY source
+            ''').fetchall()
+        return {row['source']: {'segments': row['segments'], 'rows': row['rows'],
+                                'bytes': row['bytes']} for row in rows}
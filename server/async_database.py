@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# chimera-vx/server/async_database.py
+# Non-blocking database access for the aiohttp event loop
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import logging
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# Database methods that never write and may run concurrently
+READ_METHODS = {
+    'get_player',
+    'get_player_by_username',
+    'get_player_by_hardware',
+    'get_player_by_session',
+    'get_player_by_token',
+    'get_session',
+    'get_player_sessions',
+    'get_player_rank',
+    'count_ranked_ahead',
+    'get_current_puzzle',
+    'get_puzzle',
+    'load_puzzle_data',
+    'get_solved_puzzles',
+    'get_last_challenge_request',
+    'get_submissions',
+    'get_hardware_profile',
+    'get_cheat_logs',
+    'get_leaderboard',
+    'get_total_players',
+    'get_statistic',
+    'get_statistics',
+    'get_revocations',
+    'get_database_size'
+}
+
+# Methods that only touch in-memory state and are cheap enough to call inline
+INLINE_METHODS = {
+    'update_player_last_active',
+    'count_statistic'
+}
+
+# Long-running methods that commit in chunks: they run on their own thread so
+# they take the writer lock per chunk instead of holding up the write queue
+MAINTENANCE_METHODS = {
+    'reset_player',
+    'purge_players',
+    'archive_old_rows',
+    'externalize_puzzle_blobs',
+    'expire_sessions'
+}
+
+class AsyncDatabase:
+    """Awaitable facade over Database backed by dedicated DB threads"""
+
+    def __init__(self, db: Database, reader_threads: int = 4):
+        self.db = db
+
+        # Writes queue up in FIFO order on one thread per writer connection:
+        # SQLite has one writer per file and a ShardedDatabase one per shard,
+        # so each shard commits in submission order and shards commit in
+        # parallel. Reads fan out over a small pool
+        self.write_executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'chimera-db-write-{index}')
+            for index in range(len(getattr(db, 'shards', [db])))
+        ]
+        self.read_executor = ThreadPoolExecutor(
+            max_workers=max(reader_threads, 1), thread_name_prefix='chimera-db-read'
+        )
+
+        self.maintenance_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='chimera-db-maintenance'
+        )
+
+        logger.info(f"AsyncDatabase ready with {reader_threads} reader threads, "
+                    f"{len(self.write_executors)} writer threads")
+
+    def write_executor(self, name: str, args: tuple, kwargs: Dict) -> ThreadPoolExecutor:
+        """Write queue of the shard a call commits to"""
+        if len(self.write_executors) == 1:
+            return self.write_executors[0]
+        return self.write_executors[self.db.write_shard(name, args, kwargs)]
+
+    async def run(self, func: Callable, *args, readonly: bool = False, **kwargs) -> Any:
+        """Run a blocking callable on a database thread (writes on shard 0's queue)"""
+        executor = self.read_executor if readonly else self.write_executors[0]
+        return await self.run_on(executor, func, *args, **kwargs)
+
+    async def run_on(self, executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the given executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+
+        readonly = name in READ_METHODS
+        inline = name in INLINE_METHODS
+        maintenance = name in MAINTENANCE_METHODS
+
+        async def call(*args, **kwargs):
+            if inline:
+                return attr(*args, **kwargs)
+            if maintenance:
+                return await self.run_on(self.maintenance_executor, attr, *args, **kwargs)
+            if readonly:
+                return await self.run_on(self.read_executor, attr, *args, **kwargs)
+            return await self.run_on(self.write_executor(name, args, kwargs), attr, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = attr.__doc__
+        setattr(self, name, call)
+        return call
+
+    async def close(self):
+        """Drain queued work and close the underlying database"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.maintenance_executor.shutdown, True)
+        await loop.run_in_executor(None, self.read_executor.shutdown, True)
+        # Closing flushes write-behind buffers, so it runs behind queued writes
+        for executor in self.write_executors[1:]:
+            await loop.run_in_executor(None, executor.shutdown, True)
+        await self.run(self.db.close)
+        await loop.run_in_executor(None, self.write_executors[0].shutdown, True)
+        logger.info("AsyncDatabase closed")
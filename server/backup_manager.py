@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# chimera-vx/server/backup_manager.py
+# Online, compressed, verified database backups with rotation
+
+import gzip
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+BACKUP_PREFIX = "chimera_backup_"
+BACKUP_SUFFIX = ".db.gz"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# Grandfather-father-son retention: newest backup per bucket, N buckets each
+DEFAULT_RETENTION = {
+    'hourly': 24,
+    'daily': 7,
+    'weekly': 4
+}
+
+RETENTION_BUCKETS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 604800
+}
+
+class BackupManager:
+    """Create, compress, verify and rotate online database backups"""
+
+    def __init__(self, db: Database, backup_dir: str = "backups",
+                 retention: Optional[Dict[str, int]] = None,
+                 pages_per_step: int = 1024, step_pause: float = 0.005,
+                 verify: bool = True):
+        self.db = db
+        self.backup_dir = Path(backup_dir)
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.retention = dict(DEFAULT_RETENTION)
+        if retention:
+            self.retention.update(retention)
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+        self.verify_backups = verify
+
+    def run(self) -> Dict:
+        """Back up, verify and prune; blocking, so call from a worker thread"""
+        start = time.time()
+        path, row_counts = self.create_backup()
+
+        verified = None
+        if self.verify_backups:
+            verified = self.verify(path, row_counts)
+            if not verified:
+                failed = path.with_name(path.name + '.failed')
+                path.rename(failed)
+                logger.error(f"Backup verification failed, kept as {failed}")
+                return {'path': str(failed), 'verified': False}
+
+        removed = self.prune()
+
+        result = {
+            'path': str(path),
+            'size': path.stat().st_size,
+            'verified': verified,
+            'pruned': len(removed),
+            'duration': time.time() - start
+        }
+        logger.info(f"Backup complete: {result}")
+        return result
+
+    def create_backup(self) -> Tuple[Path, Dict[str, int]]:
+        """Copy a consistent snapshot and gzip it; returns path and row counts"""
+        name = f"{BACKUP_PREFIX}{datetime.now().strftime(TIMESTAMP_FORMAT)}{BACKUP_SUFFIX}"
+        path = self.backup_dir / name
+
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as tmp:
+            raw_path = Path(tmp) / "snapshot.db"
+            row_counts = self.db.backup(
+                str(raw_path),
+                pages_per_step=self.pages_per_step,
+                step_pause=self.step_pause
+            )
+
+            partial = path.with_name(path.name + '.partial')
+            with open(raw_path, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, length=1024 * 1024)
+            partial.rename(path)
+
+        return path, row_counts
+
+    def verify(self, path: Path, row_counts: Optional[Dict[str, int]] = None) -> bool:
+        """Restore a backup to a scratch file and check integrity and row counts"""
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as tmp:
+            restored = Path(tmp) / "restore.db"
+            self.restore(path, restored)
+
+            conn = sqlite3.connect(str(restored))
+            try:
+                result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+                if result != 'ok':
+                    logger.error(f"Integrity check failed for {path.name}: {result}")
+                    return False
+
+                for table, expected in (row_counts or {}).items():
+                    actual = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                    if actual != expected:
+                        logger.error(f"Row count mismatch in {path.name}.{table}: "
+                                     f"{actual} != {expected}")
+                        return False
+            finally:
+                conn.close()
+
+        return True
+
+    def restore(self, path: Path, target_path: Path):
+        """Decompress a backup into target_path"""
+        with gzip.open(path, 'rb') as src, open(target_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, length=1024 * 1024)
+
+    def list_backups(self) -> List[Tuple[datetime, Path]]:
+        """Get (timestamp, path) for every complete backup, newest first"""
+        backups = []
+        for path in self.backup_dir.glob(f"{BACKUP_PREFIX}*{BACKUP_SUFFIX}"):
+            stamp = path.name[len(BACKUP_PREFIX):-len(BACKUP_SUFFIX)]
+            try:
+                backups.append((datetime.strptime(stamp, TIMESTAMP_FORMAT), path))
+            except ValueError:
+                continue
+        return sorted(backups, reverse=True)
+
+    def prune(self) -> List[Path]:
+        """Delete backups not kept by any retention tier"""
+        backups = self.list_backups()
+        keep = set()
+
+        for tier, count in self.retention.items():
+            seen = set()
+            for stamp, path in backups:
+                bucket = int(stamp.timestamp()) // RETENTION_BUCKETS[tier]
+                if bucket in seen:
+                    continue
+                if len(seen) >= count:
+                    break
+                seen.add(bucket)
+                keep.add(path)
+
+        # Never delete the newest backup
+        if backups:
+            keep.add(backups[0][1])
+
+        removed = []
+        for _, path in backups:
+            if path not in keep:
+                path.unlink()
+                removed.append(path)
+
+        if removed:
+            logger.info(f"Pruned {len(removed)} old backups")
+        return removed
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# chimera-vx/server/blob_store.py
+# Content-addressed, compressed storage for puzzle files
+#
+# Puzzle rows keep a manifest in puzzle_data: every file body larger than
+# BLOB_MIN_SIZE is replaced by {"$blob": <sha256>, "size": <bytes>} and the
+# body lives once in the blobs table, however many puzzles share it.
+
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BLOB_KEY = '$blob'
+BLOB_MIN_SIZE = 512  # Smaller files stay inline in the manifest
+
+DEFAULT_CODEC = 'zstd' if zstandard else 'zlib'
+
+def compress(raw: bytes, codec: str = DEFAULT_CODEC, level: int = 3) -> bytes:
+    """Compress raw bytes with codec"""
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(raw)
+    if codec == 'zlib':
+        return zlib.compress(raw, max(level, 6))
+    raise ValueError(f"Unknown codec: {codec}")
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """Decompress data written by compress() with codec"""
+    if codec == 'zstd':
+        if not zstandard:
+            raise RuntimeError("Data stored with zstd but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'raw':
+        return data
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+class BlobStore:
+    """Deduplicated, compressed blob table with a small decompressed-body cache"""
+
+    def __init__(self, cache_size: int = 256, level: int = 3):
+        self.codec = DEFAULT_CODEC
+        self.level = level
+        self.cache: OrderedDict = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    # ==================== MANIFESTS ====================
+
+    def externalize(self, conn: sqlite3.Connection, puzzle_data: Dict) -> Tuple[Dict, List[str]]:
+        """Move large file bodies into blobs; returns the manifest and hashes used"""
+        files = puzzle_data.get('files')
+        if not isinstance(files, dict):
+            return puzzle_data, []
+
+        manifest_files = {}
+        hashes = []
+        for name, content in files.items():
+            if isinstance(content, str) and len(content) >= BLOB_MIN_SIZE:
+                raw = content.encode()
+                digest = self.put(conn, raw)
+                manifest_files[name] = {BLOB_KEY: digest, 'size': len(raw)}
+                hashes.append(digest)
+            else:
+                manifest_files[name] = content
+
+        return {**puzzle_data, 'files': manifest_files}, hashes
+
+    def hydrate(self, conn: sqlite3.Connection, manifest: Dict,
+                names: Optional[Iterable[str]] = None) -> Dict:
+        """Replace blob references with file bodies (all files, or only names)"""
+        files = manifest.get('files')
+        if not isinstance(files, dict):
+            return manifest
+
+        wanted = set(names) if names is not None else set(files)
+        refs = {
+            name: ref[BLOB_KEY] for name, ref in files.items()
+            if name in wanted and isinstance(ref, dict) and BLOB_KEY in ref
+        }
+        bodies = self.get_many(conn, refs.values())
+
+        hydrated = dict(files)
+        for name, digest in refs.items():
+            hydrated[name] = bodies[digest]
+        return {**manifest, 'files': hydrated}
+
+    # ==================== STORAGE ====================
+
+    def put(self, conn: sqlite3.Connection, raw: bytes) -> str:
+        """Store a body if it is new; returns its sha256"""
+        digest = hashlib.sha256(raw).hexdigest()
+        exists = conn.execute('SELECT 1 FROM blobs WHERE hash = ?', (digest,)).fetchone()
+        if not exists:
+            conn.execute('''
+                INSERT OR IGNORE INTO blobs (hash, codec, size, data)
+                VALUES (?, ?, ?, ?)
+            ''', (digest, self.codec, len(raw), compress(raw, self.codec, self.level)))
+        return digest
+
+    def get_many(self, conn: sqlite3.Connection, hashes: Iterable[str]) -> Dict[str, str]:
+        """Load bodies by hash, serving repeats from the cache"""
+        result = {}
+        missing = []
+        with self.lock:
+            for digest in set(hashes):
+                if digest in self.cache:
+                    self.cache.move_to_end(digest)
+                    result[digest] = self.cache[digest]
+                else:
+                    missing.append(digest)
+
+        if missing:
+            rows = conn.execute(
+                f'SELECT hash, codec, data FROM blobs WHERE hash IN ({",".join("?" * len(missing))})',
+                missing
+            ).fetchall()
+            loaded = {row[0]: decompress(row[1], row[2]).decode() for row in rows}
+
+            absent = set(missing) - set(loaded)
+            if absent:
+                raise KeyError(f"Missing puzzle blobs: {sorted(absent)}")
+
+            with self.lock:
+                for digest, body in loaded.items():
+                    self.cache[digest] = body
+                    self.cache.move_to_end(digest)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            result.update(loaded)
+
+        return result
+
+
+def parse_manifest(puzzle_data) -> Dict:
+    """Accept puzzle_data as stored JSON text or an already-parsed dict"""
+    return json.loads(puzzle_data) if isinstance(puzzle_data, str) else puzzle_data
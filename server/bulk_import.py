@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# chimera-vx/server/bulk_import.py
+# Bulk player (and first puzzle) loading for event preparation
+#
+# Usage:
+#   python bulk_import.py players.ndjson --db data/chimera.db
+#   python bulk_import.py players.csv --first-puzzles --config config/server_config.json
+#   python bulk_import.py players.ndjson --shards 4
+#
+# Input rows need username, email and hardware_fingerprint (CSV header or
+# NDJSON keys). Rows are inserted with executemany, batch_size rows per
+# transaction; with deferred indexes the secondary indexes of the loaded
+# tables are dropped first and rebuilt once at the end, so only run that
+# before the event opens. With --shards each shard is loaded in turn with the
+# rows whose usernames hash to it.
+
+import argparse
+import asyncio
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import logging
+
+from database import Database
+from sharded_database import ShardedDatabase
+from sharding import bucket_for_id, bucket_for_key, next_bucket_id
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('username', 'email', 'hardware_fingerprint')
+
+# Tables written by the importer, whose secondary indexes may be deferred
+LOADED_TABLES = ('players', 'hardware_profiles', 'puzzles', 'puzzle_blobs')
+
+# Called with a batch of players (with ids); returns one generated puzzle
+# ({'puzzle', 'solution_hash', 'type'}) per player, as PackageGenerator does
+PuzzleFactory = Callable[[List[Dict]], List[Dict]]
+
+def read_players(path: str, fmt: Optional[str] = None) -> Iterator[Dict]:
+    """Stream player rows from an NDJSON or CSV file"""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    with open(path, newline='') as f:
+        if fmt == 'csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for line_number, row in enumerate(rows, 1):
+            missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+            if missing:
+                raise ValueError(f"{path}: row {line_number} is missing {', '.join(missing)}")
+            yield row
+
+def batched(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """Group rows into lists of at most size"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BulkImporter:
+    """Load many players in large transactions"""
+
+    def __init__(self, db: Database, batch_size: int = 10000,
+                 defer_indexes: bool = False, hardware_profiles: bool = True,
+                 on_conflict: str = 'abort'):
+        if on_conflict not in ('abort', 'skip'):
+            raise ValueError(f"on_conflict must be 'abort' or 'skip', not {on_conflict!r}")
+        self.db = db
+        self.batch_size = batch_size
+        self.defer_indexes = defer_indexes
+        self.hardware_profiles = hardware_profiles
+        self.on_conflict = on_conflict
+
+    def import_players(self, rows: Iterable[Dict],
+                       puzzle_factory: Optional[PuzzleFactory] = None) -> Dict:
+        """Insert players (and optionally profiles and first puzzles); returns a report"""
+        counts = {'players': 0, 'skipped': 0, 'hardware_profiles': 0, 'puzzles': 0}
+        start = time.perf_counter()
+
+        deferred = self.drop_indexes() if self.defer_indexes else []
+        try:
+            for batch in batched(rows, self.batch_size):
+                self.import_batch(batch, puzzle_factory, counts)
+                logger.info(f"Imported {counts['players']} players "
+                            f"({counts['players'] / (time.perf_counter() - start):.0f} rows/s)")
+        finally:
+            index_start = time.perf_counter()
+            self.create_indexes(deferred)
+            index_seconds = time.perf_counter() - index_start
+
+        seconds = time.perf_counter() - start
+        written = counts['players'] + counts['hardware_profiles'] + counts['puzzles']
+        return {
+            **counts,
+            'seconds': seconds,
+            'index_seconds': index_seconds,
+            'players_per_second': counts['players'] / seconds if seconds else 0.0,
+            'rows_per_second': written / seconds if seconds else 0.0
+        }
+
+    def import_batch(self, batch: List[Dict], puzzle_factory: Optional[PuzzleFactory],
+                     counts: Dict[str, int]):
+        """Insert one batch in a single transaction"""
+        now = int(time.time())
+        verb = 'INSERT OR IGNORE' if self.on_conflict == 'skip' else 'INSERT'
+
+        with self.db.transaction(), self.db.get_connection() as conn:
+            # Explicit ids (we hold the writer) let child rows skip id lookups
+            if self.db.sharded:
+                players, last_id = [], None
+                for row in batch:
+                    last_id = next_bucket_id(conn, 'players', bucket_for_key(row['username']), last_id)
+                    players.append({**row, 'id': last_id})
+            else:
+                first_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM players').fetchone()[0]
+                players = [{**row, 'id': first_id + i} for i, row in enumerate(batch)]
+
+            conn.executemany(f'''
+                {verb} INTO players (id, username, email, hardware_fingerprint,
+                                     created_at, last_active)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(p['id'], p['username'], p['email'], p['hardware_fingerprint'], now, now)
+                  for p in players])
+
+            if self.on_conflict == 'skip':
+                # Ignored rows leave gaps in the id range
+                inserted = {row[0] for row in conn.execute(
+                    'SELECT id FROM players WHERE id BETWEEN ? AND ?',
+                    (players[0]['id'], players[-1]['id'])
+                )}
+                counts['skipped'] += len(players) - len(inserted)
+                players = [p for p in players if p['id'] in inserted]
+            counts['players'] += len(players)
+
+            if self.hardware_profiles:
+                conn.executemany('''
+                    INSERT INTO hardware_profiles (player_id, profile_data, created_at, last_verified)
+                    VALUES (?, ?, ?, ?)
+                ''', [(p['id'], json.dumps({'fingerprint': p['hardware_fingerprint']}), now, now)
+                      for p in players])
+                counts['hardware_profiles'] += len(players)
+
+            if puzzle_factory and players:
+                counts['puzzles'] += self.insert_first_puzzles(conn, players,
+                                                               puzzle_factory(players), now)
+
+            if self.db.ranks:
+                for p in players:
+                    self.db.after_commit(self.db.ranks.update, p['id'], 0, 0)
+
+    def insert_first_puzzles(self, conn, players: List[Dict], puzzles: List[Dict],
+                             now: int) -> int:
+        """Store generated circle 1 puzzles, with file bodies in the blob store"""
+        rows, links = [], []
+        for player, generated in zip(players, puzzles):
+            manifest, hashes = self.db.blobs.externalize(conn, generated['puzzle'])
+            rows.append((player['id'], 1, generated['type'], json.dumps(manifest),
+                         generated['solution_hash'], now))
+            links.append(hashes)
+
+        if self.db.sharded:
+            # Puzzles share their player's bucket
+            ids, last_id = [], None
+            for player in players:
+                last_id = next_bucket_id(conn, 'puzzles', bucket_for_id(player['id']), last_id)
+                ids.append(last_id)
+        else:
+            first_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM puzzles').fetchone()[0]
+            ids = [first_id + i for i in range(len(rows))]
+        conn.executemany('''
+            INSERT INTO puzzles (id, player_id, circle_number, type, puzzle_data,
+                                 solution_hash, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(puzzle_id, *row) for puzzle_id, row in zip(ids, rows)])
+        conn.executemany('''
+            INSERT OR IGNORE INTO puzzle_blobs (puzzle_id, hash) VALUES (?, ?)
+        ''', [(puzzle_id, digest) for puzzle_id, hashes in zip(ids, links) for digest in hashes])
+        return len(rows)
+
+    # ==================== DEFERRED INDEXES ====================
+
+    def drop_indexes(self) -> List[tuple]:
+        """Drop secondary indexes of the loaded tables; returns (name, sql) to recreate"""
+        with self.db.get_connection() as conn:
+            indexes = [tuple(row) for row in conn.execute(f'''
+                SELECT name, sql FROM sqlite_master
+                WHERE type = 'index' AND sql IS NOT NULL
+                AND tbl_name IN ({','.join('?' * len(LOADED_TABLES))})
+            ''', LOADED_TABLES)]
+            for name, _ in indexes:
+                conn.execute(f'DROP INDEX IF EXISTS {name}')
+
+        logger.info(f"Deferred {len(indexes)} indexes until the import finishes")
+        return indexes
+
+    def create_indexes(self, indexes: List[tuple]):
+        """Rebuild deferred indexes and refresh planner statistics"""
+        if not indexes:
+            return
+        with self.db.get_connection() as conn:
+            for _, sql in indexes:
+                conn.execute(sql)
+            conn.execute('ANALYZE')
+
+
+def generator_factory(config_path: str) -> PuzzleFactory:
+    """Puzzle factory backed by the server's PackageGenerator"""
+    # Imported lazily: puzzle generation pulls in the server's heavy dependencies
+    from main_server import ChimeraServer
+    from package_generator import PackageGenerator
+
+    config = ChimeraServer.load_config(None, config_path)
+    generator = PackageGenerator(config)
+
+    def generate(players: List[Dict]) -> List[Dict]:
+        async def generate_all():
+            return await asyncio.gather(*(
+                generator.generate_puzzle(player_id=p['id'], circle_number=1, player_data=p)
+                for p in players
+            ))
+        return asyncio.run(generate_all())
+
+    return generate
+
+# ==================== MAIN ====================
+
+def main():
+    parser = argparse.ArgumentParser(description="Chimera-VX bulk player import")
+    parser.add_argument('path', help='NDJSON or CSV file of players')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], help='default: from the file extension')
+    parser.add_argument('--db', default='data/chimera.db')
+    parser.add_argument('--shards', type=int, default=1, help='shard count (database.shards)')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help='maintain indexes while loading (safe while the server runs)')
+    parser.add_argument('--no-hardware-profiles', action='store_true')
+    parser.add_argument('--first-puzzles', action='store_true',
+                        help='pre-generate each player\'s circle 1 puzzle')
+    parser.add_argument('--config', default='config/server_config.json',
+                        help='server config used by --first-puzzles')
+    parser.add_argument('--skip-existing', action='store_true',
+                        help='skip rows whose username or fingerprint already exists')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    Path(args.db).parent.mkdir(parents=True, exist_ok=True)
+    db = ShardedDatabase(args.db, shards=args.shards)
+    factory = generator_factory(args.config) if args.first_puzzles else None
+
+    reports = []
+    try:
+        for shard in db.shards:
+            importer = BulkImporter(
+                shard,
+                batch_size=args.batch_size,
+                defer_indexes=not args.keep_indexes,
+                hardware_profiles=not args.no_hardware_profiles,
+                on_conflict='skip' if args.skip_existing else 'abort'
+            )
+            rows = (row for row in read_players(args.path, args.format)
+                    if db.shard_for_key(row['username']) is shard)
+            reports.append(importer.import_players(rows, factory))
+    finally:
+        db.close()
+
+    # Shards load one after another, so times add up
+    report = {key: sum(shard_report[key] for shard_report in reports) for key in reports[0]}
+    report['players_per_second'] = report['players'] / report['seconds'] if report['seconds'] else 0.0
+    written = report['players'] + report['hardware_profiles'] + report['puzzles']
+    report['rows_per_second'] = written / report['seconds'] if report['seconds'] else 0.0
+
+    print(f"Imported {report['players']} players, {report['hardware_profiles']} hardware profiles, "
+          f"{report['puzzles']} puzzles ({report['skipped']} skipped)")
+    print(f"  {report['seconds']:.2f} s total, {report['index_seconds']:.2f} s rebuilding indexes")
+    print(f"  {report['players_per_second']:.0f} players/s, {report['rows_per_second']:.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
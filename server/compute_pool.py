@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# chimera-vx/server/compute_pool.py
+# Process pool for CPU-bound puzzle generation and solution verification
+#
+# PackageGenerator and VerificationEngine methods are coroutines, but their
+# work (circuit simulation, sequence analysis, building large puzzle files)
+# is CPU-bound and would stall the event loop. ComputePool runs them in
+# worker processes instead. The workers fork from a forkserver that
+# pre-imports package_generator and verification, so the heavy imports
+# (qiskit, numpy, cryptography) are paid once. Each worker then builds its
+# own generator and verifier and drives their coroutines on a private event
+# loop.
+#
+# Every call has a deadline covering queueing and running time. Inside the
+# worker, SIGALRM interrupts Python code that runs past it. If a worker is
+# stuck in native code past a grace period, the pool is replaced and its
+# processes are killed. A cancelled call is dropped if it has not started
+# yet; a started call runs until it finishes or reaches its deadline.
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_MODULES = ['package_generator', 'verification']
+
+class ComputeTimeout(Exception):
+    """A generation or verification call missed its deadline"""
+
+
+class _Deadline(BaseException):
+    """Raised in a worker by SIGALRM
+
+    A BaseException so the engines' own `except Exception` handlers cannot
+    turn a timeout into an ordinary result (e.g. a failed verification).
+    """
+
+
+# ==================== WORKER PROCESS ====================
+
+_engines: Dict[str, Any] = {}
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _alarm(signum, frame):
+    raise _Deadline()
+
+def _init_worker(config: Dict):
+    """Build this worker's generator and verifier (modules are preloaded)"""
+    global _loop
+    from package_generator import PackageGenerator
+    from verification import VerificationEngine
+
+    # The server handles shutdown; workers just exit with the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, _alarm)
+    _engines['generator'] = PackageGenerator(config)
+    _engines['verifier'] = VerificationEngine(config)
+    _loop = asyncio.new_event_loop()
+
+def _ping() -> int:
+    return os.getpid()
+
+def _call(target: str, method: str, args: Tuple, kwargs: Dict, deadline: float) -> Any:
+    """Run one engine coroutine to completion before deadline (time.time())"""
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise ComputeTimeout(f"{target}.{method} expired in the queue")
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        return _loop.run_until_complete(getattr(_engines[target], method)(*args, **kwargs))
+    except _Deadline:
+        raise ComputeTimeout(f"{target}.{method} ran past its deadline")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# ==================== SERVER SIDE ====================
+
+def _discard_result(waiter: asyncio.Future):
+    """Retrieve an abandoned call's outcome so asyncio does not log it"""
+    if not waiter.cancelled():
+        waiter.exception()
+
+
+class ComputePool:
+    """Async front end running generator/verifier calls in worker processes
+
+    With workers=0 calls run inline on the given generator and verifier
+    (useful for debugging); these are built in the server process either
+    way, so files they create on first use (e.g. the encryption key) exist
+    before any worker starts.
+    """
+
+    GRACE = 5.0  # seconds past the deadline before a worker counts as stuck
+
+    def __init__(self, generator, verifier, config: Dict, workers: int = 2,
+                 timeout: float = 30.0, max_tasks_per_child: Optional[int] = None):
+        self.engines = {'generator': generator, 'verifier': verifier}
+        self.config = config
+        self.workers = workers
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+        # Statistics
+        self.stats = {
+            'calls': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+            'restarts': 0
+        }
+
+    @classmethod
+    def from_config(cls, generator, verifier, config: Dict) -> 'ComputePool':
+        """Pool from the server config (compute section)"""
+        compute = config['compute']
+        return cls(generator, verifier, config, workers=compute['workers'],
+                   timeout=compute['timeout'], max_tasks_per_child=compute['max_tasks_per_child'])
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(PRELOAD_MODULES)
+            options = {}
+            if self.max_tasks_per_child:
+                options['max_tasks_per_child'] = self.max_tasks_per_child
+            self.executor = ProcessPoolExecutor(
+                self.workers, mp_context=context,
+                initializer=_init_worker, initargs=(self.config,), **options
+            )
+        return self.executor
+
+    async def start(self):
+        """Start the forkserver and a first worker now rather than on the first call
+
+        Import or setup errors in the engines surface here, at startup.
+        Further workers are started as calls queue up.
+        """
+        if not self.workers:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor(), _ping)
+        logger.info(f"Compute pool ready (up to {self.workers} workers, {self.timeout:.0f}s timeout)")
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        """Kill a pool with a stuck worker; the next call starts a fresh one"""
+        if self.executor is not executor:
+            return  # Already replaced by another timed-out call
+        self.executor = None
+        self.stats['restarts'] += 1
+        # No public way to stop running workers before Python 3.14
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+        logger.error(f"Restarted compute pool: killed {len(processes)} workers")
+
+    async def run(self, target: str, method: str, *args, timeout: Optional[float] = None,
+                  **kwargs) -> Any:
+        """Await engine.method(*args, **kwargs) from a worker process
+
+        Raises ComputeTimeout if it does not finish within timeout seconds.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self.stats['calls'] += 1
+        if not self.workers:
+            return await getattr(self.engines[target], method)(*args, **kwargs)
+
+        executor = self._executor()
+        deadline = time.time() + timeout
+        try:
+            future = executor.submit(_call, target, method, args, kwargs, deadline)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); replace the pool and retry once
+            self._restart(executor)
+            executor = self._executor()
+            future = executor.submit(_call, target, method, args, kwargs, deadline)
+
+        waiter = asyncio.wrap_future(future)
+        try:
+            # shield: a timeout here must not cancel the call before we inspect it
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout + self.GRACE)
+        except ComputeTimeout:
+            self.stats['timeouts'] += 1
+            raise
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            waiter.add_done_callback(_discard_result)
+            if not future.cancel():
+                # Still running after SIGALRM: stuck outside Python code
+                self._restart(executor)
+            raise ComputeTimeout(f"{target}.{method} did not finish in {timeout:.0f}s")
+        except asyncio.CancelledError:
+            waiter.add_done_callback(_discard_result)
+            if future.cancel():
+                self.stats['cancelled'] += 1
+            raise
+
+    # ==================== ENGINE CALLS ====================
+
+    async def generate_initial_package(self, player_id: int) -> Dict:
+        return await self.run('generator', 'generate_initial_package', player_id)
+
+    async def generate_puzzle(self, player_id: int, circle_number: int,
+                              player_data: Dict) -> Dict:
+        return await self.run('generator', 'generate_puzzle', player_id=player_id,
+                              circle_number=circle_number, player_data=player_data)
+
+    async def generate_final_flag(self, player_id: int) -> str:
+        return await self.run('generator', 'generate_final_flag', player_id)
+
+    async def verify_solution(self, puzzle_data: Dict, solution: str,
+                              puzzle_type: str, player_id: int) -> Tuple[bool, Dict]:
+        return await self.run('verifier', 'verify_solution', puzzle_data=puzzle_data,
+                              solution=solution, puzzle_type=puzzle_type, player_id=player_id)
+
+    def close(self):
+        """Drop queued calls; workers exit once their current call returns"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
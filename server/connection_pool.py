@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# chimera-vx/server/connection_pool.py
+# Long-lived SQLite connection management for Chimera-VX
+
+import sqlite3
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Applied to every connection (values tuned for a write-heavy event database)
+DEFAULT_PRAGMAS = {
+    'synchronous': 'NORMAL',      # Safe with WAL, one fsync per checkpoint
+    'mmap_size': 268435456,       # 256 MB memory-mapped reads
+    'cache_size': -65536,         # 64 MB page cache (negative = KiB)
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000          # ms
+}
+
+class ConnectionPool:
+    """One serialized writer connection plus a pool of reader connections"""
+
+    def __init__(self, db_path: str, readers: int = 4,
+                 pragmas: Optional[Dict] = None):
+        self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+
+        # Writer: a single connection guarded by a re-entrant lock so that
+        # nested Database calls on the same thread share one transaction
+        self.writer = self._connect()
+        self.writer.execute('PRAGMA journal_mode=WAL')
+        self._write_lock = threading.RLock()
+        self._write_owner: Optional[int] = None
+        self._write_depth = 0
+        self._commit_hooks: List[Callable[[], None]] = []
+
+        # Readers: in-memory databases are private to a connection, so they
+        # are served by the writer
+        self.readers: queue.Queue = queue.Queue()
+        self.reader_count = 0 if db_path == ':memory:' else max(readers, 0)
+        for _ in range(self.reader_count):
+            self.readers.put(self._connect())
+
+        self.closed = False
+        logger.info(f"Connection pool ready: 1 writer, {self.reader_count} readers")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned connection"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        return conn
+
+    def holds_writer(self) -> bool:
+        """Check if the calling thread is inside a write block"""
+        return self._write_owner == threading.get_ident()
+
+    def after_commit(self, hook: Callable[[], None]):
+        """Run hook() once the enclosing outermost write block commits
+
+        Hooks are dropped if it rolls back. Call only while holding the writer.
+        """
+        self._commit_hooks.append(hook)
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Borrow the writer; the outermost block commits or rolls back"""
+        with self._write_lock:
+            self._write_owner = threading.get_ident()
+            self._write_depth += 1
+            hooks: List[Callable[[], None]] = []
+            try:
+                yield self.writer
+                if self._write_depth == 1:
+                    self.writer.commit()
+                    hooks, self._commit_hooks = self._commit_hooks, []
+            except BaseException:
+                if self._write_depth == 1:
+                    self.writer.rollback()
+                    self._commit_hooks = []
+                raise
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._write_owner = None
+
+            # Still under the writer lock, so in-memory state follows commit order
+            for hook in hooks:
+                hook()
+
+    @contextmanager
+    def savepoint(self, name: str) -> Iterator[sqlite3.Connection]:
+        """Nested write block that rolls back on its own, with its commit hooks
+
+        The enclosing outermost write block still owns the commit.
+        """
+        with self.write() as conn:
+            if not conn.in_transaction:
+                conn.execute('BEGIN IMMEDIATE')
+            mark = len(self._commit_hooks)
+            conn.execute(f'SAVEPOINT {name}')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f'ROLLBACK TO {name}')
+                del self._commit_hooks[mark:]
+                raise
+            finally:
+                conn.execute(f'RELEASE {name}')
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a reader connection"""
+        # Reads issued inside a write block must see its uncommitted rows
+        if self.reader_count == 0 or self.holds_writer():
+            with self.write() as conn:
+                yield conn
+            return
+
+        conn = self.readers.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self.readers.put(conn)
+
+    def connection(self, readonly: bool = False):
+        """Borrow a connection for reading or writing"""
+        return self.read() if readonly else self.write()
+
+    def close(self):
+        """Close all connections"""
+        if self.closed:
+            return
+        self.closed = True
+
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+        with self._write_lock:
+            self.writer.close()
+
+        logger.info("Connection pool closed")
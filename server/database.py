@@ -6,25 +6,187 @@ import sqlite3
 import json
 import hashlib
 import time
+import functools
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Sequence, Tuple
 import logging
 
+from connection_pool import ConnectionPool
+from write_behind import CoalescingBuffer, CounterBuffer
+from rank_service import RankService
+from query_metrics import QueryMetrics, count_rows
+from migrations import run_migrations, get_version, COMPLETION_SOLVED_COUNT
+from blob_store import BlobStore, parse_manifest
+from archive_store import ArchiveStore, ARCHIVED_TABLES
+from session_cache import SessionCache
+from timer_wheel import TimerWheel
+from sharding import bucket_for_id, bucket_for_key, next_bucket_id
+
 logger = logging.getLogger(__name__)
 
+MAX_ROWID = 2**63 - 1
+
+SESSION_LIFETIME = 86400  # 24 hours
+
+# Selectable columns for projection-aware queries (see select_list)
+PUZZLE_COLUMNS = (
+    'id', 'player_id', 'circle_number', 'type', 'puzzle_data', 'solution_hash',
+    'attempts', 'created_at', 'solved_at', 'solution', 'time_spent', 'status', 'metadata'
+)
+LEADERBOARD_COLUMNS = (
+    'id', 'player_id', 'username', 'progress', 'total_time', 'completed_at',
+    'last_updated', 'last_active'
+)
+
+# Narrow projections for listing endpoints, read from covering indexes
+SOLVED_PUZZLE_SUMMARY = ('id', 'circle_number', 'type', 'solved_at', 'attempts', 'time_spent')
+LEADERBOARD_SUMMARY = ('player_id', 'username', 'progress', 'total_time', 'completed_at')
+
+class WriteConflict(Exception):
+    """A unit of work found the rows it depends on already changed (it is rolled back)"""
+
+
 class Database:
     """Database manager for Chimera-VX"""
     
-    def __init__(self, db_path: str = "data/chimera.db"):
+    def __init__(self, db_path: str = "data/chimera.db", pool_size: int = 4,
+                 pragmas: Optional[Dict] = None, rank_index: bool = True,
+                 query_metrics: bool = False, schema_version: Optional[int] = None,
+                 archive_path: Optional[str] = None, sharded: bool = False,
+                 session_cache_size: int = 10000, session_cache_ttl: int = 30,
+                 max_sessions_per_player: int = 5):
         self.db_path = db_path
+        self.schema_version = schema_version  # None = latest migration
+        self.pool = ConnectionPool(db_path, readers=pool_size, pragmas=pragmas)
+        
+        # In-memory rank index; None falls back to an indexed COUNT query
+        self.ranks = RankService() if rank_index else None
+        
+        # Write-behind buffers for per-request timestamps (see flush_activity)
+        self.last_active_buffer = CoalescingBuffer('players.last_active')
+        self.last_used_buffer = CoalescingBuffer('sessions.last_used')
+        self.statistics_buffer = CounterBuffer('statistics')
+        
+        # Puzzle file bodies live deduplicated in the blobs table
+        self.blobs = BlobStore()
+        
+        # Optional cold storage for old submissions/cheat logs (see archive_old_rows)
+        self.archive = ArchiveStore(archive_path) if archive_path else None
+        
+        # Authenticated sessions served from memory (see get_player_by_session)
+        self.session_cache = (SessionCache(session_cache_size, session_cache_ttl)
+                              if session_cache_size else None)
+        
+        # Session expiry deadlines (see expire_sessions); a login beyond
+        # max_sessions_per_player live sessions evicts the oldest (0 = no cap)
+        self.session_expiry = TimerWheel()
+        self.max_sessions_per_player = max_sessions_per_player
+        
+        # Shard member: player and puzzle ids carry their bucket (see sharding.py)
+        self.sharded = sharded
+        
+        # Set while the writer's thread is inside transaction()
+        self.in_unit_of_work = False
+        
+        # Optional per-method timing
+        self.metrics = QueryMetrics() if query_metrics else None
+        if self.metrics:
+            self.instrument_methods()
+        
         self.init_database()
         
-    def get_connection(self) -> sqlite3.Connection:
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def get_connection(self, readonly: bool = False):
+        """Borrow a pooled connection (commits on exit for writes)"""
+        return self.pool.connection(readonly=readonly)
+    
+    @contextmanager
+    def transaction(self):
+        """Unit of work: write methods called inside share one transaction and one commit
+        
+        Nested blocks join the outermost one; any exception rolls everything back.
+        Inside a plain get_connection() write block, which owns the commit, the
+        unit of work joins its transaction through a savepoint instead. The
+        outermost write block commits, then runs the after_commit hooks.
+        """
+        joined = self.pool.holds_writer()
+        with self.pool.write() as conn:
+            if self.in_unit_of_work:
+                yield self
+                return
+            
+            self.in_unit_of_work = True
+            try:
+                if joined:
+                    with self.pool.savepoint('unit_of_work'):
+                        yield self
+                else:
+                    conn.execute('BEGIN IMMEDIATE')
+                    yield self
+            finally:
+                self.in_unit_of_work = False
+    
+    def unit_of_work(self, work: Callable[['Database'], Any],
+                     player_id: Optional[int] = None) -> Any:
+        """Run work(db) inside one transaction and return its result
+        
+        player_id is the shard routing hint used by ShardedDatabase.
+        """
+        with self.transaction():
+            return work(self)
+    
+    def after_commit(self, hook: Callable, *args):
+        """Run hook(*args) once the calling thread's write block commits (now if it holds none)
+        
+        Deferred hooks run under the writer lock, so in-memory state follows
+        commit order; they are dropped if the write block rolls back.
+        """
+        if self.pool.holds_writer():
+            self.pool.after_commit(functools.partial(hook, *args))
+        else:
+            hook(*args)
+    
+    def instrument_methods(self):
+        """Wrap public methods to record timing and rows in self.metrics
+        
+        Only the outermost call on a thread is recorded, so methods called
+        from other methods (e.g. sync_rank) are not counted twice.
+        """
+        skip = {'get_connection', 'close', 'instrument_methods', 'get_database_size',
+                'transaction', 'after_commit'}
+        calls = threading.local()
+        
+        def timed(name: str, method):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                if getattr(calls, 'active', False):
+                    return method(*args, **kwargs)
+                calls.active = True
+                try:
+                    start = time.perf_counter()
+                    result = method(*args, **kwargs)
+                    self.metrics.record(name, time.perf_counter() - start, count_rows(result))
+                finally:
+                    calls.active = False
+                return result
+            return wrapper
+        
+        for name in dir(type(self)):
+            if name.startswith('_') or name in skip:
+                continue
+            method = getattr(self, name)
+            if callable(method):
+                setattr(self, name, timed(name, method))
+    
+    def close(self):
+        """Flush buffered writes and close pooled connections"""
+        self.flush_activity()
+        self.flush_statistics()
+        self.pool.close()
+        if self.archive:
+            self.archive.close()
     
     def init_database(self):
         """Initialize database schema"""
@@ -156,24 +318,19 @@ class Database:
                 )
             ''')
             
-            # Create indexes
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_players_username ON players(username)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_players_hardware ON players(hardware_fingerprint)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_player ON sessions(player_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_hash ON sessions(session_hash)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_puzzles_player ON puzzles(player_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_puzzles_circle ON puzzles(circle_number)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_puzzles_status ON puzzles(status)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_submissions_player ON submissions(player_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_submissions_puzzle ON submissions(puzzle_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_hardware_player ON hardware_profiles(player_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cheat_player ON cheat_logs(player_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_leaderboard_progress ON leaderboard(progress DESC, total_time ASC)')
-            
-            conn.commit()
+        # Indexes and later schema changes are versioned migrations
+        self.migrate(self.schema_version)
         
         logger.info("Database initialized")
     
+    def migrate(self, target_version: Optional[int] = None) -> List[int]:
+        """Apply pending schema migrations"""
+        return run_migrations(self.pool, target_version)
+    
+    def get_schema_version(self) -> int:
+        """Get current schema version"""
+        return get_version(self.pool)
+    
     # ==================== PLAYER METHODS ====================
     
     def create_player(self, username: str, email: str, hardware_fingerprint: str) -> int:
@@ -181,10 +338,13 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Sharded: the id lands in the username's bucket
+            player_id = next_bucket_id(conn, 'players', bucket_for_key(username)) if self.sharded else None
             cursor.execute('''
-                INSERT INTO players (username, email, hardware_fingerprint, created_at, last_active)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO players (id, username, email, hardware_fingerprint, created_at, last_active)
+                VALUES (?, ?, ?, ?, ?, ?)
             ''', (
+                player_id,
                 username,
                 email,
                 hardware_fingerprint,
@@ -205,14 +365,16 @@ class Database:
                 int(time.time())
             ))
             
-            conn.commit()
+            # Queued on the writer: indexed only if the INSERTs commit
+            if self.ranks:
+                self.after_commit(self.ranks.update, player_id, 0, 0)
             
             logger.info(f"Created player {username} (ID: {player_id})")
             return player_id
     
     def get_player(self, player_id: int) -> Optional[Dict]:
         """Get player by ID"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM players WHERE id = ?', (player_id,))
             row = cursor.fetchone()
@@ -220,7 +382,7 @@ class Database:
     
     def get_player_by_username(self, username: str) -> Optional[Dict]:
         """Get player by username"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM players WHERE username = ?', (username,))
             row = cursor.fetchone()
@@ -228,47 +390,62 @@ class Database:
     
     def get_player_by_hardware(self, hardware_fingerprint: str) -> Optional[Dict]:
         """Get player by hardware fingerprint"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM players WHERE hardware_fingerprint = ?', (hardware_fingerprint,))
             row = cursor.fetchone()
             return dict(row) if row else None
     
-    def update_player_progress(self, player_id: int, new_circle: int, time_spent: int):
-        """Update player progress"""
+    def update_player_progress(self, player_id: int, new_circle: Optional[int], time_spent: int) -> Dict:
+        """Update player progress (new_circle=None advances from the stored circle)
+        
+        Returns the player's updated current_circle and total_time.
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
                 UPDATE players 
                 SET progress = progress + 1,
-                    current_circle = ?,
+                    current_circle = COALESCE(?, current_circle + 1),
                     total_time = total_time + ?,
                     last_active = ?
                 WHERE id = ?
             ''', (new_circle, time_spent, int(time.time()), player_id))
             
-            # Update leaderboard cache
-            self.update_leaderboard(player_id)
+            # The leaderboard row is kept current by trg_players_leaderboard
+            self.sync_rank(conn, player_id)
+            
+            cursor.execute('SELECT current_circle, total_time FROM players WHERE id = ?',
+                           (player_id,))
+            progress = dict(cursor.fetchone())
             
-            conn.commit()
+            self.forget_cached_sessions(player_id)
             
-            logger.debug(f"Updated progress for player {player_id}: circle {new_circle}")
+            logger.debug(f"Updated progress for player {player_id}: circle {progress['current_circle']}")
+        return progress
     
     def update_player_last_active(self, player_id: int):
-        """Update player's last active timestamp"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE players SET last_active = ? WHERE id = ?
-            ''', (int(time.time()), player_id))
-            conn.commit()
+        """Update player's last active timestamp (buffered, see flush_activity)"""
+        self.last_active_buffer.put(player_id, int(time.time()))
     
-    def reset_player(self, player_id: int):
-        """Reset player progress"""
+    def reset_player(self, player_id: int, chunk_size: int = 500, pause: float = 0.002,
+                     on_progress: Optional[Callable[[Dict], None]] = None) -> Dict[str, int]:
+        """Reset player progress
+        
+        The player row is reset at once; their submissions and puzzles are then
+        deleted in chunks of chunk_size rows, each its own short transaction, so
+        other writers get the lock in between. Returns rows deleted per table.
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Only delete history that existed when the reset started
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM submissions')
+            last_submission = cursor.fetchone()[0]
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM puzzles')
+            last_puzzle = cursor.fetchone()[0]
+            
             # Reset player
             cursor.execute('''
                 UPDATE players 
@@ -279,47 +456,180 @@ class Database:
                     metadata = '{}'
                 WHERE id = ?
             ''', (player_id,))
-            
-            # Delete puzzles
-            cursor.execute('DELETE FROM puzzles WHERE player_id = ?', (player_id,))
-            
-            # Delete submissions
-            cursor.execute('DELETE FROM submissions WHERE player_id = ?', (player_id,))
-            
-            # Delete leaderboard entry
-            cursor.execute('DELETE FROM leaderboard WHERE player_id = ?', (player_id,))
-            
-            conn.commit()
-            
-            logger.info(f"Reset player {player_id}")
+            if self.ranks:
+                self.after_commit(self.ranks.update, player_id, 0, 0)
+            self.forget_cached_sessions(player_id)
+        
+        progress = {'player_id': player_id, 'deleted': {}}
+        
+        # Submissions before the puzzles they reference
+        self.delete_player_rows('submissions', player_id, chunk_size, pause,
+                                progress, on_progress, max_id=last_submission)
+        self.delete_player_rows('puzzles', player_id, chunk_size, pause,
+                                progress, on_progress, max_id=last_puzzle)
+        if self.archive:
+            self.archive.delete_player(player_id)
+        
+        # Delete leaderboard entry (re-created by the triggers while puzzles
+        # were deleted; kept if the player already progressed again)
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM leaderboard WHERE player_id = ? AND progress = 0', (player_id,))
+        
+        logger.info(f"Reset player {player_id}: {progress['deleted']}")
+        return progress['deleted']
+    
+    def deactivate_player(self, player_id: int) -> bool:
+        """Ban a player: sessions stop authenticating and ranks drop them once committed
+        
+        Returns False if the player was already inactive (or does not exist).
+        """
+        with self.transaction():
+            with self.get_connection() as conn:
+                cursor = conn.execute('UPDATE players SET is_active = 0 WHERE id = ? AND is_active = 1',
+                                      (player_id,))
+                if not cursor.rowcount:
+                    return False
+                self.sync_rank(conn, player_id)
+                # The warm session path skips the is_active check
+                self.forget_cached_sessions(player_id)
+        
+        logger.warning(f"Deactivated player {player_id}")
+        return True
+    
+    def purge_players(self, player_ids: List[int], chunk_size: int = 500, pause: float = 0.002,
+                      on_progress: Optional[Callable[[Dict], None]] = None) -> Dict[str, int]:
+        """Delete player accounts and everything they own, in chunked transactions
+        
+        on_progress receives {'player_id', 'players_done', 'players_total', 'deleted'}
+        after every chunk. Returns rows deleted per table over all players.
+        """
+        totals: Dict[str, int] = {}
+        for done, player_id in enumerate(player_ids):
+            progress = {'player_id': player_id, 'players_done': done,
+                        'players_total': len(player_ids), 'deleted': {}}
+            
+            # Log the player out and drop them from the rankings first
+            with self.get_connection() as conn:
+                conn.execute('DELETE FROM sessions WHERE player_id = ?', (player_id,))
+                conn.execute('UPDATE players SET is_active = 0 WHERE id = ?', (player_id,))
+                if self.ranks:
+                    self.after_commit(self.ranks.remove, player_id)
+                self.forget_cached_sessions(player_id)
+            
+            for table in ('submissions', 'puzzles', 'cheat_logs', 'hardware_profiles'):
+                self.delete_player_rows(table, player_id, chunk_size, pause,
+                                        progress, on_progress)
+            if self.archive:
+                self.archive.delete_player(player_id)
+            
+            with self.get_connection() as conn:
+                conn.execute('DELETE FROM leaderboard WHERE player_id = ?', (player_id,))
+                conn.execute('DELETE FROM players WHERE id = ?', (player_id,))
+            self.last_active_buffer.discard(player_id)
+            
+            progress['players_done'] = done + 1
+            if on_progress:
+                on_progress(progress)
+            for table, count in progress['deleted'].items():
+                totals[table] = totals.get(table, 0) + count
+            totals['players'] = totals.get('players', 0) + 1
+        
+        logger.info(f"Purged {len(player_ids)} players: {totals}")
+        return totals
+    
+    def delete_player_rows(self, table: str, player_id: int, chunk_size: int, pause: float,
+                           progress: Dict, on_progress: Optional[Callable[[Dict], None]] = None,
+                           max_id: Optional[int] = None) -> int:
+        """Delete a player's rows from table chunk_size at a time, pausing between chunks"""
+        deleted = 0
+        while True:
+            with self.get_connection() as conn:
+                count = conn.execute(f'''
+                    DELETE FROM {table} WHERE id IN (
+                        SELECT id FROM {table}
+                        WHERE player_id = ? AND id <= ?
+                        LIMIT ?
+                    )
+                ''', (player_id, MAX_ROWID if max_id is None else max_id, chunk_size)).rowcount
+            
+            deleted += count
+            progress['deleted'][table] = deleted
+            if on_progress:
+                on_progress(progress)
+            if count < chunk_size:
+                return deleted
+            
+            # Let queued writers take the lock between chunks
+            time.sleep(pause)
     
     def get_player_rank(self, player_id: int) -> Optional[int]:
         """Get player's rank on leaderboard"""
-        with self.get_connection() as conn:
+        if self.ranks:
+            self.ranks.ensure_loaded(self.load_rank_rows)
+            return self.ranks.rank(player_id)
+        
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             
-            # Get all players ordered by progress and time
             cursor.execute('''
-                SELECT id FROM players 
-                WHERE is_active = 1 
-                ORDER BY progress DESC, total_time ASC
-            ''')
-            
-            rows = cursor.fetchall()
-            for i, row in enumerate(rows, 1):
-                if row['id'] == player_id:
-                    return i
-            
+                SELECT progress, total_time FROM players 
+                WHERE id = ? AND is_active = 1
+            ''', (player_id,))
+            player = cursor.fetchone()
+        if not player:
             return None
+        
+        return 1 + self.count_ranked_ahead(player['progress'], player['total_time'], player_id)
+    
+    def count_ranked_ahead(self, progress: int, total_time: int, player_id: int) -> int:
+        """Number of active players ranked before (progress, total_time, player_id)
+        
+        The player need not exist here; ShardedDatabase sums this over shards.
+        """
+        if self.ranks:
+            self.ranks.ensure_loaded(self.load_rank_rows)
+            return self.ranks.count_ahead(player_id, progress, total_time)
+        
+        with self.get_connection(readonly=True) as conn:
+            # Count strictly better players (ties broken by id) on idx_players_rank
+            cursor = conn.execute('''
+                SELECT (SELECT COUNT(*) FROM players
+                        WHERE is_active = 1 AND progress > :progress)
+                    + (SELECT COUNT(*) FROM players
+                       WHERE is_active = 1 AND progress = :progress
+                       AND total_time < :total_time)
+                    + (SELECT COUNT(*) FROM players
+                       WHERE is_active = 1 AND progress = :progress
+                       AND total_time = :total_time AND id < :id)
+                AS ahead
+            ''', {
+                'progress': progress or 0,
+                'total_time': total_time or 0,
+                'id': player_id
+            })
+            return cursor.fetchone()['ahead']
+    
+    def load_rank_rows(self) -> List[Tuple[int, int, int]]:
+        """Get (id, progress, total_time) for every active player"""
+        with self.get_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, progress, total_time FROM players WHERE is_active = 1')
+            return [tuple(row) for row in cursor.fetchall()]
     
     # ==================== SESSION METHODS ====================
     
-    def create_session(self, player_id: int, session_hash: str, ip_address: str = None):
-        """Create a new session"""
+    def create_session(self, player_id: int, session_hash: str, ip_address: str = None,
+                       max_sessions: Optional[int] = None):
+        """Create a new session, evicting the player's oldest beyond max_sessions
+        
+        max_sessions defaults to max_sessions_per_player; 0 disables the cap.
+        """
+        if max_sessions is None:
+            max_sessions = self.max_sessions_per_player
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            expires_at = int(time.time()) + 86400  # 24 hours
+            expires_at = int(time.time()) + SESSION_LIFETIME
             
             cursor.execute('''
                 INSERT INTO sessions (player_id, session_hash, ip_address, created_at, last_used, expires_at)
@@ -333,17 +643,40 @@ class Database:
                 expires_at
             ))
             
-            conn.commit()
+            evicted = []
+            if max_sessions:
+                cursor.execute('''
+                    SELECT session_hash FROM sessions WHERE player_id = ?
+                    ORDER BY id DESC LIMIT -1 OFFSET ?
+                ''', (player_id, max_sessions))
+                evicted = [row[0] for row in cursor.fetchall()]
+                if evicted:
+                    cursor.execute(
+                        f'DELETE FROM sessions WHERE session_hash IN ({",".join("?" * len(evicted))})',
+                        evicted
+                    )
+                    logger.debug(f"Evicted {len(evicted)} old sessions of player {player_id}")
+            
+            self.after_commit(self.session_expiry.schedule, session_hash, expires_at)
+            for evicted_hash in evicted:
+                self.after_commit(self.forget_session, evicted_hash)
             
             logger.debug(f"Created session for player {player_id}")
     
     def get_player_by_session(self, session_hash: str) -> Optional[Dict]:
-        """Get player by session hash"""
-        with self.get_connection() as conn:
+        """Get player by session hash (warm sessions come from the session cache)"""
+        if self.session_cache is not None:
+            player = self.session_cache.get(session_hash)
+            if player:
+                self.last_used_buffer.put(session_hash, int(time.time()))
+                return player
+            generation = self.session_cache.generation
+        
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT p.* FROM players p
+                SELECT p.*, s.expires_at AS session_expires_at FROM players p
                 JOIN sessions s ON p.id = s.player_id
                 WHERE s.session_hash = ? 
                 AND s.expires_at > ?
@@ -351,70 +684,235 @@ class Database:
             ''', (session_hash, int(time.time())))
             
             row = cursor.fetchone()
-            if row:
-                # Update session last used
-                cursor.execute('''
-                    UPDATE sessions SET last_used = ? WHERE session_hash = ?
-                ''', (int(time.time()), session_hash))
-                conn.commit()
-                return dict(row)
-            
+        if not row:
+            return None
+        
+        # Update session last used (buffered)
+        self.last_used_buffer.put(session_hash, int(time.time()))
+        player = dict(row)
+        expires_at = player.pop('session_expires_at')
+        if self.session_cache is not None:
+            self.session_cache.put(session_hash, player, expires_at, generation)
+        return player
+    
+    def forget_cached_sessions(self, player_id: int):
+        """Drop a player's cached sessions once the calling write block commits"""
+        if self.session_cache is not None:
+            self.after_commit(self.session_cache.invalidate_player, player_id)
+    
+    def get_session(self, session_hash: str) -> Optional[Dict]:
+        """Get player_id and expires_at of a live session (the player may be on another shard)"""
+        with self.get_connection(readonly=True) as conn:
+            row = conn.execute('''
+                SELECT player_id, expires_at FROM sessions
+                WHERE session_hash = ? AND expires_at > ?
+            ''', (session_hash, int(time.time()))).fetchone()
+        if not row:
             return None
+        self.last_used_buffer.put(session_hash, int(time.time()))
+        return dict(row)
+    
+    def get_player_sessions(self, player_id: int) -> List[Dict]:
+        """Get session_hash and created_at of a player's live sessions"""
+        with self.get_connection(readonly=True) as conn:
+            cursor = conn.execute('''
+                SELECT session_hash, created_at FROM sessions
+                WHERE player_id = ? AND expires_at > ?
+            ''', (player_id, int(time.time())))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def delete_player_sessions(self, player_ids: List[int]) -> int:
+        """Log players out everywhere; returns sessions deleted"""
+        with self.get_connection() as conn:
+            deleted = conn.execute(
+                f'DELETE FROM sessions WHERE player_id IN ({",".join("?" * len(player_ids))})',
+                player_ids
+            ).rowcount
+            for player_id in player_ids:
+                self.forget_cached_sessions(player_id)
+        return deleted
+    
+    def get_player_by_token(self, token_id: str, player_id: int, expires_at: int) -> Optional[Dict]:
+        """Get the active player of a verified signed token (cached like sessions)"""
+        if self.session_cache is not None:
+            player = self.session_cache.get(token_id)
+            if player:
+                return player
+            generation = self.session_cache.generation
+        
+        player = self.get_player(player_id)
+        if not player or not player['is_active']:
+            return None
+        if self.session_cache is not None:
+            self.session_cache.put(token_id, player, expires_at, generation)
+        return player
+    
+    def add_revocation(self, expires_at: int, token_id: Optional[str] = None,
+                       player_id: Optional[int] = None, not_before: Optional[int] = None) -> Dict:
+        """Revoke one signed token, or all of a player's tokens issued before not_before
+        
+        not_before is in milliseconds (session_tokens.token_clock). Returns the stored row for RevocationSet.add.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute('''
+                INSERT INTO revocations (token_id, player_id, not_before, expires_at, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (token_id, player_id, not_before, expires_at, int(time.time())))
+            return {'id': cursor.lastrowid, 'token_id': token_id, 'player_id': player_id,
+                    'not_before': not_before, 'expires_at': expires_at}
+    
+    def get_revocations(self, after_id: int = 0) -> List[Dict]:
+        """Get unexpired revocations newer than after_id, oldest first"""
+        with self.get_connection(readonly=True) as conn:
+            cursor = conn.execute('''
+                SELECT id, token_id, player_id, not_before, expires_at FROM revocations
+                WHERE id > ? AND expires_at > ?
+                ORDER BY id
+            ''', (after_id, int(time.time())))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def prune_revocations(self) -> int:
+        """Delete revocations whose tokens have expired anyway"""
+        with self.get_connection() as conn:
+            return conn.execute(
+                'DELETE FROM revocations WHERE expires_at <= ?', (int(time.time()),)
+            ).rowcount
     
     def delete_session(self, session_hash: str):
         """Delete a session"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM sessions WHERE session_hash = ?', (session_hash,))
-            conn.commit()
+            self.after_commit(self.forget_session, session_hash)
             logger.debug(f"Deleted session {session_hash}")
     
+    def forget_session(self, session_hash: str):
+        """Drop in-memory state of a deleted session"""
+        self.last_used_buffer.discard(session_hash)
+        self.session_expiry.cancel(session_hash)
+        if self.session_cache is not None:
+            self.session_cache.invalidate(session_hash)
+    
+    def load_session_expiry_rows(self) -> List[Tuple[str, int]]:
+        """(session_hash, expires_at) of every session, to seed the expiry wheel"""
+        with self.get_connection(readonly=True) as conn:
+            return [tuple(row) for row in conn.execute('SELECT session_hash, expires_at FROM sessions')]
+    
+    def expire_sessions(self, batch_size: int = 500, pause: float = 0.002) -> int:
+        """Delete sessions whose expiry came due, batch_size per transaction
+        
+        Deadlines come from the in-memory timer wheel, so no query scans for
+        expired rows. Returns sessions deleted.
+        """
+        self.session_expiry.ensure_loaded(self.load_session_expiry_rows)
+        now = int(time.time())
+        due = self.session_expiry.advance(now)
+        
+        deleted = 0
+        for start in range(0, len(due), batch_size):
+            if start:
+                time.sleep(pause)
+            batch = due[start:start + batch_size]
+            with self.get_connection() as conn:
+                # Sessions extended or deleted meanwhile are left alone
+                deleted += conn.execute(f'''
+                    DELETE FROM sessions
+                    WHERE session_hash IN ({",".join("?" * len(batch))}) AND expires_at <= ?
+                ''', (*batch, now)).rowcount
+            for session_hash in batch:
+                self.last_used_buffer.discard(session_hash)
+        
+        if deleted:
+            logger.debug(f"Expired {deleted} sessions")
+        return deleted
+    
     def clean_old_sessions(self, timeout: int):
-        """Clean expired sessions"""
+        """Clean expired sessions (backstop for rows the expiry wheel never saw)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             expired = int(time.time()) - timeout
             cursor.execute('DELETE FROM sessions WHERE expires_at < ?', (expired,))
             deleted = cursor.rowcount
-            conn.commit()
             
             if deleted > 0:
                 logger.debug(f"Cleaned {deleted} expired sessions")
     
+    def flush_activity(self) -> int:
+        """Write buffered last_active/last_used timestamps in one transaction"""
+        last_active = self.last_active_buffer.drain()
+        last_used = self.last_used_buffer.drain()
+        if not last_active and not last_used:
+            return 0
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    'UPDATE players SET last_active = MAX(COALESCE(last_active, 0), ?) WHERE id = ?',
+                    [(ts, player_id) for player_id, ts in last_active.items()]
+                )
+                cursor.executemany(
+                    'UPDATE sessions SET last_used = ? WHERE session_hash = ?',
+                    [(ts, session_hash) for session_hash, ts in last_used.items()]
+                )
+        except sqlite3.Error:
+            self.last_active_buffer.restore(last_active)
+            self.last_used_buffer.restore(last_used)
+            raise
+        
+        flushed = len(last_active) + len(last_used)
+        logger.debug(f"Flushed {flushed} buffered activity updates")
+        return flushed
+    
     # ==================== PUZZLE METHODS ====================
     
     def create_puzzle(self, player_id: int, circle_number: int, puzzle_type: str, 
                      puzzle_data: str, solution_hash: str, created_at: int) -> int:
-        """Create a new puzzle for player"""
+        """Create a new puzzle for player (file bodies are stored as blobs)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            manifest, hashes = self.blobs.externalize(conn, parse_manifest(puzzle_data))
+            
+            # Sharded: puzzles share their player's bucket
+            puzzle_id = next_bucket_id(conn, 'puzzles', bucket_for_id(player_id)) if self.sharded else None
             cursor.execute('''
-                INSERT INTO puzzles (player_id, circle_number, type, puzzle_data, 
+                INSERT INTO puzzles (id, player_id, circle_number, type, puzzle_data, 
                                    solution_hash, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (
+                puzzle_id,
                 player_id,
                 circle_number,
                 puzzle_type,
-                puzzle_data,
+                json.dumps(manifest),
                 solution_hash,
                 created_at
             ))
             
             puzzle_id = cursor.lastrowid
-            conn.commit()
+            self.link_puzzle_blobs(conn, puzzle_id, hashes)
             
             logger.debug(f"Created puzzle {puzzle_id} for player {player_id}")
             return puzzle_id
     
-    def get_current_puzzle(self, player_id: int) -> Optional[Dict]:
-        """Get player's current unsolved puzzle"""
-        with self.get_connection() as conn:
+    def select_list(self, columns: Optional[Sequence[str]], allowed: Sequence[str]) -> str:
+        """Build a SELECT list from a column projection (None = all columns)"""
+        if columns is None:
+            return '*'
+        unknown = [column for column in columns if column not in allowed]
+        if unknown or not columns:
+            raise ValueError(f"Invalid column projection: {unknown or list(columns)}")
+        return ', '.join(columns)
+    
+    def get_current_puzzle(self, player_id: int,
+                           columns: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """Get player's current unsolved puzzle (optionally only the given columns)"""
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT * FROM puzzles 
+            cursor.execute(f'''
+                SELECT {self.select_list(columns, PUZZLE_COLUMNS)} FROM puzzles 
                 WHERE player_id = ? 
                 AND status = 'active'
                 ORDER BY created_at DESC
@@ -424,11 +922,13 @@ class Database:
             row = cursor.fetchone()
             return dict(row) if row else None
     
-    def get_puzzle(self, puzzle_id: int) -> Optional[Dict]:
-        """Get puzzle by ID"""
-        with self.get_connection() as conn:
+    def get_puzzle(self, puzzle_id: int, columns: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """Get puzzle by ID (optionally only the given columns)"""
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM puzzles WHERE id = ?', (puzzle_id,))
+            cursor.execute(f'''
+                SELECT {self.select_list(columns, PUZZLE_COLUMNS)} FROM puzzles WHERE id = ?
+            ''', (puzzle_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
     
@@ -439,35 +939,33 @@ class Database:
             cursor.execute('''
                 UPDATE puzzles SET attempts = attempts + 1 WHERE id = ?
             ''', (puzzle_id,))
-            conn.commit()
     
-    def mark_puzzle_solved(self, puzzle_id: int, solved_at: int, solution: str):
-        """Mark puzzle as solved"""
+    def mark_puzzle_solved(self, puzzle_id: int, solved_at: int, solution: str) -> bool:
+        """Mark an active puzzle as solved; False if it was not active any more"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Calculate time spent
-            cursor.execute('SELECT created_at FROM puzzles WHERE id = ?', (puzzle_id,))
-            created_at = cursor.fetchone()['created_at']
-            time_spent = solved_at - created_at
-            
             cursor.execute('''
                 UPDATE puzzles 
                 SET solved_at = ?,
                     solution = ?,
-                    time_spent = ?,
+                    time_spent = ? - created_at,
                     status = 'solved'
-                WHERE id = ?
-            ''', (solved_at, solution, time_spent, puzzle_id))
-            
-            conn.commit()
+                WHERE id = ? AND status = 'active'
+            ''', (solved_at, solution, solved_at, puzzle_id))
+            if not cursor.rowcount:
+                return False
             
             logger.debug(f"Marked puzzle {puzzle_id} as solved")
+        return True
     
     def update_puzzle(self, puzzle_id: int, puzzle_data: str, solution_hash: str, created_at: int):
         """Update puzzle data"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            
+            manifest, hashes = self.blobs.externalize(conn, parse_manifest(puzzle_data))
+            
             cursor.execute('''
                 UPDATE puzzles 
                 SET puzzle_data = ?,
@@ -475,15 +973,83 @@ class Database:
                     created_at = ?,
                     attempts = 0
                 WHERE id = ?
-            ''', (puzzle_data, solution_hash, created_at, puzzle_id))
-            conn.commit()
+            ''', (json.dumps(manifest), solution_hash, created_at, puzzle_id))
+            
+            cursor.execute('DELETE FROM puzzle_blobs WHERE puzzle_id = ?', (puzzle_id,))
+            self.link_puzzle_blobs(conn, puzzle_id, hashes)
+    
+    def link_puzzle_blobs(self, conn: sqlite3.Connection, puzzle_id: int, hashes: List[str]):
+        """Record the blobs a puzzle manifest references"""
+        conn.executemany('''
+            INSERT OR IGNORE INTO puzzle_blobs (puzzle_id, hash) VALUES (?, ?)
+        ''', [(puzzle_id, digest) for digest in hashes])
+    
+    def load_puzzle_data(self, puzzle_data: str, files: Optional[List[str]] = None,
+                         player_id: Optional[int] = None) -> Dict:
+        """Parse a stored puzzle manifest and load its file bodies (all, or only files)
+        
+        player_id (the puzzle's owner) is the shard routing hint used by ShardedDatabase.
+        """
+        manifest = parse_manifest(puzzle_data)
+        with self.get_connection(readonly=True) as conn:
+            return self.blobs.hydrate(conn, manifest, files)
     
-    def get_solved_puzzles(self, player_id: int) -> List[Dict]:
-        """Get all solved puzzles for player"""
+    def externalize_puzzle_blobs(self, batch_size: int = 500) -> int:
+        """Move inline file bodies of older puzzle rows into blobs; returns rows converted"""
+        converted = 0
+        last_id = 0
+        while True:
+            # One short write transaction per batch
+            with self.get_connection() as conn:
+                rows = conn.execute('''
+                    SELECT id, puzzle_data FROM puzzles
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                
+                for row in rows:
+                    original = json.loads(row['puzzle_data'])
+                    manifest, hashes = self.blobs.externalize(conn, original)
+                    if hashes:
+                        conn.execute('UPDATE puzzles SET puzzle_data = ? WHERE id = ?',
+                                     (json.dumps(manifest), row['id']))
+                        self.link_puzzle_blobs(conn, row['id'], hashes)
+                        converted += 1
+                last_id = rows[-1]['id']
+        
+        logger.info(f"Externalized files of {converted} puzzles")
+        return converted
+    
+    def gc_blobs(self) -> int:
+        """Delete blobs no remaining puzzle references; returns blobs removed"""
         with self.get_connection() as conn:
+            conn.execute('''
+                DELETE FROM puzzle_blobs
+                WHERE NOT EXISTS (SELECT 1 FROM puzzles WHERE puzzles.id = puzzle_blobs.puzzle_id)
+            ''')
+            removed = conn.execute('''
+                DELETE FROM blobs
+                WHERE NOT EXISTS (SELECT 1 FROM puzzle_blobs WHERE puzzle_blobs.hash = blobs.hash)
+            ''').rowcount
+        
+        if removed:
+            logger.info(f"Removed {removed} unreferenced puzzle blobs")
+        return removed
+    
+    def get_solved_puzzles(self, player_id: int,
+                           columns: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Get all solved puzzles for player
+        
+        Pass columns=SOLVED_PUZZLE_SUMMARY to read only the covering index
+        instead of every puzzle_data document.
+        """
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM puzzles 
+            cursor.execute(f'''
+                SELECT {self.select_list(columns, PUZZLE_COLUMNS)} FROM puzzles 
                 WHERE player_id = ? 
                 AND status = 'solved'
                 ORDER BY circle_number
@@ -493,7 +1059,7 @@ class Database:
     
     def get_last_challenge_request(self, player_id: int) -> Optional[int]:
         """Get timestamp of last challenge request"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT MAX(created_at) as last_request FROM puzzles 
@@ -527,13 +1093,11 @@ class Database:
                 cheat_detected
             ))
             
-            conn.commit()
-            
             logger.debug(f"Created submission for puzzle {puzzle_id}")
     
     def get_submissions(self, player_id: int, limit: int = 100) -> List[Dict]:
         """Get player's submissions"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM submissions 
@@ -542,7 +1106,9 @@ class Database:
                 LIMIT ?
             ''', (player_id, limit))
             
-            return [dict(row) for row in cursor.fetchall()]
+            rows = [dict(row) for row in cursor.fetchall()]
+        
+        return self.with_archived('submissions', player_id, rows, limit)
 
   # ==================== HARDWARE PROFILE METHODS ====================
     
@@ -563,11 +1129,9 @@ class Database:
                 player_id
             ))
             
-            conn.commit()
-    
     def get_hardware_profile(self, player_id: int) -> Optional[Dict]:
         """Get hardware profile"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM hardware_profiles WHERE player_id = ?', (player_id,))
             row = cursor.fetchone()
@@ -583,7 +1147,47 @@ class Database:
                     consistency_score = consistency_score * 0.8
                 WHERE player_id = ?
             ''', (player_id,))
-            conn.commit()
+    
+    def claim_hardware(self, hardware_fingerprint: str, stale_after: int = 300) -> bool:
+        """Reserve a hardware fingerprint for a registration; False if it is taken
+        
+        Used on shard 0 of a sharded database, where players' UNIQUE
+        constraint only covers one shard. A claim never bound to a player
+        (its registration died midway) is taken over after stale_after seconds.
+        """
+        now = int(time.time())
+        with self.get_connection() as conn:
+            cursor = conn.execute('''
+                INSERT INTO hardware_claims (fingerprint, player_id, created_at)
+                VALUES (?, NULL, ?)
+                ON CONFLICT(fingerprint) DO UPDATE SET created_at = excluded.created_at
+                WHERE player_id IS NULL AND created_at <= ?
+            ''', (hardware_fingerprint, now, now - stale_after))
+            return cursor.rowcount == 1
+    
+    def bind_hardware(self, hardware_fingerprint: str, player_id: int):
+        """Record the player created under a hardware claim"""
+        with self.get_connection() as conn:
+            conn.execute('UPDATE hardware_claims SET player_id = ? WHERE fingerprint = ?',
+                         (player_id, hardware_fingerprint))
+    
+    def release_hardware(self, hardware_fingerprint: Optional[str] = None,
+                         player_ids: Sequence[int] = ()) -> int:
+        """Drop an unbound claim by fingerprint and/or the claims of player_ids"""
+        deleted = 0
+        with self.get_connection() as conn:
+            if hardware_fingerprint is not None:
+                deleted += conn.execute(
+                    'DELETE FROM hardware_claims WHERE fingerprint = ? AND player_id IS NULL',
+                    (hardware_fingerprint,)
+                ).rowcount
+            for start in range(0, len(player_ids), 500):
+                chunk = list(player_ids[start:start + 500])
+                deleted += conn.execute(
+                    f'DELETE FROM hardware_claims WHERE player_id IN ({",".join("?" * len(chunk))})',
+                    chunk
+                ).rowcount
+        return deleted
 
     # ==================== ANTI-CHEAT METHODS ====================
     
@@ -606,13 +1210,11 @@ class Database:
                 action_taken
             ))
             
-            conn.commit()
-            
             logger.warning(f"Logged cheat event: {event_type} for player {player_id}")
     
     def get_cheat_logs(self, player_id: int, limit: int = 50) -> List[Dict]:
         """Get cheat logs for player"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM cheat_logs 
@@ -621,58 +1223,195 @@ class Database:
                 LIMIT ?
             ''', (player_id, limit))
             
-            return [dict(row) for row in cursor.fetchall()]
+            rows = [dict(row) for row in cursor.fetchall()]
+        
+        return self.with_archived('cheat_logs', player_id, rows, limit)
+    
+    # ==================== ARCHIVE METHODS ====================
+    
+    def with_archived(self, table: str, player_id: int, rows: List[Dict], limit: int) -> List[Dict]:
+        """Fill a newest-first page of hot rows up to limit from the archive"""
+        if not self.archive or len(rows) >= limit:
+            return rows
+        
+        # Archived rows are all older than the rows still in the hot table
+        return rows + self.archive.fetch(table, player_id, limit - len(rows),
+                                         exclude_ids=[row['id'] for row in rows])
+    
+    def archive_old_rows(self, max_age: int, batch_size: int = 5000) -> Dict[str, int]:
+        """Move submissions and cheat logs older than max_age seconds to the archive"""
+        if not self.archive:
+            return {}
+        
+        cutoff = int(time.time()) - max_age
+        moved = {}
+        for table, time_column in ARCHIVED_TABLES.items():
+            moved[table] = 0
+            while True:
+                with self.get_connection(readonly=True) as conn:
+                    rows = [dict(row) for row in conn.execute(f'''
+                        SELECT * FROM {table}
+                        WHERE {time_column} < ?
+                        ORDER BY {time_column}
+                        LIMIT ?
+                    ''', (cutoff, batch_size)).fetchall()]
+                if not rows:
+                    break
+                
+                # Archive first: a crash before the delete leaves duplicates,
+                # which reads skip, never lost rows
+                self.archive.append(table, rows)
+                with self.get_connection() as conn:
+                    conn.executemany(f'DELETE FROM {table} WHERE id = ?',
+                                     [(row['id'],) for row in rows])
+                
+                moved[table] += len(rows)
+        
+        if any(moved.values()):
+            logger.info(f"Archived rows older than {max_age}s: {moved}")
+        return moved
     
     # ==================== LEADERBOARD METHODS ====================
     
     def update_leaderboard(self, player_id: int):
-        """Update leaderboard cache for player"""
+        """Refresh a player's leaderboard row from the players table
+        
+        Progress changes already update the row through triggers (migration 5);
+        this is for callers that changed players outside those columns.
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Get player data
-            cursor.execute('''
-                SELECT id, username, progress, total_time FROM players 
-                WHERE id = ?
-            ''', (player_id,))
-            
-            player = cursor.fetchone()
-            if not player:
-                return
-            
-            # Check if player completed all circles
-            cursor.execute('''
-                SELECT COUNT(*) as completed FROM puzzles 
-                WHERE player_id = ? AND status = 'solved'
-            ''', (player_id,))
-            
-            completed = cursor.fetchone()['completed']
-            
-            # Update or insert leaderboard entry
+            # Update leaderboard entry in place
             cursor.execute('''
-                INSERT OR REPLACE INTO leaderboard (player_id, username, progress, 
-                                                   total_time, completed_at, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                player['id'],
-                player['username'],
-                player['progress'],
-                player['total_time'],
-                int(time.time()) if completed >= 12 else None,
-                int(time.time())
-            ))
-            
-            conn.commit()
+                INSERT INTO leaderboard (player_id, username, progress, total_time,
+                                         completed_at, last_updated)
+                SELECT id, username, progress, total_time,
+                       CASE WHEN solved_count >= ? THEN ? END, ?
+                FROM players WHERE id = ?
+                ON CONFLICT(player_id) DO UPDATE SET
+                    username = excluded.username,
+                    progress = excluded.progress,
+                    total_time = excluded.total_time,
+                    completed_at = CASE WHEN excluded.completed_at IS NOT NULL
+                                        THEN COALESCE(leaderboard.completed_at, excluded.completed_at) END,
+                    last_updated = excluded.last_updated
+            ''', (COMPLETION_SOLVED_COUNT, int(time.time()), int(time.time()), player_id))
+            
+            self.sync_rank(conn, player_id)
     
-    def get_leaderboard(self, limit: int = 100, offset: int = 0) -> List[Dict]:
-        """Get leaderboard"""
-        with self.get_connection() as conn:
+    def sync_rank(self, conn: sqlite3.Connection, player_id: int):
+        """Update the in-memory rank index from the player's row once committed"""
+        if not self.ranks:
+            return
+        
+        player = conn.execute('''
+            SELECT progress, total_time, is_active FROM players WHERE id = ?
+        ''', (player_id,)).fetchone()
+        if not player:
+            return
+        
+        if player['is_active']:
+            self.after_commit(self.ranks.update, player_id,
+                              player['progress'], player['total_time'])
+        else:
+            self.after_commit(self.ranks.remove, player_id)
+    
+    def check_leaderboard(self, repair: bool = False) -> Dict[str, int]:
+        """Compare solved counters and leaderboard rows with their source tables
+        
+        Returns the number of drifted rows per check; with repair=True any
+        drift is fixed by rebuild_leaderboard().
+        """
+        with self.get_connection(readonly=True) as conn:
+            drift = dict(conn.execute('''
+                SELECT
+                    (SELECT COUNT(*) FROM players p
+                     WHERE p.solved_count != (SELECT COUNT(*) FROM puzzles
+                                              WHERE player_id = p.id AND status = 'solved'))
+                        AS solved_count,
+                    (SELECT COUNT(*) FROM leaderboard l JOIN players p ON p.id = l.player_id
+                     WHERE l.username != p.username
+                        OR l.progress != p.progress
+                        OR l.total_time != p.total_time
+                        OR (l.completed_at IS NOT NULL) != (p.solved_count >= ?))
+                        AS stale_rows,
+                    (SELECT COUNT(*) FROM players p
+                     WHERE p.progress > 0
+                       AND NOT EXISTS (SELECT 1 FROM leaderboard WHERE player_id = p.id))
+                        AS missing_rows,
+                    (SELECT COUNT(*) FROM leaderboard l
+                     WHERE NOT EXISTS (SELECT 1 FROM players WHERE id = l.player_id))
+                        AS orphan_rows
+            ''', (COMPLETION_SOLVED_COUNT,)).fetchone())
+        
+        if any(drift.values()):
+            logger.warning(f"Leaderboard drift detected: {drift}")
+            if repair:
+                self.rebuild_leaderboard()
+        return drift
+    
+    def rebuild_leaderboard(self) -> int:
+        """Recompute solved counters and leaderboard rows from players and puzzles"""
+        now = int(time.time())
+        with self.transaction(), self.get_connection() as conn:
+            if self.session_cache is not None:
+                self.after_commit(self.session_cache.clear)
+            conn.execute('''
+                UPDATE players SET solved_count = (
+                    SELECT COUNT(*) FROM puzzles
+                    WHERE player_id = players.id AND status = 'solved'
+                )
+                WHERE solved_count != (
+                    SELECT COUNT(*) FROM puzzles
+                    WHERE player_id = players.id AND status = 'solved'
+                )
+            ''')
+            conn.execute('''
+                DELETE FROM leaderboard
+                WHERE NOT EXISTS (SELECT 1 FROM players WHERE id = leaderboard.player_id)
+            ''')
+            rows = conn.execute('''
+                INSERT INTO leaderboard (player_id, username, progress, total_time,
+                                         completed_at, last_updated)
+                SELECT id, username, progress, total_time,
+                       CASE WHEN solved_count >= ? THEN ? END, ?
+                FROM players
+                WHERE progress > 0 OR id IN (SELECT player_id FROM leaderboard)
+                ON CONFLICT(player_id) DO UPDATE SET
+                    username = excluded.username,
+                    progress = excluded.progress,
+                    total_time = excluded.total_time,
+                    completed_at = CASE WHEN excluded.completed_at IS NOT NULL
+                                        THEN COALESCE(leaderboard.completed_at, excluded.completed_at) END,
+                    last_updated = excluded.last_updated
+            ''', (COMPLETION_SOLVED_COUNT, now, now)).rowcount
+        
+        logger.info(f"Rebuilt leaderboard ({rows} rows)")
+        return rows
+    
+    def get_leaderboard(self, limit: int = 100, offset: int = 0,
+                        columns: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Get leaderboard
+        
+        With a projection, players is only joined when last_active is asked
+        for; LEADERBOARD_SUMMARY is served from idx_leaderboard_summary alone.
+        """
+        if columns is None:
+            select, join = 'l.*, p.last_active', True
+        else:
+            self.select_list(columns, LEADERBOARD_COLUMNS)  # Validates the projection
+            join = 'last_active' in columns
+            select = ', '.join('p.last_active' if column == 'last_active' else f'l.{column}'
+                               for column in columns)
+        
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT l.*, p.last_active 
+            cursor.execute(f'''
+                SELECT {select} 
                 FROM leaderboard l
-                JOIN players p ON l.player_id = p.id
+                {'JOIN players p ON l.player_id = p.id' if join else ''}
                 ORDER BY l.progress DESC, l.total_time ASC, l.completed_at ASC
                 LIMIT ? OFFSET ?
             ''', (limit, offset))
@@ -681,7 +1420,7 @@ class Database:
     
     def get_total_players(self) -> int:
         """Get total number of active players"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT COUNT(*) as count FROM players WHERE is_active = 1')
             return cursor.fetchone()['count']
@@ -698,34 +1437,113 @@ class Database:
                 VALUES (?, ?, ?)
             ''', (metric, value, int(time.time())))
             
-            conn.commit()
-    
     def get_statistic(self, metric: str) -> Optional[int]:
         """Get statistic value"""
-        with self.get_connection() as conn:
+        with self.get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT value FROM statistics WHERE metric = ?', (metric,))
             row = cursor.fetchone()
             return row['value'] if row else None
     
+    def get_statistics(self, metrics: List[str]) -> Dict[str, int]:
+        """Get several statistics, including unflushed counter deltas"""
+        # A concurrent flush moves deltas into the table; wait for it to commit
+        with self.statistics_buffer.flush_lock:
+            with self.get_connection(readonly=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f'SELECT metric, value FROM statistics WHERE metric IN ({",".join("?" * len(metrics))})',
+                    metrics
+                )
+                values = {row['metric']: row['value'] for row in cursor.fetchall()}
+            
+            return {
+                metric: values.get(metric, 0) + self.statistics_buffer.peek(metric)
+                for metric in metrics
+            }
+    
     def increment_statistic(self, metric: str, amount: int = 1):
-        """Increment statistic"""
-        current = self.get_statistic(metric) or 0
-        self.update_statistic(metric, current + amount)
+        """Increment statistic atomically"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO statistics (metric, value, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(metric) DO UPDATE SET
+                    value = value + excluded.value,
+                    updated_at = excluded.updated_at
+            ''', (metric, amount, int(time.time())))
+    
+    def count_statistic(self, metric: str, amount: int = 1):
+        """Increment statistic in memory (buffered, see flush_statistics)"""
+        self.statistics_buffer.add(metric, amount)
+    
+    def flush_statistics(self) -> int:
+        """Write buffered counter deltas in one transaction
+        
+        Takes the buffer's flush lock before the writer, so do not call it
+        from inside a write block.
+        """
+        with self.statistics_buffer.flush_lock:
+            pending = self.statistics_buffer.drain()
+            if not pending:
+                return 0
+            
+            now = int(time.time())
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.executemany('''
+                        INSERT INTO statistics (metric, value, updated_at)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(metric) DO UPDATE SET
+                            value = value + excluded.value,
+                            updated_at = excluded.updated_at
+                    ''', [(metric, amount, now) for metric, amount in pending.items()])
+            except sqlite3.Error:
+                self.statistics_buffer.restore()
+                raise
+            self.statistics_buffer.committed()
+        
+        logger.debug(f"Flushed {len(pending)} statistics counters")
+        return len(pending)
     
     # ==================== UTILITY METHODS ====================
     
-    def backup(self, backup_path: str):
-        """Create database backup"""
-        import shutil
-        shutil.copy2(self.db_path, backup_path)
+    def backup(self, backup_path: str, pages_per_step: int = 1024,
+               step_pause: float = 0.005) -> Dict[str, int]:
+        """Create an online backup; returns row counts of the copied snapshot"""
+        src = sqlite3.connect(self.db_path, isolation_level=None)
+        dst = sqlite3.connect(backup_path)
+        try:
+            # A read transaction pins one WAL snapshot, so concurrent writes
+            # neither block the copy nor force it to restart between steps
+            src.execute('BEGIN')
+            cursor = src.execute('''
+                SELECT name FROM sqlite_master
+                WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            ''')
+            tables = [row[0] for row in cursor.fetchall()]
+            
+            src.backup(dst, pages=pages_per_step,
+                       progress=lambda status, remaining, total: time.sleep(step_pause))
+            
+            row_counts = {
+                table: src.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                for table in tables
+            }
+            src.execute('COMMIT')
+        finally:
+            dst.close()
+            src.close()
+        
         logger.info(f"Database backed up to {backup_path}")
+        return row_counts
     
     def vacuum(self):
         """Optimize database"""
         with self.get_connection() as conn:
             conn.execute('VACUUM')
-            conn.commit()
             logger.info("Database vacuumed")
     
     def get_database_size(self) -> int:
@@ -734,33 +1552,81 @@ class Database:
     
     def record_completion(self, player_id: int, final_flag: str, total_time: int):
         """Record player completion"""
+        now = int(time.time())
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Add final flag to achievements
-            cursor.execute('SELECT achievements FROM players WHERE id = ?', (player_id,))
-            achievements = json.loads(cursor.fetchone()['achievements'])
-            achievements.append({
-                'type': 'completion',
-                'flag': final_flag,
-                'completed_at': int(time.time()),
-                'total_time': total_time
-            })
-            
+            # Append the final flag and stamp metadata in place (JSON1), so
+            # concurrent achievement writes are not lost
             cursor.execute('''
                 UPDATE players 
-                SET achievements = ?,
-                    current_circle = 13,  # Completed state
+                SET achievements = json_insert(COALESCE(achievements, '[]'), '$[#]', json(?)),
+                    metadata = json_set(COALESCE(metadata, '{}'),
+                                        '$.completed_at', ?, '$.completion_time', ?),
+                    current_circle = 13,  -- Completed state
                     last_active = ?
                 WHERE id = ?
-            ''', (json.dumps(achievements), int(time.time()), player_id))
+            ''', (
+                json.dumps({
+                    'type': 'completion',
+                    'flag': final_flag,
+                    'completed_at': now,
+                    'total_time': total_time
+                }),
+                now,
+                total_time,
+                now,
+                player_id
+            ))
             
-            conn.commit()
+            self.forget_cached_sessions(player_id)
             
             logger.info(f"Recorded completion for player {player_id}")
+    
+    def add_achievement(self, player_id: int, achievement: Dict):
+        """Append an achievement to the player's achievements array in place"""
+        with self.get_connection() as conn:
+            conn.execute('''
+                UPDATE players
+                SET achievements = json_insert(COALESCE(achievements, '[]'), '$[#]', json(?))
+                WHERE id = ?
+            ''', (json.dumps(achievement), player_id))
+            self.forget_cached_sessions(player_id)
+    
+    def update_player_metadata(self, player_id: int, values: Dict[str, Any]):
+        """Set top-level metadata keys in place, leaving other keys untouched"""
+        if not values:
+            return
+        # json_set(metadata, '$."key"', json(value), ...) for every key
+        paths = ', '.join("?, json(?)" for _ in values)
+        params = []
+        for key, value in values.items():
+            if '"' in key or '\\' in key:
+                raise ValueError(f"Unsupported metadata key: {key!r}")
+            params += [f'$."{key}"', json.dumps(value)]
+        
+        with self.get_connection() as conn:
+            conn.execute(f'''
+                UPDATE players
+                SET metadata = json_set(COALESCE(metadata, '{{}}'), {paths})
+                WHERE id = ?
+            ''', (*params, player_id))
+            self.forget_cached_sessions(player_id)
+    
+    def get_completions(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Get players who completed every circle, earliest first"""
+        with self.get_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, username, completed_at, total_time FROM players
+                WHERE completed_at IS NOT NULL
+                ORDER BY completed_at
+                LIMIT ? OFFSET ?
+            ''', (limit, offset))
+            
+            return [dict(row) for row in cursor.fetchall()]
 
 # Test the database
 if __name__ == "__main__":
     db = Database("test.db")
     print("Database test completed")
-```
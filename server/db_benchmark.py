@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# chimera-vx/server/db_benchmark.py
+# Database micro-benchmarks for Chimera-VX
+#
+# Usage:
+#   python db_benchmark.py rank --players 100000 1000000
+#   python db_benchmark.py indexes --players 100000
+#   python db_benchmark.py submit --players 10000
+#   python db_benchmark.py projection --players 20000
+#   python db_benchmark.py shards --shards 1 4 16 --threads 16
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from database import Database, SOLVED_PUZZLE_SUMMARY, LEADERBOARD_SUMMARY
+from sharded_database import ShardedDatabase
+
+# ==================== HELPERS ====================
+
+def seed_players(db: Database, count: int, seed: int = 42):
+    """Insert count players with a realistic progress/time spread"""
+    rng = random.Random(seed)
+    now = int(time.time())
+    rows = []
+    for i in range(count):
+        # Most players stall in the early circles
+        progress = min(int(rng.expovariate(0.35)), 12)
+        total_time = progress * rng.randint(3600, 36000)
+        rows.append((f"bench_{i}", f"bench_{i}@example.com", f"hw_{i}",
+                     progress, progress + 1, total_time, now, now))
+
+    with db.get_connection() as conn:
+        conn.executemany('''
+            INSERT INTO players (username, email, hardware_fingerprint, progress,
+                                 current_circle, total_time, created_at, last_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+def seed_event(db: Database, players: int, seed: int = 42, submissions_per_puzzle: int = 1,
+               puzzle_bytes: int = 256):
+    """Seed players plus puzzles, submissions, sessions, cheat logs and leaderboard"""
+    seed_players(db, players, seed)
+    rng = random.Random(seed)
+    now = int(time.time())
+    puzzle_types = ['quantum', 'dna', 'radio', 'fpga', 'minecraft', 'usb',
+                    'temporal', 'cryptographic', 'hardware', 'forensic', 'network', 'meta']
+
+    with db.get_connection() as conn:
+        players_rows = conn.execute(
+            'SELECT id, username, progress, total_time FROM players'
+        ).fetchall()
+
+        puzzles, sessions, profiles, cheats, leaderboard = [], [], [], [], []
+        for player in players_rows:
+            pid, progress = player['id'], player['progress']
+            created = now - progress * 7200
+            for circle in range(1, progress + 2):
+                solved = circle <= progress
+                puzzles.append((pid, circle, puzzle_types[min(circle, 12) - 1],
+                                json.dumps({'circle': circle, 'blob': 'x' * puzzle_bytes}),
+                                f"hash_{pid}_{circle}", rng.randint(0, 5),
+                                created + circle * 3600,
+                                created + circle * 3600 + 1800 if solved else None,
+                                'solved' if solved else 'active'))
+            sessions.append((pid, f"bench_session_{pid}", '127.0.0.1', now, now, now + 86400))
+            profiles.append((pid, json.dumps({'fingerprint': f"hw_{pid}"}), now, now))
+            if rng.random() < 0.05:
+                cheats.append((pid, 'timing_anomaly', 2, '{}', now - rng.randint(0, 86400)))
+            leaderboard.append((pid, player['username'], progress, player['total_time'], now))
+
+        conn.executemany('''
+            INSERT INTO puzzles (player_id, circle_number, type, puzzle_data, solution_hash,
+                                 attempts, created_at, solved_at, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', puzzles)
+        conn.execute('''
+            WITH RECURSIVE attempt(n) AS (
+                SELECT 1 UNION ALL SELECT n + 1 FROM attempt WHERE n < ?
+            )
+            INSERT INTO submissions (player_id, puzzle_id, submission, is_correct, submitted_at)
+            SELECT player_id, id, 'FLAG{bench}', status = 'solved' AND n = ?, created_at + n * 60
+            FROM puzzles, attempt
+        ''', (submissions_per_puzzle, submissions_per_puzzle))
+        conn.executemany('''
+            INSERT INTO sessions (player_id, session_hash, ip_address, created_at, last_used, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', sessions)
+        conn.executemany('''
+            INSERT INTO hardware_profiles (player_id, profile_data, created_at, last_verified)
+            VALUES (?, ?, ?, ?)
+        ''', profiles)
+        conn.executemany('''
+            INSERT INTO cheat_logs (player_id, event_type, severity, details, detected_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', cheats)
+        # Rows already created by the leaderboard triggers (schema v5+) are kept
+        conn.executemany('''
+            INSERT OR IGNORE INTO leaderboard (player_id, username, progress, total_time, last_updated)
+            VALUES (?, ?, ?, ?, ?)
+        ''', leaderboard)
+        conn.execute('ANALYZE')
+
+def time_calls(func: Callable, args: List, repeat: int = 1) -> Dict:
+    """Time func(*a) for every a in args; returns latency stats in ms"""
+    samples = []
+    for _ in range(repeat):
+        for a in args:
+            start = time.perf_counter()
+            func(*a)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'calls': len(samples),
+        'mean_ms': statistics.fmean(samples),
+        'p50_ms': samples[len(samples) // 2],
+        'p99_ms': samples[min(int(len(samples) * 0.99), len(samples) - 1)]
+    }
+
+def peak_memory(func: Callable, args: List) -> float:
+    """Largest traced allocation peak (KiB) of a single func(*a) call"""
+    peaks = []
+    for a in args:
+        tracemalloc.start()
+        func(*a)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+    return max(peaks)
+
+def print_result(label: str, result: Dict):
+    print(f"  {label:<42} mean {result['mean_ms']:9.3f} ms   "
+          f"p50 {result['p50_ms']:9.3f} ms   p99 {result['p99_ms']:9.3f} ms")
+
+# ==================== BENCHMARKS ====================
+
+def bench_rank(players: int, lookups: int):
+    """Compare rank lookup strategies"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        seed_players(db, players)
+        player_ids = [(random.randint(1, players),) for _ in range(lookups)]
+
+        def full_scan(player_id: int):
+            # Pre-rank-service implementation, kept as the baseline
+            with db.get_connection(readonly=True) as conn:
+                rows = conn.execute('''
+                    SELECT id FROM players WHERE is_active = 1
+                    ORDER BY progress DESC, total_time ASC
+                ''').fetchall()
+                for i, row in enumerate(rows, 1):
+                    if row['id'] == player_id:
+                        return i
+
+        start = time.perf_counter()
+        db.ranks.ensure_loaded(db.load_rank_rows)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        print(f"\nRank lookup, {players} players ({lookups} lookups)")
+        print_result("full scan (legacy)", time_calls(full_scan, player_ids[:max(lookups // 20, 1)]))
+
+        ranks, db.ranks = db.ranks, None
+        print_result("indexed COUNT(*)", time_calls(db.get_player_rank, player_ids))
+        db.ranks = ranks
+
+        print_result("rank service", time_calls(db.get_player_rank, player_ids))
+        print(f"  rank service build: {build_ms:.0f} ms")
+
+        db.ranks.update(1, 12, 0)
+        print_result("rank service update", time_calls(
+            db.ranks.update, [(pid, random.randint(0, 12), random.randint(0, 10**6))
+                              for (pid,) in player_ids]
+        ))
+        db.close()
+
+def bench_indexes(players: int, lookups: int, submissions_per_puzzle: int):
+    """Hot query latency before and after the composite index migration"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Schema version 1 is the pre-composite (single-column) index set
+        db = Database(str(Path(tmp) / "bench.db"), schema_version=1)
+        seed_event(db, players, submissions_per_puzzle=submissions_per_puzzle)
+
+        # One heavy player with a long submission history
+        with db.get_connection() as conn:
+            conn.execute('''
+                WITH RECURSIVE attempt(n) AS (
+                    SELECT 1 UNION ALL SELECT n + 1 FROM attempt WHERE n < 20000
+                )
+                INSERT INTO submissions (player_id, puzzle_id, submission, is_correct, submitted_at)
+                SELECT 1, 1, 'FLAG{bench}', 0, n FROM attempt
+            ''')
+        player_ids = [(random.randint(1, players),) for _ in range(lookups)]
+
+        queries = {
+            'get_current_puzzle': db.get_current_puzzle,
+            'get_solved_puzzles': db.get_solved_puzzles,
+            'get_submissions': db.get_submissions,
+            'get_cheat_logs': db.get_cheat_logs,
+            'get_leaderboard': lambda _: db.get_leaderboard(100, 0),
+            'get_submissions (heavy player)': lambda _: db.get_submissions(1),
+        }
+
+        print(f"\nHot queries, {players} players, {submissions_per_puzzle} submissions "
+              f"per puzzle ({lookups} lookups)")
+        before = {name: time_calls(func, player_ids) for name, func in queries.items()}
+
+        start = time.perf_counter()
+        db.migrate()
+        migrate_ms = (time.perf_counter() - start) * 1000
+
+        after = {name: time_calls(func, player_ids) for name, func in queries.items()}
+        for name in queries:
+            print_result(f"{name} (before)", before[name])
+            print_result(f"{name} (after)", after[name])
+        print(f"  migration to schema v{db.get_schema_version()}: {migrate_ms:.0f} ms")
+        db.close()
+
+def bench_submit(players: int, submits: int):
+    """Correct-submission write path: one commit per call vs one unit of work"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # FULL syncs every commit, which is where separate commits hurt
+        db = Database(str(Path(tmp) / "bench.db"), pragmas={'synchronous': 'FULL'})
+        seed_event(db, players)
+        with db.get_connection(readonly=True) as conn:
+            active = [(row['id'], row['player_id']) for row in conn.execute('''
+                SELECT id, player_id FROM puzzles WHERE status = 'active' LIMIT ?
+            ''', (submits * 2,)).fetchall()]
+        
+        def outcome(db: Database, puzzle_id: int, player_id: int):
+            db.increment_puzzle_attempts(puzzle_id)
+            db.mark_puzzle_solved(puzzle_id, int(time.time()), 'FLAG{bench}')
+            db.update_player_progress(player_id, 2, 60)
+        
+        print(f"\nSubmit path, {players} players ({submits} correct submissions, synchronous=FULL)")
+        print_result("separate commits", time_calls(
+            lambda puzzle_id, player_id: outcome(db, puzzle_id, player_id),
+            active[:submits]
+        ))
+        print_result("unit of work", time_calls(
+            lambda puzzle_id, player_id: db.unit_of_work(
+                lambda uow: outcome(uow, puzzle_id, player_id)),
+            active[submits:]
+        ))
+        db.close()
+
+def bench_projection(players: int, lookups: int, puzzle_bytes: int):
+    """Listing queries with full rows vs narrow summary projections"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        seed_event(db, players, puzzle_bytes=puzzle_bytes)
+        with db.get_connection(readonly=True) as conn:
+            # Players far along the circles, where the progress page is heaviest
+            veterans = [(row['id'],) for row in conn.execute('''
+                SELECT id FROM players ORDER BY progress DESC LIMIT ?
+            ''', (lookups,))]
+        
+        queries = {
+            'get_solved_puzzles': (
+                lambda pid: db.get_solved_puzzles(pid),
+                lambda pid: db.get_solved_puzzles(pid, columns=SOLVED_PUZZLE_SUMMARY)
+            ),
+            'get_leaderboard(100)': (
+                lambda _: db.get_leaderboard(100, 0),
+                lambda _: db.get_leaderboard(100, 0, columns=LEADERBOARD_SUMMARY)
+            ),
+        }
+        
+        print(f"\nProjections, {players} players, {puzzle_bytes}-byte puzzle_data "
+              f"({len(veterans)} lookups)")
+        for name, (full, summary) in queries.items():
+            for label, func in (('full rows', full), ('summary', summary)):
+                print_result(f"{name} ({label})", time_calls(func, veterans))
+                print(f"  {'':<42} peak {peak_memory(func, veterans[:50]):9.1f} KiB per call")
+        db.close()
+
+def bench_shards(players: int, shard_counts: List[int], threads: int, duration: float):
+    """Submit throughput with writer threads spread over 1..N shard files"""
+    print(f"\nSubmit throughput, {players} players, {threads} writer threads, "
+          f"{duration:.0f} s per run (synchronous=FULL)")
+    for shards in shard_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = ShardedDatabase(str(Path(tmp) / "bench.db"), shards=shards,
+                                 pragmas={'synchronous': 'FULL'})
+            now = int(time.time())
+            targets = []
+            for i in range(players):
+                player_id = db.create_player(f"bench_{i}", f"bench_{i}@example.com", f"hw_{i}")
+                puzzle_id = db.create_puzzle(player_id, 1, 'quantum', '{}', f"hash_{i}", now)
+                targets.append((player_id, puzzle_id))
+            
+            def submit(shard: Database, player_id: int, puzzle_id: int):
+                shard.increment_puzzle_attempts(puzzle_id)
+                shard.create_submission(player_id, puzzle_id, 'FLAG{bench}', False)
+                shard.update_player_progress(player_id, 1, 60)
+            
+            samples: List[List[float]] = [[] for _ in range(threads)]
+            deadline = time.perf_counter() + duration
+            
+            def worker(index: int):
+                rng = random.Random(index)
+                while time.perf_counter() < deadline:
+                    player_id, puzzle_id = rng.choice(targets)
+                    start = time.perf_counter()
+                    db.unit_of_work(lambda shard: submit(shard, player_id, puzzle_id),
+                                    player_id=player_id)
+                    samples[index].append((time.perf_counter() - start) * 1000)
+            
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            
+            latencies = sorted(sample for thread_samples in samples for sample in thread_samples)
+            print(f"  {shards:>2} shards{'':<33} {len(latencies) / elapsed:9.0f} submits/s   "
+                  f"p50 {latencies[len(latencies) // 2]:9.3f} ms   "
+                  f"p99 {latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]:9.3f} ms")
+            db.close()
+
+# ==================== MAIN ====================
+
+def main():
+    parser = argparse.ArgumentParser(description="Chimera-VX database benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    rank = subparsers.add_parser('rank', help='get_player_rank strategies')
+    rank.add_argument('--players', type=int, nargs='+', default=[100000, 1000000])
+    rank.add_argument('--lookups', type=int, default=200)
+
+    indexes = subparsers.add_parser('indexes', help='composite index migration before/after')
+    indexes.add_argument('--players', type=int, nargs='+', default=[100000])
+    indexes.add_argument('--lookups', type=int, default=500)
+    indexes.add_argument('--submissions-per-puzzle', type=int, default=25)
+
+    submit = subparsers.add_parser('submit', help='submit path commits vs unit of work')
+    submit.add_argument('--players', type=int, nargs='+', default=[10000])
+    submit.add_argument('--submits', type=int, default=500)
+
+    projection = subparsers.add_parser('projection', help='full rows vs summary projections')
+    projection.add_argument('--players', type=int, nargs='+', default=[20000])
+    projection.add_argument('--lookups', type=int, default=500)
+    projection.add_argument('--puzzle-bytes', type=int, default=8192)
+
+    shards = subparsers.add_parser('shards', help='submit throughput at several shard counts')
+    shards.add_argument('--players', type=int, nargs='+', default=[2000])
+    shards.add_argument('--shards', type=int, nargs='+', default=[1, 4, 16])
+    shards.add_argument('--threads', type=int, default=16)
+    shards.add_argument('--duration', type=float, default=5.0)
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'rank':
+        for players in args.players:
+            bench_rank(players, args.lookups)
+    elif args.benchmark == 'indexes':
+        for players in args.players:
+            bench_indexes(players, args.lookups, args.submissions_per_puzzle)
+    elif args.benchmark == 'projection':
+        for players in args.players:
+            bench_projection(players, args.lookups, args.puzzle_bytes)
+    elif args.benchmark == 'submit':
+        for players in args.players:
+            bench_submit(players, args.submits)
+    elif args.benchmark == 'shards':
+        for players in args.players:
+            bench_shards(players, args.shards, args.threads, args.duration)
+
+if __name__ == "__main__":
+    main()
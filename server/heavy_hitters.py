@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# chimera-vx/server/heavy_hitters.py
+# Fixed-memory frequency estimates and top-k heavy hitters for Chimera-VX
+#
+# CountMinSketch keeps depth rows of width counters; a key increments one
+# counter per row (double hashing) and its estimate is the row minimum, which
+# never undercounts and overcounts by about total / width with high
+# probability. HeavyHitters pairs a sketch with the k keys of highest
+# estimate, so per-client traffic is tracked in memory independent of the
+# number of distinct clients. Counts decay by half every half_life seconds,
+# so they follow recent traffic rather than all-time totals.
+
+import ipaddress
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def subnet_of(ip_address: str) -> str:
+    """Aggregation subnet of an address: /24 for IPv4, /48 for IPv6"""
+    if ':' not in ip_address:
+        return ip_address.rsplit('.', 1)[0] + '.0/24'
+    try:
+        return str(ipaddress.ip_network(f"{ip_address}/48", strict=False))
+    except ValueError:
+        return ip_address
+
+
+class CountMinSketch:
+    """Approximate counts of string keys in depth x width counters"""
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows: List[List[int]] = [[0] * width for _ in range(depth)]
+        self.total = 0
+
+    def _indexes(self, key: str) -> List[int]:
+        data = key.encode()
+        h1 = zlib.crc32(data)
+        h2 = zlib.adler32(data) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count key; returns its new estimate"""
+        estimate = None
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        self.total += count
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def decay(self, shift: int = 1):
+        """Divide every counter by 2**shift"""
+        for row in self.rows:
+            for index, value in enumerate(row):
+                if value:
+                    row[index] = value >> shift
+        self.total >>= shift
+
+
+class HeavyHitters:
+    """Top-k keys by decayed count, backed by a count-min sketch"""
+
+    def __init__(self, k: int = 50, width: int = 4096, depth: int = 4,
+                 half_life: float = 60):
+        self.k = k
+        self.half_life = half_life
+        self.sketch = CountMinSketch(width, depth)
+        self.top: Dict[str, int] = {}  # key -> estimate when last counted
+        self.floor = 0  # Smallest estimate in a full top-k
+        self.decayed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, key: str, count: int = 1, now: Optional[float] = None) -> int:
+        """Count key; returns its decayed estimate"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if now - self.decayed_at >= self.half_life:
+                self._decay(now)
+            estimate = self.sketch.add(key, count)
+            if key in self.top:
+                self.top[key] = estimate
+            elif len(self.top) < self.k:
+                self.top[key] = estimate
+                if len(self.top) == self.k:
+                    self.floor = min(self.top.values())
+            elif estimate > self.floor:
+                # Refresh the floor from the sketch before evicting
+                for member in self.top:
+                    self.top[member] = self.sketch.estimate(member)
+                weakest = min(self.top, key=self.top.get)
+                if estimate > self.top[weakest]:
+                    del self.top[weakest]
+                    self.top[key] = estimate
+                self.floor = min(self.top.values())
+            return estimate
+
+    def _decay(self, now: float):
+        halvings = int((now - self.decayed_at) // self.half_life)
+        self.sketch.decay(min(halvings, 63))
+        self.decayed_at += halvings * self.half_life
+        self.top = {key: self.sketch.estimate(key) for key in self.top}
+        self.top = {key: count for key, count in self.top.items() if count}
+        self.floor = min(self.top.values()) if len(self.top) >= self.k else 0
+
+    def estimate(self, key: str) -> int:
+        with self.lock:
+            return self.sketch.estimate(key)
+
+    def heaviest(self, n: int = 10) -> List[Tuple[str, int]]:
+        """The n heaviest keys with their current estimates"""
+        with self.lock:
+            if time.monotonic() - self.decayed_at >= self.half_life:
+                self._decay(time.monotonic())
+            counts = [(key, self.sketch.estimate(key)) for key in self.top]
+        counts.sort(key=lambda item: item[1], reverse=True)
+        return counts[:n]
+
+    def __len__(self) -> int:
+        return len(self.top)
@@ -11,6 +11,8 @@ import secrets
 import base64
 import time
 import sqlite3
+import signal
+import sys
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -18,9 +20,17 @@ from typing import Dict, List, Optional, Any
 import traceback
 
 # Local imports
-from database import Database
+from database import Database, WriteConflict, SOLVED_PUZZLE_SUMMARY, LEADERBOARD_SUMMARY
+from async_database import AsyncDatabase
+from sharded_database import ShardedDatabase
+from sharding import shard_path
+from shared_state import SharedState
+from supervisor import Supervisor, LeaderElection
+from session_tokens import TokenSigner, RevocationSet, is_signed_token, token_clock
+from backup_manager import BackupManager
 from package_generator import PackageGenerator
 from verification import VerificationEngine
+from compute_pool import ComputePool, ComputeTimeout
 from anti_cheat import AntiCheatSystem
 
 # Configure logging
@@ -37,43 +47,119 @@ logger = logging.getLogger(__name__)
 class ChimeraServer:
     """Main server class for Chimera-VX CTF"""
     
-    def __init__(self, config_path: str = "config/server_config.json"):
-        self.config = self.load_config(config_path)
-        self.db = Database(self.config['database']['path'])
+    def __init__(self, config_path: str = "config/server_config.json",
+                 worker: Optional[int] = None, config: Optional[Dict] = None):
+        # Workers are handed the supervisor's config so they share its secret key
+        self.config = config or self.load_config(config_path)
+        self.worker = worker  # Index under the supervisor; None when running alone
+        workers = self.config['server']['workers']
+        if workers > 1:
+            if self.config['database']['rank_index']:
+                # In-memory ranks would miss other workers' score changes
+                logger.info("Multiple workers: using indexed COUNT ranks instead of rank_index")
+                self.config['database']['rank_index'] = False
+            if self.config['database']['session_cache_size']:
+                # Invalidations (progress, session cap, purges) only reach the writing worker
+                logger.info("Multiple workers: session cache disabled")
+                self.config['database']['session_cache_size'] = 0
+            if not self.config['security']['shared_state']:
+                logger.warning("Multiple workers without security.shared_state: "
+                               "rate limits, bans and cooldowns are per worker")
+        # Node-wide background jobs run in one worker at a time
+        self.leader = LeaderElection(
+            str(Path(self.config['paths']['data_dir']) / 'leader.lock')
+        )
+        shards = self.config['database']['shards']
+        self.db = AsyncDatabase(
+            ShardedDatabase(
+                self.config['database']['path'],
+                shards=shards,
+                pool_size=self.config['database']['pool_size'],
+                rank_index=self.config['database']['rank_index'],
+                query_metrics=self.config['database']['query_metrics'],
+                archive_path=self.config['database']['archive_path'],
+                session_cache_size=self.config['database']['session_cache_size'],
+                session_cache_ttl=self.config['database']['session_cache_ttl'],
+                max_sessions_per_player=self.config['server']['max_sessions_per_player']
+            ),
+            reader_threads=self.config['database']['pool_size']
+        )
+        # One backup set per shard file (shard 0 keeps the unsharded layout)
+        self.backups = [
+            BackupManager(
+                shard,
+                backup_dir=shard_path(self.config['database']['backup_dir'], index),
+                retention=self.config['database']['backup_retention'],
+                pages_per_step=self.config['database']['backup_pages_per_step']
+            )
+            for index, shard in enumerate(self.db.db.shards)
+        ]
         self.generator = PackageGenerator(self.config)
         self.verifier = VerificationEngine(self.config)
+        # Generation and verification are CPU-bound: run them in worker processes
+        self.compute = ComputePool.from_config(self.generator, self.verifier, self.config)
+        # Rate limits, bans and cooldowns (shared by all workers if configured)
+        self.shared_state = SharedState.from_config(self.config['security'])
         self.anti_cheat = AntiCheatSystem(self.config)
         
+        # Signed session tokens (None keeps opaque, database-backed sessions)
+        self.tokens = None
+        if self.config['security']['session_tokens'] == 'signed':
+            self.tokens = TokenSigner(
+                self.config['server']['secret_key'],
+                lifetime=self.config['server']['session_timeout'],
+                key_version=self.config['security']['token_key_version'],
+                min_key_version=self.config['security']['token_min_key_version']
+            )
+        self.revocations = RevocationSet()
+        
         # Server state
         self.active_sessions: Dict[str, Dict] = {}
         self.puzzle_cache: Dict[str, bytes] = {}
-        self.rate_limits: Dict[str, List[float]] = {}
-        
-        # Statistics
-        self.stats = {
-            'players_registered': 0,
-            'puzzles_generated': 0,
-            'solutions_submitted': 0,
-            'flags_captured': 0,
-            'cheat_attempts': 0
-        }
+        
+        # Statistics (persisted counters in the statistics table)
+        self.stat_metrics = [
+            'players_registered',
+            'puzzles_generated',
+            'solutions_submitted',
+            'flags_captured',
+            'cheat_attempts'
+        ]
         
         logger.info("Chimera-VX Server initialized")
         
-    def load_config(self, config_path: str) -> Dict:
+    @staticmethod
+    def load_config(config_path: str) -> Dict:
         """Load server configuration"""
         default_config = {
             'server': {
                 'host': '0.0.0.0',
                 'port': 8080,
+                'workers': 1,  # Worker processes sharing the port (SO_REUSEPORT); 1 = no supervisor
                 'debug': False,
                 'secret_key': secrets.token_hex(32),
                 'session_timeout': 86400,  # 24 hours
+                'max_sessions_per_player': 5,  # Oldest sessions evicted beyond this; 0 = no cap
                 'max_players': 1000
             },
             'database': {
                 'path': 'data/chimera.db',
-                'backup_interval': 3600  # 1 hour
+                'shards': 1,  # Player shard files (see sharding.py; change with reshard.py)
+                'backup_interval': 3600,  # 1 hour
+                'backup_dir': 'backups',
+                'backup_retention': {'hourly': 24, 'daily': 7, 'weekly': 4},
+                'backup_pages_per_step': 1024,
+                'pool_size': 4,  # Reader connections / threads
+                'activity_flush_interval': 5,  # seconds
+                'statistics_flush_interval': 10,  # seconds
+                'rank_index': True,  # In-memory ranks; False uses indexed COUNT
+                'query_metrics': False,  # Per-method timing, exported on /metrics
+                'archive_path': 'data/chimera_archive.db',  # None disables archival
+                'archive_after': 1209600,  # Archive submissions/cheat logs after 14 days
+                'archive_interval': 3600,  # seconds
+                'session_cache_size': 10000,  # Cached authenticated sessions; 0 disables
+                'session_cache_ttl': 30,  # seconds (also bounded by session expiry)
+                'session_expiry_interval': 1  # seconds between expiry wheel sweeps
             },
             'security': {
                 'require_proof_of_work': True,
@@ -82,7 +168,28 @@ class ChimeraServer:
                 'puzzle_timeout': 86400,  # 24 hours
                 'hardware_verification': True,
                 'rate_limit_window': 60,  # seconds
-                'rate_limit_max': 100  # requests per window
+                'rate_limit_max': 100,  # requests per window (routes without a policy)
+                'rate_limit_routes': {  # per-route budgets: max per window, optional burst
+                    '/api/v1/register': {'max': 5, 'window': 300},
+                    '/api/v1/login': {'max': 20, 'window': 300},
+                    '/api/v1/submit': {'max': 30, 'window': 60},
+                    '/api/v1/status': {'max': 300, 'window': 60}
+                },
+                'rate_limit_keys': 100000,  # Tracked client/route buckets
+                'shared_state': None,  # e.g. 'unix:///run/chimera/state.sock' (state_server.py) or 'redis://127.0.0.1:6379/0'
+                'challenge_cooldown': 60,  # seconds between newly issued challenges
+                'flood_half_life': 60,  # seconds; per-IP request counts decay by half
+                'flood_block_threshold': 3000,  # decayed requests from one IP that trigger a block; 0 = off
+                'flood_block_duration': 600,  # seconds
+                'session_tokens': 'opaque',  # 'signed' for stateless HMAC tokens
+                'token_key_version': 1,  # Key version new signed tokens use
+                'token_min_key_version': 1,  # Oldest key version still accepted
+                'revocation_sync_interval': 5  # seconds
+            },
+            'compute': {
+                'workers': 2,  # Processes for puzzle generation/verification (per server worker); 0 = inline
+                'timeout': 30,  # seconds per call, queueing included
+                'max_tasks_per_child': None  # Recycle a process after this many calls; None = never
             },
             'puzzles': {
                 'total_circles': 12,
@@ -136,6 +243,7 @@ class ChimeraServer:
         app.router.add_get('/api/v1/leaderboard', self.handle_leaderboard)
         app.router.add_post('/api/v1/reset', self.handle_reset)
         app.router.add_post('/api/v1/verify/hardware', self.handle_hardware_verify)
+        app.router.add_get('/metrics', self.handle_metrics)
         
         # Static files (for web interface)
         app.router.add_static('/static/', 'static')
@@ -143,10 +251,15 @@ class ChimeraServer:
         # WebSocket for real-time updates
         app.router.add_get('/ws', self.handle_websocket)
         
-        # Start background tasks
-        asyncio.create_task(self.cleanup_tasks())
-        asyncio.create_task(self.backup_database())
-        asyncio.create_task(self.monitor_system())
+        await self.compute.start()
+        
+        # Start background tasks (per worker; node-wide jobs wait for leadership)
+        asyncio.create_task(self.worker_cleanup_tasks())
+        asyncio.create_task(self.sync_revocations())
+        asyncio.create_task(self.expire_sessions())
+        asyncio.create_task(self.flush_activity_buffers())
+        asyncio.create_task(self.flush_statistics())
+        asyncio.create_task(self.run_leader_tasks())
         
         # Start server
         runner = web.AppRunner(app)
@@ -154,29 +267,49 @@ class ChimeraServer:
         site = web.TCPSite(
             runner,
             self.config['server']['host'],
-            self.config['server']['port']
+            self.config['server']['port'],
+            reuse_port=self.config['server']['workers'] > 1
         )
         
         await site.start()
         
-        logger.info(f"Server started on http://{self.config['server']['host']}:{self.config['server']['port']}")
-        logger.info(f"API Documentation: http://{self.config['server']['host']}:{self.config['server']['port']}/docs")
+        if self.worker is None:
+            logger.info(f"Server started on http://{self.config['server']['host']}:{self.config['server']['port']}")
+            logger.info(f"API Documentation: http://{self.config['server']['host']}:{self.config['server']['port']}/docs")
+        else:
+            logger.info(f"Worker {self.worker} listening on port {self.config['server']['port']}")
         
-        # Keep server running
-        await asyncio.Event().wait()
+        # Keep server running until SIGTERM/SIGINT
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopping.set)
+        await stopping.wait()
+        logger.info("Server shutting down...")
+        await runner.cleanup()
+    
+    async def shutdown(self):
+        """Release server resources"""
+        self.leader.release()
+        self.compute.close()
+        await self.db.close()
+        await self.shared_state.close()
+        logger.info("Server shutdown complete")
     
     # ==================== MIDDLEWARE ====================
     
-   @web.middleware
+    @web.middleware
     async def rate_limit_middleware(self, request: web.Request, handler):
         """Rate limiting middleware"""
         client_ip = request.remote
         
         # Check rate limit
-        if not self.check_rate_limit(client_ip):
+        retry_after = await self.shared_state.check_request(client_ip, request.path)
+        if retry_after:
             return web.json_response(
                 {'error': 'Rate limit exceeded'},
-                status=429
+                status=429,
+                headers={'Retry-After': str(int(min(retry_after, 86400)) + 1)}
             )
         
         return await handler(request)
@@ -188,6 +321,13 @@ class ChimeraServer:
             return await handler(request)
         except web.HTTPException:
             raise
+        except ComputeTimeout as e:
+            logger.warning(f"{request.path}: {e}")
+            return web.json_response(
+                {'error': 'Server busy, please retry'},
+                status=503,
+                headers={'Retry-After': '5'}
+            )
         except Exception as e:
             logger.error(f"Unhandled error: {e}\n{traceback.format_exc()}")
             return web.json_response(
@@ -243,7 +383,7 @@ class ChimeraServer:
                     )
             
             # Check if username is available
-            if self.db.get_player_by_username(data['username']):
+            if await self.db.get_player_by_username(data['username']):
                 return web.json_response(
                     {'error': 'Username already exists'},
                     status=409
@@ -251,36 +391,34 @@ class ChimeraServer:
             
             # Check if hardware fingerprint is unique
             if self.config['security']['hardware_verification']:
-                existing = self.db.get_player_by_hardware(data['hardware_fingerprint'])
+                existing = await self.db.get_player_by_hardware(data['hardware_fingerprint'])
                 if existing:
                     return web.json_response(
                         {'error': 'Hardware already registered'},
                         status=409
                     )
             
-            # Create player
-            player_id = self.db.create_player(
-                username=data['username'],
-                email=data['email'],
-                hardware_fingerprint=data['hardware_fingerprint']
-            )
+            # Create player (a concurrent registration may have won the name or hardware)
+            try:
+                player_id = await self.db.create_player(
+                    username=data['username'],
+                    email=data['email'],
+                    hardware_fingerprint=data['hardware_fingerprint']
+                )
+            except sqlite3.IntegrityError:
+                return web.json_response(
+                    {'error': 'Username or hardware already registered'},
+                    status=409
+                )
             
             # Generate session token
-            session_token = secrets.token_hex(32)
-            session_hash = hashlib.sha256(session_token.encode()).hexdigest()
-            
-            # Store session
-            self.db.create_session(
-                player_id=player_id,
-                session_hash=session_hash,
-                ip_address=request.remote
-            )
+            session_token = await self.issue_session_token(player_id, request.remote)
             
             # Generate initial challenge package
-            package = await self.generator.generate_initial_package(player_id)
+            package = await self.compute.generate_initial_package(player_id)
             
             # Update statistics
-            self.stats['players_registered'] += 1
+            await self.db.count_statistic('players_registered')
             
             logger.info(f"New player registered: {data['username']} (ID: {player_id})")
             
@@ -311,7 +449,7 @@ class ChimeraServer:
                 )
             
             # Get player
-            player = self.db.get_player_by_username(data['username'])
+            player = await self.db.get_player_by_username(data['username'])
             if not player:
                 return web.json_response(
                     {'error': 'Invalid username'},
@@ -333,15 +471,7 @@ class ChimeraServer:
                     )
             
             # Generate new session token
-            session_token = secrets.token_hex(32)
-            session_hash = hashlib.sha256(session_token.encode()).hexdigest()
-            
-            # Store session
-            self.db.create_session(
-                player_id=player['id'],
-                session_hash=session_hash,
-                ip_address=request.remote
-            )
+            session_token = await self.issue_session_token(player['id'], request.remote)
             
             logger.info(f"Player logged in: {data['username']}")
             
@@ -368,8 +498,16 @@ class ChimeraServer:
                 status=401
             )
         
-        session_hash = hashlib.sha256(session_token.encode()).hexdigest()
-        self.db.delete_session(session_hash)
+        if is_signed_token(session_token):
+            claims = self.tokens.verify(session_token) if self.tokens else None
+            if claims:
+                revocation = await self.db.add_revocation(claims['e'], token_id=claims['i'])
+                self.revocations.add(revocation)
+                if self.db.session_cache is not None:
+                    self.db.session_cache.invalidate(claims['i'])
+        else:
+            session_hash = hashlib.sha256(session_token.encode()).hexdigest()
+            await self.db.delete_session(session_hash)
         
         return web.json_response({
             'message': 'Logout successful'
@@ -377,13 +515,15 @@ class ChimeraServer:
     
     async def handle_status(self, request: web.Request) -> web.Response:
         """Get server status"""
+        stats = await self.db.get_statistics(self.stat_metrics)
+        
         return web.json_response({
             'status': 'online',
             'version': '1.0.0',
             'players_online': len(self.active_sessions),
-            'players_registered': self.stats['players_registered'],
-            'puzzles_generated': self.stats['puzzles_generated'],
-            'flags_captured': self.stats['flags_captured'],
+            'players_registered': stats['players_registered'],
+            'puzzles_generated': stats['puzzles_generated'],
+            'flags_captured': stats['flags_captured'],
             'uptime': time.time() - self.start_time,
             'server_time': datetime.utcnow().isoformat()
         })
@@ -417,24 +557,32 @@ class ChimeraServer:
                 status=401
             )
         
-        # Check if player is rate limited for challenges
-        if not self.can_request_challenge(player['id']):
+        # Get current puzzle
+        puzzle = await self.db.get_current_puzzle(player['id'])
+        
+        # Only issuing a new puzzle (first or replacing an expired one) is
+        # rate limited; re-fetching the current one is always allowed
+        issuing = (not puzzle or
+                   time.time() - puzzle['created_at'] > self.config['security']['puzzle_timeout'])
+        if issuing and not await self.can_request_challenge(player['id']):
             return web.json_response(
                 {'error': 'Challenge request too frequent'},
                 status=429
             )
-        # Get current puzzle
-        puzzle = self.db.get_current_puzzle(player['id'])
-        if not puzzle:
+        if puzzle:
+            # Stored rows hold a manifest; load the file bodies to send
+            puzzle['puzzle_data'] = await self.db.load_puzzle_data(puzzle['puzzle_data'],
+                                                                   player_id=player['id'])
+        else:
             # Generate new puzzle
-            puzzle_data = await self.generator.generate_puzzle(
+            puzzle_data = await self.compute.generate_puzzle(
                 player_id=player['id'],
                 circle_number=player['current_circle'],
                 player_data=player
             )
             
             # Store puzzle
-            puzzle_id = self.db.create_puzzle(
+            puzzle_id = await self.db.create_puzzle(
                 player_id=player['id'],
                 circle_number=player['current_circle'],
                 puzzle_type=self.config['puzzles']['puzzle_order'][player['current_circle'] - 1],
@@ -451,19 +599,19 @@ class ChimeraServer:
                 'type': self.config['puzzles']['puzzle_order'][player['current_circle'] - 1]
             }
             
-            self.stats['puzzles_generated'] += 1
+            await self.db.count_statistic('puzzles_generated')
         
         # Check if puzzle expired
         puzzle_age = time.time() - puzzle['created_at']
         if puzzle_age > self.config['security']['puzzle_timeout']:
             # Regenerate puzzle
-            puzzle_data = await self.generator.generate_puzzle(
+            puzzle_data = await self.compute.generate_puzzle(
                 player_id=player['id'],
                 circle_number=player['current_circle'],
                 player_data=player
             )
             
-            self.db.update_puzzle(
+            await self.db.update_puzzle(
                 puzzle_id=puzzle['id'],
                 puzzle_data=json.dumps(puzzle_data['puzzle']),
                 solution_hash=puzzle_data['solution_hash'],
@@ -511,13 +659,19 @@ class ChimeraServer:
                 )
             
             # Get puzzle
-            puzzle = self.db.get_puzzle(data['puzzle_id'])
+            puzzle = await self.db.get_puzzle(data['puzzle_id'])
             if not puzzle or puzzle['player_id'] != player['id']:
                 return web.json_response(
                     {'error': 'Invalid puzzle'},
                     status=404
                 )
             
+            if puzzle['status'] != 'active':
+                return web.json_response(
+                    {'error': 'Puzzle already solved'},
+                    status=409
+                )
+            
             # Check if puzzle is expired
             puzzle_age = time.time() - puzzle['created_at']
             if puzzle_age > self.config['security']['puzzle_timeout']:
@@ -534,8 +688,9 @@ class ChimeraServer:
                 )
             
             # Verify solution
-            is_correct, verification_data = await self.verifier.verify_solution(
-                puzzle_data=json.loads(puzzle['puzzle_data']),
+            is_correct, verification_data = await self.compute.verify_solution(
+                puzzle_data=await self.db.load_puzzle_data(puzzle['puzzle_data'],
+                                                           player_id=player['id']),
                 solution=data['solution'],
                 puzzle_type=puzzle['type'],
                 player_id=player['id']
@@ -552,10 +707,13 @@ class ChimeraServer:
             
             if cheat_detected:
                 logger.warning(f"Cheat detected for player {player['username']}")
-                self.stats['cheat_attempts'] += 1
+                await self.db.count_statistic('cheat_attempts')
                 
                 # Apply penalty
                 penalty = self.anti_cheat.apply_penalty(player['id'], cheat_data)
+                if penalty['action'] == 'permanent_ban':
+                    # Also drops the player's cached sessions
+                    await self.db.deactivate_player(player['id'])
                 
                 return web.json_response({
                     'correct': False,
@@ -564,41 +722,67 @@ class ChimeraServer:
                     'message': 'Anti-cheat system triggered'
                 })
             
-            # Update puzzle attempts
-            self.db.increment_puzzle_attempts(puzzle['id'])
+            solve_time = verification_data.get('solve_time', 0)
+            total_circles = self.config['puzzles']['total_circles']
             
-            # Update statistics
-            self.stats['solutions_submitted'] += 1
+            # Generate final flag before writing so the outcome commits as one unit
+            final_flag = None
+            if is_correct and puzzle['circle_number'] >= total_circles:
+                final_flag = await self.compute.generate_final_flag(player['id'])
             
-            if is_correct:
-                # Mark puzzle as solved
-                self.db.mark_puzzle_solved(
+            def record_outcome(db: Database) -> Optional[Dict]:
+                # Update puzzle attempts
+                db.increment_puzzle_attempts(puzzle['id'])
+                
+                if not is_correct:
+                    return None
+                
+                # Only the submit that moves the puzzle out of 'active' applies
+                # progress; a concurrent one rolls back here
+                if not db.mark_puzzle_solved(
                     puzzle_id=puzzle['id'],
                     solved_at=int(time.time()),
                     solution=data['solution']
-                )
+                ):
+                    raise WriteConflict(f"Puzzle {puzzle['id']} is no longer active")
                 
-                # Update player progress
-                self.db.update_player_progress(
+                # Progress follows the stored row, not the (possibly cached) player
+                progress = db.update_player_progress(
                     player_id=player['id'],
-                    new_circle=player['current_circle'] + 1,
-                    time_spent=verification_data.get('solve_time', 0)
+                    new_circle=None,
+                    time_spent=solve_time
                 )
                 
-                # Check if player completed all circles
-                if player['current_circle'] + 1 > self.config['puzzles']['total_circles']:
-                    # Generate final flag
-                    final_flag = await self.generator.generate_final_flag(player['id'])
-                    
-                    # Record completion
-                    self.db.record_completion(
+                # Record completion
+                if progress['current_circle'] > total_circles:
+                    if final_flag is None:
+                        raise WriteConflict(f"Player {player['id']} progressed during the submit")
+                    db.record_completion(
                         player_id=player['id'],
                         final_flag=final_flag,
-                        total_time=player['total_time'] + verification_data.get('solve_time', 0)
+                        total_time=progress['total_time']
                     )
-                    
+                return progress
+            
+            # One transaction: attempts, solve, progress, leaderboard and completion
+            try:
+                progress = await self.db.unit_of_work(record_outcome, player_id=player['id'])
+            except WriteConflict as e:
+                logger.info(f"Submit by {player['username']} rolled back: {e}")
+                return web.json_response(
+                    {'error': 'Puzzle already solved'},
+                    status=409
+                )
+            completed_all = progress is not None and progress['current_circle'] > total_circles
+            
+            # Update statistics
+            await self.db.count_statistic('solutions_submitted')
+            
+            if is_correct:
+                # Check if player completed all circles
+                if completed_all:
                     # Update statistics
-                    self.stats['flags_captured'] += 1
+                    await self.db.count_statistic('flags_captured')
                     
                     logger.info(f"Player {player['username']} completed all circles!")
                     
@@ -608,14 +792,14 @@ class ChimeraServer:
                         'all_circles_completed': True,
                         'final_flag': final_flag,
                         'completion_time': datetime.utcnow().isoformat(),
-                        'rank': self.db.get_player_rank(player['id'])
+                        'rank': await self.db.get_player_rank(player['id'])
                     })
                 else:
                     return web.json_response({
                         'correct': True,
                         'circle_completed': True,
-                        'next_circle': player['current_circle'] + 1,
-                        'message': f'Circle {player["current_circle"]} completed!'
+                        'next_circle': progress['current_circle'],
+                        'message': f'Circle {puzzle["circle_number"]} completed!'
                     })
             else:
                 return web.json_response({
@@ -640,7 +824,7 @@ class ChimeraServer:
             )
         
         # Get all solved puzzles
-        solved_puzzles = self.db.get_solved_puzzles(player['id'])
+        solved_puzzles = await self.db.get_solved_puzzles(player['id'], columns=SOLVED_PUZZLE_SUMMARY)
         
         # Calculate statistics
         total_time = player['total_time']
@@ -672,24 +856,26 @@ class ChimeraServer:
         offset = int(request.query.get('offset', 0))
         
         # Get leaderboard
-        leaderboard = self.db.get_leaderboard(limit, offset)
+        leaderboard = await self.db.get_leaderboard(
+            limit, offset, columns=LEADERBOARD_SUMMARY + ('last_active',)
+        )
         
         # Format response
         formatted = []
         for i, entry in enumerate(leaderboard):
             formatted.append({
                 'rank': offset + i + 1,
-                'player_id': entry['id'],
+                'player_id': entry['player_id'],
                 'username': entry['username'],
                 'progress': entry['progress'],
                 'total_time': entry['total_time'],
-                'completed_at': entry.get('completed_at'),
+                'completed_at': entry['completed_at'],
                 'last_active': entry['last_active']
             })
         
         return web.json_response({
             'leaderboard': formatted,
-            'total_players': self.db.get_total_players(),
+            'total_players': await self.db.get_total_players(),
             'limit': limit,
             'offset': offset
         })
@@ -714,14 +900,25 @@ class ChimeraServer:
                 })
             
             # Reset player
-            self.db.reset_player(player['id'])
+            await self.db.reset_player(player['id'])
             
             logger.info(f"Player {player['username']} reset their progress")
             
-            return web.json_response({
+            response = {
                 'message': 'Progress reset successfully',
                 'new_player_id': player['id']  # Same ID, fresh start
-            })
+            }
+            
+            # Signed tokens issued before the reset stop working; hand out a new one
+            if self.tokens:
+                revocation = await self.db.add_revocation(
+                    int(time.time()) + self.tokens.lifetime, player_id=player['id'],
+                    not_before=token_clock()
+                )
+                self.revocations.add(revocation)
+                response['session_token'] = await self.issue_session_token(player['id'], request.remote)
+            
+            return web.json_response(response)
             
         except json.JSONDecodeError:
             return web.json_response(
@@ -773,6 +970,21 @@ class ChimeraServer:
                 status=400
             )
     
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """Export Prometheus metrics"""
+        exporters = [exporter for exporter in (self.db.metrics, self.db.session_cache)
+                     if exporter is not None]
+        if not exporters:
+            return web.json_response(
+                {'error': 'Metrics disabled'},
+                status=404
+            )
+        
+        return web.Response(
+            text=''.join(exporter.to_prometheus() for exporter in exporters),
+            content_type='text/plain'
+        )
+    
     async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
         """Handle WebSocket connections for real-time updates"""
         ws = web.WebSocketResponse()
@@ -782,8 +994,7 @@ class ChimeraServer:
         session_token = request.query.get('token')
         
         if session_token:
-            session_hash = hashlib.sha256(session_token.encode()).hexdigest()
-            player = self.db.get_player_by_session(session_hash)
+            player = await self.resolve_session(session_token)
         
         if not player:
             await ws.close(code=1008, message='Authentication required')
@@ -847,7 +1058,7 @@ class ChimeraServer:
             
         elif message_type == 'progress_update':
             # Send progress update to client
-            player = self.db.get_player(player_id)
+            player = await self.db.get_player(player_id)
             if player:
                 await ws.send_json({
                     'type': 'progress',
@@ -863,15 +1074,42 @@ class ChimeraServer:
         if not session_token:
             return None
         
-        session_hash = hashlib.sha256(session_token.encode()).hexdigest()
-        player = self.db.get_player_by_session(session_hash)
+        player = await self.resolve_session(session_token)
         
         if player:
             # Update last active
-            self.db.update_player_last_active(player['id'])
+            await self.db.update_player_last_active(player['id'])
         
         return player
     
+    async def issue_session_token(self, player_id: int, ip_address: str) -> str:
+        """New session token: signed if enabled, else an opaque token stored in sessions"""
+        if self.tokens:
+            session_token, _ = self.tokens.issue(player_id)
+            return session_token
+        
+        session_token = secrets.token_hex(32)
+        session_hash = hashlib.sha256(session_token.encode()).hexdigest()
+        await self.db.create_session(
+            player_id=player_id,
+            session_hash=session_hash,
+            ip_address=ip_address
+        )
+        return session_token
+    
+    async def resolve_session(self, session_token: str) -> Optional[Dict]:
+        """Player for a session token of either kind, or None"""
+        if is_signed_token(session_token):
+            if not self.tokens:
+                return None
+            claims = self.tokens.verify(session_token)
+            if not claims or self.revocations.is_revoked(claims):
+                return None
+            return await self.db.get_player_by_token(claims['i'], claims['p'], claims['e'])
+        
+        session_hash = hashlib.sha256(session_token.encode()).hexdigest()
+        return await self.db.get_player_by_session(session_hash)
+    
     def verify_proof_of_work(self, pow_data: str) -> bool:
         """Verify proof of work"""
         difficulty = self.config['security']['pow_difficulty']
@@ -881,57 +1119,65 @@ class ChimeraServer:
         h = hashlib.sha256(pow_data.encode()).hexdigest()
         return h.startswith(target)
     
-    def check_rate_limit(self, client_ip: str) -> bool:
-        """Check if client is rate limited"""
-        window = self.config['security']['rate_limit_window']
-        max_requests = self.config['security']['rate_limit_max']
-        
-        now = time.time()
-        
-        if client_ip not in self.rate_limits:
-            self.rate_limits[client_ip] = []
-        
-        # Clean old requests
-        self.rate_limits[client_ip] = [
-            t for t in self.rate_limits[client_ip]
-            if now - t < window
-        ]
-        
-        # Check if limit exceeded
-        if len(self.rate_limits[client_ip]) >= max_requests:
-            return False
-        
-        # Add current request
-        self.rate_limits[client_ip].append(now)
-        return True
-    
-    def can_request_challenge(self, player_id: int) -> bool:
-        """Check if player can request a new challenge"""
-        # Minimum 60 seconds between challenge requests
-        last_request = self.db.get_last_challenge_request(player_id)
-        if last_request and time.time() - last_request < 60:
+    async def can_request_challenge(self, player_id: int) -> bool:
+        """Check if player can be issued a new challenge (takes the cooldown if so)"""
+        # Minimum challenge_cooldown seconds between issued challenges
+        cooldown = self.config['security']['challenge_cooldown']
+        last_request = await self.db.get_last_challenge_request(player_id)
+        if last_request and time.time() - last_request < cooldown:
             return False
-        return True
+        # Atomic on every worker, so concurrent requests can't all pass the check above
+        return await self.shared_state.acquire_cooldown(f"challenge:{player_id}", cooldown)
 
   # ==================== BACKGROUND TASKS ====================
     
+    async def run_leader_tasks(self):
+        """Run the node-wide background jobs once this worker is elected leader"""
+        if self.config['server']['workers'] > 1:
+            await self.leader.wait_elected()
+            logger.info(f"Worker {self.worker} elected leader for background jobs")
+        
+        # Repair any leaderboard drift left by writes outside the triggers
+        try:
+            await self.db.check_leaderboard(repair=True)
+        except Exception as e:
+            logger.error(f"Error checking leaderboard: {e}")
+        
+        asyncio.create_task(self.cleanup_tasks())
+        asyncio.create_task(self.backup_database())
+        asyncio.create_task(self.archive_history())
+        asyncio.create_task(self.monitor_system())
+    
     async def cleanup_tasks(self):
-        """Run cleanup tasks periodically"""
+        """Run database cleanup tasks periodically (leader only)"""
         while True:
             try:
-                # Clean old sessions
-                self.db.clean_old_sessions(self.config['server']['session_timeout'])
+                # Backstop for sessions expire_sessions never scheduled
+                # (e.g. created by another process)
+                await self.db.clean_old_sessions(self.config['server']['session_timeout'])
+                
+                # Drop revocations of tokens that have expired anyway
+                await self.db.prune_revocations()
+                
+                # Drop puzzle file blobs no puzzle references any more
+                await self.db.gc_blobs()
                 
-                # Clean rate limits
-                window = self.config['security']['rate_limit_window']
-                now = time.time()
-                for ip in list(self.rate_limits.keys()):
-                    self.rate_limits[ip] = [
-                        t for t in self.rate_limits[ip]
-                        if now - t < window
-                    ]
-                    if not self.rate_limits[ip]:
-                        del self.rate_limits[ip]
+                # Log cleanup
+                logger.debug("Cleanup tasks completed")
+                
+            except Exception as e:
+                logger.error(f"Error in cleanup tasks: {e}")
+            
+            await asyncio.sleep(300)  # Run every 5 minutes
+    
+    async def worker_cleanup_tasks(self):
+        """Drop this worker's expired in-memory state periodically"""
+        while True:
+            try:
+                self.revocations.prune()
+                
+                # Drop rate limit buckets that have refilled and expired keys
+                self.shared_state.prune()
                 
                 # Clean WebSocket connections
                 for conn_id in list(self.active_sessions.keys()):
@@ -943,26 +1189,84 @@ class ChimeraServer:
                             pass
                         del self.active_sessions[conn_id]
                 
-                # Log cleanup
-                logger.debug("Cleanup tasks completed")
-                
             except Exception as e:
-                logger.error(f"Error in cleanup tasks: {e}")
+                logger.error(f"Error in worker cleanup tasks: {e}")
             
             await asyncio.sleep(300)  # Run every 5 minutes
     
+    async def sync_revocations(self):
+        """Pull revocations stored by other workers into the in-memory set"""
+        while True:
+            try:
+                rows = await self.db.get_revocations(self.revocations.last_id)
+                if rows:
+                    self.revocations.apply(rows)
+                    if self.db.session_cache is not None:
+                        for row in rows:
+                            if row['token_id']:
+                                self.db.session_cache.invalidate(row['token_id'])
+                            else:
+                                self.db.session_cache.invalidate_player(row['player_id'])
+            except Exception as e:
+                logger.error(f"Error syncing revocations: {e}")
+            await asyncio.sleep(self.config['security']['revocation_sync_interval'])
+    
+    async def expire_sessions(self):
+        """Delete sessions as the expiry timer wheel reports them due"""
+        while True:
+            await asyncio.sleep(self.config['database']['session_expiry_interval'])
+            try:
+                await self.db.expire_sessions()
+            except Exception as e:
+                logger.error(f"Error expiring sessions: {e}")
+    
+    async def flush_activity_buffers(self):
+        """Flush buffered last_active/last_used timestamps periodically"""
+        while True:
+            await asyncio.sleep(self.config['database']['activity_flush_interval'])
+            try:
+                await self.db.flush_activity()
+            except Exception as e:
+                logger.error(f"Error flushing activity updates: {e}")
+    
+    async def flush_statistics(self):
+        """Flush buffered statistics counters periodically"""
+        while True:
+            await asyncio.sleep(self.config['database']['statistics_flush_interval'])
+            try:
+                await self.db.flush_statistics()
+            except Exception as e:
+                logger.error(f"Error flushing statistics: {e}")
+    
     async def backup_database(self):
         """Backup database periodically"""
         while True:
             try:
-                backup_path = f"backups/chimera_backup_{int(time.time())}.db"
-                self.db.backup(backup_path)
-                logger.info(f"Database backed up to {backup_path}")
+                # Runs on the default executor so queued DB writes are not delayed
+                loop = asyncio.get_running_loop()
+                for backups in self.backups:
+                    result = await loop.run_in_executor(None, backups.run)
+                    if not result['verified']:
+                        logger.error(f"Backup failed verification: {result['path']}")
             except Exception as e:
                 logger.error(f"Error backing up database: {e}")
             
             await asyncio.sleep(self.config['database']['backup_interval'])
     
+    async def archive_history(self):
+        """Move old submissions and cheat logs to the archive periodically"""
+        if not self.config['database']['archive_path']:
+            return
+        
+        while True:
+            try:
+                # Batches commit separately, so other writers interleave
+                await self.db.archive_old_rows(self.config['database']['archive_after'])
+            except Exception as e:
+                logger.error(f"Error archiving history: {e}")
+            
+            await asyncio.sleep(self.config['database']['archive_interval'])
+    
     async def monitor_system(self):
         """Monitor system health"""
         while True:
@@ -981,7 +1285,25 @@ class ChimeraServer:
                 
                 # Log statistics
                 logger.info(f"Active sessions: {len(self.active_sessions)}")
-                logger.info(f"Rate limited IPs: {len(self.rate_limits)}")
+                if self.db.session_cache is not None:
+                    logger.info(f"Session cache: {len(self.db.session_cache)} entries, "
+                                f"{self.db.session_cache.hit_rate():.1%} hit rate")
+                compute = self.compute.stats
+                logger.info(f"Compute pool: {compute['calls']} calls, {compute['timeouts']} timeouts, "
+                            f"{compute['restarts']} restarts")
+                shared = self.shared_state
+                logger.info(f"Rate limiter: {shared.limiter.stats['limited']} requests limited, "
+                            f"{shared.stats['banned']} refused while banned, "
+                            f"{shared.stats['auto_blocks']} flood blocks")
+                for label, hitters in (('IPs', shared.clients), ('subnets', shared.subnets)):
+                    heaviest = hitters.heaviest(5)
+                    if heaviest:
+                        logger.info(f"Top request {label}: " +
+                                    ', '.join(f"{key} ({count})" for key, count in heaviest))
+                submitters = self.anti_cheat.detection_modules['network_analysis'].submitters.heaviest(5)
+                if submitters:
+                    logger.info("Top submitting IPs: " +
+                                ', '.join(f"{key} ({count})" for key, count in submitters))
                 
             except Exception as e:
                 logger.error(f"Error in system monitor: {e}")
@@ -990,16 +1312,9 @@ class ChimeraServer:
 
    # ==================== MAIN ====================
 
-async def main():
-    """Main entry point"""
-    # Create necessary directories
-    Path("logs").mkdir(exist_ok=True)
-    Path("data").mkdir(exist_ok=True)
-    Path("backups").mkdir(exist_ok=True)
-    Path("temp").mkdir(exist_ok=True)
-    
-    # Initialize and start server
-    server = ChimeraServer()
+async def run_server(config: Dict, worker: Optional[int] = None):
+    """Run one server process (the only one, or a supervised worker)"""
+    server = ChimeraServer(worker=worker, config=config)
     server.start_time = time.time()
     
     try:
@@ -1009,11 +1324,24 @@ async def main():
     except Exception as e:
         logger.error(f"Server crashed: {e}")
         raise
+    finally:
+        await server.shutdown()
 
-if __name__ == "__main__":
-    asyncio.run(main())
-```
+def main():
+    """Main entry point"""
+    # Create necessary directories
+    Path("logs").mkdir(exist_ok=True)
+    Path("data").mkdir(exist_ok=True)
+    Path("backups").mkdir(exist_ok=True)
+    Path("temp").mkdir(exist_ok=True)
+    
+    # Loaded once so every worker gets the same config (and secret key)
+    config = ChimeraServer.load_config("config/server_config.json")
+    workers = config['server']['workers']
+    if workers > 1:
+        supervisor = Supervisor(workers, lambda index: asyncio.run(run_server(config, index)))
+        sys.exit(supervisor.run())
+    asyncio.run(run_server(config))
 
-      
-        
-        
\ No newline at end of file
+if __name__ == "__main__":
+    main()
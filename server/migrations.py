@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# chimera-vx/server/migrations.py
+# Versioned schema migrations for Chimera-VX
+#
+# The schema version lives in PRAGMA user_version and every applied
+# migration is recorded in schema_migrations. SQL steps must be idempotent
+# (IF [NOT] EXISTS): each runs in its own write transaction, so on a live
+# event database other writers only wait for one index build at a time, and
+# a migration interrupted midway is simply re-run.
+
+import time
+from typing import Callable, List, NamedTuple, Optional, Union
+import logging
+
+from connection_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    # Idempotent SQL statements, or a callable taking the writer connection
+    steps: Union[List[str], Callable]
+
+
+# A player has completed the event once this many puzzles are solved
+COMPLETION_SOLVED_COUNT = 12
+
+
+def maintain_leaderboard(conn):
+    """Per-player solved counter and leaderboard rows kept current by triggers"""
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(players)')]
+    if 'solved_count' not in columns:
+        conn.execute('ALTER TABLE players ADD COLUMN solved_count INTEGER DEFAULT 0')
+    conn.execute('''
+        UPDATE players SET solved_count = (
+            SELECT COUNT(*) FROM puzzles
+            WHERE puzzles.player_id = players.id AND puzzles.status = 'solved'
+        )
+    ''')
+
+    # Solved counter follows puzzle status changes, inserts and deletes
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_puzzles_solved
+        AFTER UPDATE OF status ON puzzles
+        WHEN NEW.status = 'solved' AND OLD.status IS NOT 'solved'
+        BEGIN
+            UPDATE players SET solved_count = solved_count + 1 WHERE id = NEW.player_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_puzzles_unsolved
+        AFTER UPDATE OF status ON puzzles
+        WHEN OLD.status = 'solved' AND NEW.status IS NOT 'solved'
+        BEGIN
+            UPDATE players SET solved_count = solved_count - 1 WHERE id = NEW.player_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_puzzles_insert_solved
+        AFTER INSERT ON puzzles
+        WHEN NEW.status = 'solved'
+        BEGIN
+            UPDATE players SET solved_count = solved_count + 1 WHERE id = NEW.player_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_puzzles_delete_solved
+        AFTER DELETE ON puzzles
+        WHEN OLD.status = 'solved'
+        BEGIN
+            UPDATE players SET solved_count = solved_count - 1 WHERE id = OLD.player_id;
+        END
+    ''')
+
+    # Leaderboard row updated in place (no delete + reinsert) on ranking changes
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_players_leaderboard
+        AFTER UPDATE OF username, progress, total_time, solved_count ON players
+        BEGIN
+            INSERT INTO leaderboard (player_id, username, progress, total_time,
+                                     completed_at, last_updated)
+            VALUES (NEW.id, NEW.username, NEW.progress, NEW.total_time,
+                    CASE WHEN NEW.solved_count >= {COMPLETION_SOLVED_COUNT}
+                         THEN CAST(strftime('%s', 'now') AS INTEGER) END,
+                    CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT(player_id) DO UPDATE SET
+                username = excluded.username,
+                progress = excluded.progress,
+                total_time = excluded.total_time,
+                completed_at = CASE WHEN NEW.solved_count >= {COMPLETION_SOLVED_COUNT}
+                                    THEN COALESCE(leaderboard.completed_at, excluded.completed_at) END,
+                last_updated = excluded.last_updated;
+        END
+    ''')
+
+
+def json_generated_columns(conn):
+    """Generated columns over players' JSON documents, indexed where queried"""
+    # Generated columns are only listed by table_xinfo
+    columns = [row[1] for row in conn.execute('PRAGMA table_xinfo(players)')]
+
+    # Completion time, set in metadata by record_completion; backfilled from
+    # the completion achievement of players who finished before this migration
+    conn.execute('''
+        UPDATE players
+        SET metadata = json_set(COALESCE(metadata, '{}'), '$.completed_at', (
+            SELECT MIN(json_extract(value, '$.completed_at')) FROM json_each(players.achievements)
+            WHERE json_extract(value, '$.type') = 'completion'
+        ))
+        WHERE json_extract(metadata, '$.completed_at') IS NULL
+        AND EXISTS (
+            SELECT 1 FROM json_each(players.achievements)
+            WHERE json_extract(value, '$.type') = 'completion'
+        )
+    ''')
+    if 'completed_at' not in columns:
+        conn.execute('''
+            ALTER TABLE players ADD COLUMN completed_at INTEGER
+            GENERATED ALWAYS AS (json_extract(metadata, '$.completed_at')) VIRTUAL
+        ''')
+    if 'achievement_count' not in columns:
+        conn.execute('''
+            ALTER TABLE players ADD COLUMN achievement_count INTEGER
+            GENERATED ALWAYS AS (json_array_length(achievements)) VIRTUAL
+        ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_players_completed
+        ON players(completed_at) WHERE completed_at IS NOT NULL
+    ''')
+
+
+# Applied in order; versions must run 1, 2, 3, ... with no gaps
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline indexes", [
+        'CREATE INDEX IF NOT EXISTS idx_players_username ON players(username)',
+        'CREATE INDEX IF NOT EXISTS idx_players_hardware ON players(hardware_fingerprint)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_player ON sessions(player_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_hash ON sessions(session_hash)',
+        'CREATE INDEX IF NOT EXISTS idx_puzzles_player ON puzzles(player_id)',
+        'CREATE INDEX IF NOT EXISTS idx_puzzles_circle ON puzzles(circle_number)',
+        'CREATE INDEX IF NOT EXISTS idx_puzzles_status ON puzzles(status)',
+        'CREATE INDEX IF NOT EXISTS idx_submissions_player ON submissions(player_id)',
+        'CREATE INDEX IF NOT EXISTS idx_submissions_puzzle ON submissions(puzzle_id)',
+        'CREATE INDEX IF NOT EXISTS idx_hardware_player ON hardware_profiles(player_id)',
+        'CREATE INDEX IF NOT EXISTS idx_cheat_player ON cheat_logs(player_id)',
+        'CREATE INDEX IF NOT EXISTS idx_leaderboard_progress ON leaderboard(progress DESC, total_time ASC)',
+    ]),
+    Migration(2, "composite indexes for hot query shapes", [
+        # get_current_puzzle: player_id = ? AND status = 'active' ORDER BY created_at DESC
+        'CREATE INDEX IF NOT EXISTS idx_puzzles_player_status_created ON puzzles(player_id, status, created_at)',
+        # get_solved_puzzles: covering for the progress breakdown columns
+        '''CREATE INDEX IF NOT EXISTS idx_puzzles_player_status_circle
+           ON puzzles(player_id, status, circle_number, type, solved_at, attempts, time_spent)''',
+        # get_submissions / get_cheat_logs: newest first per player
+        'CREATE INDEX IF NOT EXISTS idx_submissions_player_time ON submissions(player_id, submitted_at)',
+        'CREATE INDEX IF NOT EXISTS idx_cheat_player_time ON cheat_logs(player_id, detected_at)',
+        # clean_old_sessions
+        'CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)',
+        # get_leaderboard: full ORDER BY including the completed_at tie-break
+        '''CREATE INDEX IF NOT EXISTS idx_leaderboard_order
+           ON leaderboard(progress DESC, total_time ASC, completed_at ASC)''',
+        # Superseded by the composites above, duplicates of UNIQUE constraints,
+        # or too unselective to be used; each costs a write on every insert
+        'DROP INDEX IF EXISTS idx_puzzles_player',
+        'DROP INDEX IF EXISTS idx_puzzles_circle',
+        'DROP INDEX IF EXISTS idx_puzzles_status',
+        'DROP INDEX IF EXISTS idx_submissions_player',
+        'DROP INDEX IF EXISTS idx_cheat_player',
+        'DROP INDEX IF EXISTS idx_leaderboard_progress',
+        'DROP INDEX IF EXISTS idx_players_username',
+        'DROP INDEX IF EXISTS idx_players_hardware',
+        'DROP INDEX IF EXISTS idx_sessions_hash',
+    ]),
+    Migration(3, "content-addressed puzzle file blobs", [
+        # Compressed file bodies keyed by sha256 (see blob_store.py)
+        '''CREATE TABLE IF NOT EXISTS blobs (
+               hash TEXT PRIMARY KEY,
+               codec TEXT NOT NULL,
+               size INTEGER NOT NULL,
+               data BLOB NOT NULL
+           )''',
+        # Which puzzles reference which blobs, for garbage collection
+        '''CREATE TABLE IF NOT EXISTS puzzle_blobs (
+               puzzle_id INTEGER NOT NULL,
+               hash TEXT NOT NULL,
+               PRIMARY KEY (puzzle_id, hash)
+           ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_puzzle_blobs_hash ON puzzle_blobs(hash)',
+    ]),
+    Migration(4, "age indexes for history archival", [
+        # archive_old_rows: oldest rows first, across all players
+        'CREATE INDEX IF NOT EXISTS idx_submissions_time ON submissions(submitted_at)',
+        'CREATE INDEX IF NOT EXISTS idx_cheat_time ON cheat_logs(detected_at)',
+    ]),
+    Migration(5, "trigger-maintained leaderboard and solved counter", maintain_leaderboard),
+    Migration(6, "covering index for leaderboard listings", [
+        # get_leaderboard(columns=LEADERBOARD_SUMMARY) reads only this index
+        '''CREATE INDEX IF NOT EXISTS idx_leaderboard_summary
+           ON leaderboard(progress DESC, total_time ASC, completed_at ASC, player_id, username)''',
+        'DROP INDEX IF EXISTS idx_leaderboard_order',
+    ]),
+    Migration(7, "JSON generated columns for players", json_generated_columns),
+    Migration(8, "persisted revocations for signed session tokens", [
+        '''CREATE TABLE IF NOT EXISTS revocations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            token_id TEXT,          -- one token (logout)
+            player_id INTEGER,      -- or every token of a player issued before not_before
+            not_before INTEGER,
+            expires_at INTEGER NOT NULL,  -- the revoked tokens have expired by then
+            created_at INTEGER NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_revocations_expires ON revocations(expires_at)',
+    ]),
+    Migration(9, "node-wide hardware fingerprint claims for sharded registration", [
+        # Used on shard 0 only (see ShardedDatabase.create_player)
+        '''CREATE TABLE IF NOT EXISTS hardware_claims (
+            fingerprint TEXT PRIMARY KEY,
+            player_id INTEGER,      -- NULL while the registration is in flight
+            created_at INTEGER NOT NULL
+        ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_hardware_claims_player ON hardware_claims(player_id)',
+    ]),
+    Migration(10, "rank index for counting players ranked ahead", [
+        # count_ranked_ahead without the in-memory rank index
+        'CREATE INDEX IF NOT EXISTS idx_players_rank ON players(is_active, progress DESC, total_time ASC)',
+    ]),
+]
+assert [m.version for m in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1)), \
+    "migration versions must be contiguous and in order"
+
+LATEST_VERSION = MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def get_version(pool: ConnectionPool) -> int:
+    """Current schema version"""
+    with pool.write() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def run_migrations(pool: ConnectionPool, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to target (default: latest); returns versions applied"""
+    target = LATEST_VERSION if target is None else target
+
+    with pool.write() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at INTEGER NOT NULL,
+                duration_ms INTEGER NOT NULL
+            )
+        ''')
+
+    applied = []
+    for migration in MIGRATIONS:
+        # Re-read per step: another process may have migrated concurrently
+        if migration.version <= get_version(pool) or migration.version > target:
+            continue
+
+        start = time.perf_counter()
+
+        # SQL steps commit one at a time so writers interleave between index builds
+        if not callable(migration.steps):
+            for statement in migration.steps:
+                with pool.write() as conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute(statement)
+
+        with pool.write() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= migration.version:
+                continue
+
+            # Callable steps commit atomically with the version bump
+            if callable(migration.steps):
+                migration.steps(conn)
+
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            conn.execute('''
+                INSERT INTO schema_migrations (version, description, applied_at, duration_ms)
+                VALUES (?, ?, ?, ?)
+            ''', (migration.version, migration.description, int(time.time()), duration_ms))
+            conn.execute(f'PRAGMA user_version = {migration.version}')
+
+        applied.append(migration.version)
+        logger.info(f"Applied migration {migration.version} ({migration.description}) "
+                    f"in {duration_ms} ms")
+
+    if applied:
+        # Refresh planner statistics for the new indexes
+        with pool.write() as conn:
+            conn.execute('PRAGMA optimize')
+
+    return applied
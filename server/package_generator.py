@@ -764,5 +764,3 @@ if __name__ == "__main__":
         print(f"Solution hash: {puzzle['solution_hash']}")
     
     asyncio.run(test())
-```
-
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# chimera-vx/server/purge_players.py
+# Admin tool: delete player accounts and all their data
+#
+# Usage:
+#   python purge_players.py 17 42 99 --db data/chimera.db
+#   python purge_players.py --file banned_ids.txt --yes
+#   python purge_players.py --usernames cheater1 cheater2
+#
+# Deletes run in short chunked transactions (Database.purge_players), so
+# this is safe against a live server database.
+
+import argparse
+import sys
+from typing import Dict, List
+
+from sharded_database import ShardedDatabase
+
+def resolve_players(db: ShardedDatabase, args) -> List[int]:
+    """Collect player ids from arguments, an id file and usernames"""
+    player_ids = list(args.player_ids)
+    if args.file:
+        with open(args.file) as f:
+            player_ids += [int(line) for line in f if line.strip()]
+    for username in args.usernames or []:
+        player = db.get_player_by_username(username)
+        if not player:
+            print(f"Unknown username: {username}", file=sys.stderr)
+            continue
+        player_ids.append(player['id'])
+    return list(dict.fromkeys(player_ids))
+
+def print_progress(progress: Dict):
+    deleted = ', '.join(f"{table} {count}" for table, count in progress['deleted'].items())
+    print(f"\r  [{progress['players_done']}/{progress['players_total']}] "
+          f"player {progress['player_id']}: {deleted}", end='', flush=True)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Chimera-VX player purge")
+    parser.add_argument('player_ids', type=int, nargs='*')
+    parser.add_argument('--file', help='file with one player id per line')
+    parser.add_argument('--usernames', nargs='+')
+    parser.add_argument('--db', default='data/chimera.db')
+    parser.add_argument('--shards', type=int, default=1, help='shard count (database.shards)')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.002, help='seconds between chunks')
+    parser.add_argument('--yes', action='store_true', help='do not ask for confirmation')
+    args = parser.parse_args()
+
+    db = ShardedDatabase(args.db, shards=args.shards, rank_index=False)
+    try:
+        player_ids = resolve_players(db, args)
+        if not player_ids:
+            print("No players to purge")
+            return 1
+
+        if not args.yes:
+            answer = input(f"Permanently delete {len(player_ids)} players? [y/N] ")
+            if answer.strip().lower() != 'y':
+                print("Aborted")
+                return 1
+
+        totals = db.purge_players(player_ids, chunk_size=args.chunk_size,
+                                  pause=args.pause, on_progress=print_progress)
+    finally:
+        db.close()
+
+    print(f"\nPurged {totals.get('players', 0)} players: "
+          + ', '.join(f"{table} {count}" for table, count in totals.items() if table != 'players'))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# chimera-vx/server/query_metrics.py
+# Per-method query timing for the Database layer
+
+import threading
+from collections import deque
+from typing import Deque, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+class QueryMetrics:
+    """Call counts, latency percentiles and rows returned per Database method"""
+
+    def __init__(self, sample_size: int = 1024):
+        self.sample_size = sample_size
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all recorded samples"""
+        with self.lock:
+            self.counts: Dict[str, int] = {}
+            self.rows: Dict[str, int] = {}
+            self.total_ms: Dict[str, float] = {}
+            self.samples: Dict[str, Deque[float]] = {}
+
+    def record(self, method: str, seconds: float, rows: int):
+        """Record one call"""
+        ms = seconds * 1000
+        with self.lock:
+            if method not in self.counts:
+                self.counts[method] = 0
+                self.rows[method] = 0
+                self.total_ms[method] = 0.0
+                self.samples[method] = deque(maxlen=self.sample_size)
+            self.counts[method] += 1
+            self.rows[method] += rows
+            self.total_ms[method] += ms
+            self.samples[method].append(ms)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Get metrics per method, slowest total time first"""
+        with self.lock:
+            methods = {
+                method: (self.counts[method], self.rows[method],
+                         self.total_ms[method], sorted(self.samples[method]))
+                for method in self.counts
+            }
+
+        result = {}
+        for method, (count, rows, total_ms, samples) in methods.items():
+            result[method] = {
+                'count': count,
+                'rows': rows,
+                'total_ms': total_ms,
+                'p50_ms': percentile(samples, 0.50),
+                'p99_ms': percentile(samples, 0.99)
+            }
+        return dict(sorted(result.items(), key=lambda item: -item[1]['total_ms']))
+
+    def to_prometheus(self) -> str:
+        """Render metrics in Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP chimera_db_query_calls_total Database method calls',
+            '# TYPE chimera_db_query_calls_total counter'
+        ]
+        lines += [f'chimera_db_query_calls_total{{method="{m}"}} {v["count"]}'
+                  for m, v in snapshot.items()]
+        lines += [
+            '# HELP chimera_db_query_rows_total Rows returned by database methods',
+            '# TYPE chimera_db_query_rows_total counter'
+        ]
+        lines += [f'chimera_db_query_rows_total{{method="{m}"}} {v["rows"]}'
+                  for m, v in snapshot.items()]
+        lines += [
+            '# HELP chimera_db_query_latency_ms Database method latency (recent samples)',
+            '# TYPE chimera_db_query_latency_ms summary'
+        ]
+        for m, v in snapshot.items():
+            lines.append(f'chimera_db_query_latency_ms{{method="{m}",quantile="0.5"}} {v["p50_ms"]:.3f}')
+            lines.append(f'chimera_db_query_latency_ms{{method="{m}",quantile="0.99"}} {v["p99_ms"]:.3f}')
+            lines.append(f'chimera_db_query_latency_ms_sum{{method="{m}"}} {v["total_ms"]:.3f}')
+            lines.append(f'chimera_db_query_latency_ms_count{{method="{m}"}} {v["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def count_rows(result) -> int:
+    """Rows represented by a Database method's return value"""
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
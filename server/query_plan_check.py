@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# chimera-vx/server/query_plan_check.py
+# EXPLAIN QUERY PLAN regression check for every Database query
+#
+# Exercises each Database method against a large synthetic event database,
+# captures the SQL it issues and fails (exit status 1) when a statement
+# scans a whole table or sorts without an index. tests/test_query_plans.py
+# runs the same check per scenario under pytest.
+#
+# Usage:
+#   python query_plan_check.py --players 20000
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Set, Tuple
+
+from database import Database, SOLVED_PUZZLE_SUMMARY, LEADERBOARD_SUMMARY
+from db_benchmark import seed_event
+
+PLAN_PUZZLE = json.dumps({'type': 'quantum', 'files': {'circuit.qasm': 'h q[0];\n' * 100}})
+
+# Every SQL-issuing Database method with representative arguments
+SCENARIOS: List[Tuple[str, Callable[[Database], None]]] = [
+    ('create_player', lambda db: db.create_player('plan_user', 'plan@example.com', 'plan_hw')),
+    ('get_player', lambda db: db.get_player(1)),
+    ('get_player_by_username', lambda db: db.get_player_by_username('bench_1')),
+    ('get_player_by_hardware', lambda db: db.get_player_by_hardware('hw_1')),
+    ('update_player_progress', lambda db: db.update_player_progress(1, 2, 60)),
+    ('get_player_rank', lambda db: db.get_player_rank(1)),
+    ('load_rank_rows', lambda db: db.load_rank_rows()),
+    ('create_session', lambda db: db.create_session(1, 'plan_session', '127.0.0.1')),
+    ('get_player_by_session', lambda db: db.get_player_by_session('bench_session_1')),
+    ('update_player_last_active', lambda db: db.update_player_last_active(1)),
+    ('flush_activity', lambda db: db.flush_activity()),
+    ('delete_session', lambda db: db.delete_session('plan_session')),
+    ('clean_old_sessions', lambda db: db.clean_old_sessions(86400)),
+    ('get_player_sessions', lambda db: db.get_player_sessions(1)),
+    ('load_session_expiry_rows', lambda db: db.session_expiry.ensure_loaded(db.load_session_expiry_rows)),
+    ('expire_sessions', lambda db: (db.session_expiry.schedule('bench_session_2', 0), db.expire_sessions())),
+    ('get_player_by_token', lambda db: db.get_player_by_token('plan_token', 1, int(time.time()) + 60)),
+    ('add_revocation', lambda db: db.add_revocation(int(time.time()) + 60, token_id='plan_token')),
+    ('get_revocations', lambda db: db.get_revocations(0)),
+    ('prune_revocations', lambda db: db.prune_revocations()),
+    ('create_puzzle', lambda db: db.create_puzzle(1, 1, 'quantum', PLAN_PUZZLE, 'plan_hash', int(time.time()))),
+    ('get_current_puzzle', lambda db: db.get_current_puzzle(1)),
+    ('get_puzzle', lambda db: db.get_puzzle(1)),
+    ('increment_puzzle_attempts', lambda db: db.increment_puzzle_attempts(1)),
+    ('mark_puzzle_solved', lambda db: db.mark_puzzle_solved(1, int(time.time()), 'FLAG{plan}')),
+    ('update_puzzle', lambda db: db.update_puzzle(2, PLAN_PUZZLE, 'plan_hash', int(time.time()))),
+    ('load_puzzle_data', lambda db: db.load_puzzle_data(db.get_puzzle(2)['puzzle_data'])),
+    ('externalize_puzzle_blobs', lambda db: db.externalize_puzzle_blobs()),
+    ('gc_blobs', lambda db: db.gc_blobs()),
+    ('get_solved_puzzles', lambda db: db.get_solved_puzzles(1)),
+    ('get_solved_puzzles (summary)', lambda db: db.get_solved_puzzles(1, columns=SOLVED_PUZZLE_SUMMARY)),
+    ('get_last_challenge_request', lambda db: db.get_last_challenge_request(1)),
+    ('create_submission', lambda db: db.create_submission(1, 1, 'FLAG{plan}', False)),
+    ('get_submissions', lambda db: db.get_submissions(1)),
+    ('update_hardware_profile', lambda db: db.update_hardware_profile(1, {'fingerprint': 'hw_1'})),
+    ('get_hardware_profile', lambda db: db.get_hardware_profile(1)),
+    ('claim_hardware', lambda db: db.claim_hardware('plan_hw_claim')),
+    ('bind_hardware', lambda db: db.bind_hardware('plan_hw_claim', 1)),
+    ('release_hardware', lambda db: db.release_hardware('plan_hw_claim', player_ids=[1, 2])),
+    ('increment_suspicious_count', lambda db: db.increment_suspicious_count(1)),
+    ('log_cheat_event', lambda db: db.log_cheat_event(1, 'plan_check', 1, {})),
+    ('get_cheat_logs', lambda db: db.get_cheat_logs(1)),
+    ('archive_old_rows', lambda db: db.archive_old_rows(3600, batch_size=500)),
+    ('update_leaderboard', lambda db: db.update_leaderboard(1)),
+    ('get_leaderboard', lambda db: db.get_leaderboard(100, 0)),
+    ('get_leaderboard (summary)', lambda db: db.get_leaderboard(100, 0, columns=LEADERBOARD_SUMMARY)),
+    ('check_leaderboard', lambda db: db.check_leaderboard()),
+    ('rebuild_leaderboard', lambda db: db.rebuild_leaderboard()),
+    ('get_total_players', lambda db: db.get_total_players()),
+    ('update_statistic', lambda db: db.update_statistic('plan_metric', 1)),
+    ('get_statistic', lambda db: db.get_statistic('plan_metric')),
+    ('get_statistics', lambda db: db.get_statistics(['plan_metric', 'other_metric'])),
+    ('increment_statistic', lambda db: db.increment_statistic('plan_metric')),
+    ('flush_statistics', lambda db: (db.count_statistic('plan_metric'), db.flush_statistics())),
+    ('record_completion', lambda db: db.record_completion(1, 'FLAG{plan}', 3600)),
+    ('add_achievement', lambda db: db.add_achievement(1, {'type': 'plan_check'})),
+    ('update_player_metadata', lambda db: db.update_player_metadata(1, {'plan': True, 'n': 1})),
+    ('get_completions', lambda db: db.get_completions(100, 0)),
+    ('reset_player', lambda db: db.reset_player(3)),
+    ('purge_players', lambda db: db.purge_players([4, 5])),
+]
+
+# Plans that are intentionally full scans or unindexed sorts
+ALLOWED: Dict[str, str] = {
+    'load_rank_rows': 'loads every active player once to build the rank index',
+    'load_session_expiry_rows': 'loads every session once to seed the expiry timer wheel',
+    'gc_blobs': 'periodic sweep for unreferenced blobs',
+    'check_leaderboard': 'consistency check compares every player with its sources',
+    'rebuild_leaderboard': 'repair path recomputes every row from source',
+}
+
+# Known regressions, reported but not failing; remove entries once fixed
+KNOWN_ISSUES: Dict[str, str] = {
+}
+
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)')
+INDEX_WALK = re.compile(r'^SCAN \w+ USING (COVERING )?INDEX')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE')
+LIMITED = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+SKIPPED_STATEMENTS = ('INSERT', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK',
+                      'SAVEPOINT', 'RELEASE', 'VACUUM', 'ANALYZE', 'CREATE')
+
+
+def capture_statements(db: Database) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """Run every scenario and record the SQL issued, keyed by method"""
+    statements: Dict[str, List[str]] = {}
+    errors: Dict[str, str] = {}
+    current = {'method': None}
+
+    def trace(sql: str):
+        if current['method']:
+            statements.setdefault(current['method'], []).append(sql)
+
+    db.pool.writer.set_trace_callback(trace)
+    for method, scenario in SCENARIOS:
+        current['method'] = method
+        try:
+            scenario(db)
+        except Exception as e:
+            errors[method] = f"{type(e).__name__}: {e}"
+    current['method'] = None
+    db.pool.writer.set_trace_callback(None)
+
+    return statements, errors
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """Get the EXPLAIN QUERY PLAN detail lines for a statement"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}').fetchall()]
+
+
+def check_plans(db_path: str, statements: Dict[str, List[str]]) -> Dict[str, Set[str]]:
+    """Find full scans and unindexed sorts per method"""
+    conn = sqlite3.connect(db_path)
+    violations: Dict[str, Set[str]] = {}
+    try:
+        for method, sqls in statements.items():
+            for sql in sqls:
+                if sql.lstrip().upper().startswith(SKIPPED_STATEMENTS):
+                    continue
+                for detail in explain(conn, sql):
+                    # Walking an index in order under a LIMIT is a top-N read
+                    if INDEX_WALK.search(detail) and LIMITED.search(sql):
+                        continue
+                    if FULL_SCAN.search(detail) or TEMP_SORT.search(detail):
+                        violations.setdefault(method, set()).add(detail)
+    finally:
+        conn.close()
+    return violations
+
+
+def run_check(players: int, verbose: bool = False) -> Tuple[Dict[str, List[str]], Dict[str, str],
+                                                            Dict[str, Set[str]]]:
+    """Seed a temporary database and check every scenario's plans
+
+    Returns (statements, errors, violations), each keyed by scenario name.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "plan_check.db")
+
+        # Single connection so every statement goes through the traced writer;
+        # no rank index so get_player_rank issues its SQL fallback
+        db = Database(db_path, pool_size=0, rank_index=False,
+                      archive_path=str(Path(tmp) / "plan_check_archive.db"))
+        seed_event(db, players)
+
+        statements, errors = capture_statements(db)
+        db.close()
+        violations = check_plans(db_path, statements)
+
+        if verbose:
+            conn = sqlite3.connect(db_path)
+            for method, sqls in statements.items():
+                for sql in dict.fromkeys(sqls):
+                    print(f"{method}: {' '.join(sql.split())}")
+                    for detail in explain(conn, sql):
+                        print(f"    {detail}")
+            conn.close()
+
+    return statements, errors, violations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Chimera-VX query plan regression check")
+    parser.add_argument('--players', type=int, default=20000)
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    statements, errors, violations = run_check(args.players, args.verbose)
+
+    failed = False
+    print(f"Checked {sum(len(s) for s in statements.values())} statements "
+          f"from {len(statements)} methods against {args.players} players")
+
+    for method, _ in SCENARIOS:
+        if method in errors:
+            print(f"ERROR   {method}: {errors[method]}")
+            failed = True
+        elif method in violations:
+            details = '; '.join(sorted(violations[method]))
+            if method in ALLOWED:
+                print(f"ALLOWED {method}: {details} ({ALLOWED[method]})")
+            elif method in KNOWN_ISSUES:
+                print(f"KNOWN   {method}: {details} ({KNOWN_ISSUES[method]})")
+            else:
+                print(f"FAIL    {method}: {details}")
+                failed = True
+        elif method in KNOWN_ISSUES:
+            print(f"FIXED   {method}: remove it from KNOWN_ISSUES")
+            failed = True
+
+    if not failed:
+        print("No query plan regressions")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
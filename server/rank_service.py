@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# chimera-vx/server/rank_service.py
+# Logarithmic-time leaderboard rank lookups for Chimera-VX
+
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sort key: best player first (progress DESC, total_time ASC, id ASC)
+RankKey = Tuple[int, int, int]
+
+def rank_key(player_id: int, progress: int, total_time: int) -> RankKey:
+    """Build the leaderboard sort key for a player"""
+    return (-(progress or 0), total_time or 0, player_id)
+
+
+class OrderStatisticList:
+    """Sorted multiset with O(log n) rank queries
+
+    Keys live in bounded, individually sorted chunks. A Fenwick tree over the
+    chunk lengths gives the number of keys before any chunk in O(log n).
+    """
+
+    LOAD = 512  # Target chunk size; chunks split at twice this
+
+    def __init__(self, keys: Iterable[RankKey] = ()):
+        self.chunks: List[List[RankKey]] = []
+        self.maxes: List[RankKey] = []
+        self.tree: List[int] = [0]
+        self.size = 0
+        self.load(keys)
+
+    def load(self, keys: Iterable[RankKey]):
+        """Replace contents with keys in O(n log n)"""
+        ordered = sorted(keys)
+        self.chunks = [ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)]
+        self.maxes = [chunk[-1] for chunk in self.chunks]
+        self.size = len(ordered)
+        self._rebuild_tree()
+
+    def _rebuild_tree(self):
+        """Rebuild the Fenwick tree over chunk lengths in O(chunks)"""
+        tree = [0] + [len(chunk) for chunk in self.chunks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def _tree_add(self, index: int, delta: int):
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _tree_prefix(self, index: int) -> int:
+        """Number of keys in chunks before index"""
+        total = 0
+        i = index
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, key: RankKey):
+        """Insert a key"""
+        if not self.chunks:
+            self.chunks.append([key])
+            self.maxes.append(key)
+            self.size = 1
+            self._rebuild_tree()
+            return
+
+        i = min(bisect_left(self.maxes, key), len(self.chunks) - 1)
+        chunk = self.chunks[i]
+        insort(chunk, key)
+        self.maxes[i] = chunk[-1]
+        self.size += 1
+
+        if len(chunk) > 2 * self.LOAD:
+            self.chunks[i:i + 1] = [chunk[:self.LOAD], chunk[self.LOAD:]]
+            self.maxes[i:i + 1] = [chunk[self.LOAD - 1], chunk[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key: RankKey) -> bool:
+        """Remove a key; returns False if it was not present"""
+        i = bisect_left(self.maxes, key)
+        if i == len(self.chunks):
+            return False
+
+        chunk = self.chunks[i]
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            return False
+
+        del chunk[j]
+        self.size -= 1
+
+        if not chunk:
+            del self.chunks[i]
+            del self.maxes[i]
+            self._rebuild_tree()
+        else:
+            self.maxes[i] = chunk[-1]
+            self._tree_add(i, -1)
+        return True
+
+    def index(self, key: RankKey) -> int:
+        """Number of keys strictly less than key"""
+        i = bisect_left(self.maxes, key)
+        if i == len(self.chunks):
+            return self.size
+        return self._tree_prefix(i) + bisect_left(self.chunks[i], key)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class RankService:
+    """In-memory order-statistic index of active players kept in sync by Database"""
+
+    def __init__(self):
+        self.keys: Dict[int, RankKey] = {}
+        self.index = OrderStatisticList()
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.loaded = False
+
+        # Changes made while the initial build is reading rows
+        self.building = False
+        self.pending: Dict[int, Optional[RankKey]] = {}
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[Tuple[int, int, int]]]):
+        """Build the index on first use"""
+        if self.loaded:
+            return
+        with self.build_lock:
+            if not self.loaded:
+                with self.lock:
+                    self.building = True
+                    self.pending = {}
+                try:
+                    self.rebuild(loader())
+                finally:
+                    self.building = False
+
+    def rebuild(self, rows: Iterable[Tuple[int, int, int]]):
+        """Load (player_id, progress, total_time) rows for all active players"""
+        with self.lock:
+            self.keys = {
+                player_id: rank_key(player_id, progress, total_time)
+                for player_id, progress, total_time in rows
+            }
+            for player_id, key in self.pending.items():
+                if key is None:
+                    self.keys.pop(player_id, None)
+                else:
+                    self.keys[player_id] = key
+            self.pending = {}
+            self.index.load(self.keys.values())
+            self.loaded = True
+
+        logger.info(f"Rank index built for {len(self.keys)} players")
+
+    def update(self, player_id: int, progress: int, total_time: int):
+        """Insert or move a player"""
+        key = rank_key(player_id, progress, total_time)
+        with self.lock:
+            if not self.loaded:
+                if self.building:
+                    self.pending[player_id] = key
+                return  # Otherwise picked up by the initial build
+            old = self.keys.get(player_id)
+            if old == key:
+                return
+            if old is not None:
+                self.index.remove(old)
+            self.index.add(key)
+            self.keys[player_id] = key
+
+    def remove(self, player_id: int):
+        """Drop a player (deactivated or purged)"""
+        with self.lock:
+            if not self.loaded:
+                if self.building:
+                    self.pending[player_id] = None
+                return
+            old = self.keys.pop(player_id, None)
+            if old is not None:
+                self.index.remove(old)
+
+    def count_ahead(self, player_id: int, progress: int, total_time: int) -> int:
+        """Number of indexed players ranked before a key (which need not be indexed)"""
+        with self.lock:
+            return self.index.index(rank_key(player_id, progress, total_time))
+
+    def rank(self, player_id: int) -> Optional[int]:
+        """1-based leaderboard rank, or None for unknown/inactive players"""
+        with self.lock:
+            key = self.keys.get(player_id)
+            if key is None:
+                return None
+            return self.index.index(key) + 1
+
+    def __len__(self) -> int:
+        return len(self.keys)
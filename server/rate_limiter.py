@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# chimera-vx/server/rate_limiter.py
+# Token-bucket rate limiting for Chimera-VX
+#
+# Every (policy, client) pair owns a bucket of at most burst tokens that
+# refills at max_requests / window tokens per second; a request spends one
+# token. A bucket is two numbers updated in O(1) per request, and the table
+# of buckets is capped at max_keys with approximate-LRU eviction.
+
+import threading
+import time
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RatePolicy(NamedTuple):
+    max_requests: int  # Requests allowed per window (steady state)
+    window: float      # seconds
+    burst: int         # Bucket size: requests allowed back to back
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second"""
+        return self.max_requests / self.window
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'RatePolicy':
+        """Policy from {'max': n, 'window': seconds, 'burst': n (defaults to max)}"""
+        return cls(config['max'], config['window'], config.get('burst', config['max']))
+
+
+class RateLimiter:
+    """Per-client token buckets with per-route policies and a bounded key table"""
+
+    EVICTION_SAMPLE = 8  # Oldest entries examined per eviction
+
+    def __init__(self, default: RatePolicy, routes: Optional[Dict[str, RatePolicy]] = None,
+                 max_keys: int = 100000):
+        self.default = default
+        self.routes = routes or {}
+        self.max_keys = max_keys
+
+        # (route or None, client) -> [tokens, updated_at], in insertion order
+        self.buckets: Dict[Tuple[Optional[str], Hashable], List[float]] = {}
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.stats = {
+            'allowed': 0,
+            'limited': 0,
+            'evictions': 0
+        }
+
+    @classmethod
+    def from_config(cls, security: Dict) -> 'RateLimiter':
+        """Limiter from the server's security config section"""
+        default = RatePolicy(security['rate_limit_max'], security['rate_limit_window'],
+                             security['rate_limit_max'])
+        routes = {route: RatePolicy.from_config(policy)
+                  for route, policy in security['rate_limit_routes'].items()}
+        return cls(default, routes, max_keys=security['rate_limit_keys'])
+
+    def policy(self, route: Optional[str]) -> Tuple[Optional[str], RatePolicy]:
+        """Bucket namespace and policy of a route; unlisted routes share the default"""
+        if route in self.routes:
+            return route, self.routes[route]
+        return None, self.default
+
+    def check(self, client: Hashable, route: Optional[str] = None,
+              now: Optional[float] = None) -> float:
+        """Spend a token for client on route; 0 if allowed, else seconds until allowed"""
+        namespace, policy = self.policy(route)
+        key = (namespace, client)
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= self.max_keys:
+                    self._evict(now)
+                bucket = self.buckets[key] = [policy.burst, now]
+            else:
+                bucket[0] = min(policy.burst, bucket[0] + (now - bucket[1]) * policy.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.stats['allowed'] += 1
+                return 0.0
+            self.stats['limited'] += 1
+            return (1 - bucket[0]) / policy.rate
+
+    def allow(self, client: Hashable, route: Optional[str] = None) -> bool:
+        return self.check(client, route) == 0.0
+
+    def _evict(self, now: float):
+        """Drop one bucket, preferring an idle one among the oldest inserted
+
+        Active buckets in the sample get a second chance at the back of the
+        table, so busy clients stay and one-off clients age out.
+        """
+        oldest = None
+        for _ in range(min(self.EVICTION_SAMPLE, len(self.buckets))):
+            key = next(iter(self.buckets))
+            bucket = self.buckets.pop(key)
+            if self._is_idle(key, bucket, now):
+                self.stats['evictions'] += 1
+                return
+            self.buckets[key] = bucket
+            if oldest is None or bucket[1] < oldest[1][1]:
+                oldest = (key, bucket)
+        if oldest is not None:
+            del self.buckets[oldest[0]]
+            self.stats['evictions'] += 1
+
+    def _is_idle(self, key: Tuple[Optional[str], Hashable], bucket: List[float], now: float) -> bool:
+        """A bucket that has refilled completely carries no state"""
+        policy = self.routes.get(key[0], self.default)
+        return bucket[0] + (now - bucket[1]) * policy.rate >= policy.burst
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop idle buckets; returns how many"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            idle = [key for key, bucket in self.buckets.items() if self._is_idle(key, bucket, now)]
+            for key in idle:
+                del self.buckets[key]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self.buckets)
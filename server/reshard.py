@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# chimera-vx/server/reshard.py
+# Offline tool: move players between shard files when the shard count changes
+#
+# Usage:
+#   python reshard.py --from 1 --to 4 --db data/chimera.db
+#   python reshard.py --from 16 --to 4 --archive data/chimera_archive.db --yes
+#
+# Stop the server first and set database.shards to the new count afterwards.
+# Every bucket (see sharding.py) whose shard changes is copied to its new file
+# in one transaction and then deleted from the old one in another, so an
+# interrupted run is finished by running the tool again. Player and puzzle
+# ids are kept; submission, cheat log, profile and session rows get new ids
+# in their new file. Puzzles created before sharding are first renumbered
+# into their player's bucket (archived rows keep the old puzzle ids), and
+# blobs left behind in the old files are removed by the server's gc_blobs.
+
+import argparse
+import sqlite3
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+import logging
+
+from archive_store import ArchiveStore
+from database import Database
+from sharding import (SHARD_BUCKETS, bucket_for_id, bucket_for_key, next_bucket_id,
+                      shard_for_bucket, shard_path, validate_shard_count)
+
+logger = logging.getLogger(__name__)
+
+# Tables whose rows follow their player, copied without their own ids
+HISTORY_TABLES = ('submissions', 'hardware_profiles', 'cheat_logs', 'leaderboard')
+
+MOVING_PLAYERS = 'SELECT id FROM temp.moving'
+MOVING_PUZZLES = f'SELECT id FROM {{schema}}.puzzles WHERE player_id IN ({MOVING_PLAYERS})'
+
+def table_columns(conn: sqlite3.Connection, table: str, with_id: bool = True) -> str:
+    """Stored (non-generated) columns of a table as a column list"""
+    columns = [row[1] for row in conn.execute(f'PRAGMA main.table_info({table})')]
+    return ', '.join(column for column in columns if with_id or column != 'id')
+
+@contextmanager
+def attached(dst_path: str, src_path: str) -> Iterator[sqlite3.Connection]:
+    """Autocommit connection to dst with src attached as schema 'src'"""
+    conn = sqlite3.connect(dst_path, isolation_level=None)
+    conn.execute('PRAGMA busy_timeout=5000')
+    conn.execute('ATTACH DATABASE ? AS src', (src_path,))
+    conn.execute('CREATE TEMP TABLE moving (id INTEGER PRIMARY KEY)')
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+class Resharder:
+    """Move buckets of players from an old to a new shard layout"""
+
+    def __init__(self, db_path: str, old_shards: int, new_shards: int,
+                 archive_path: str = None):
+        validate_shard_count(old_shards)
+        validate_shard_count(new_shards)
+        self.old_shards = old_shards
+        self.new_shards = new_shards
+        files = range(max(old_shards, new_shards))
+        self.paths = [shard_path(db_path, index) for index in files]
+        self.archive_paths = [shard_path(archive_path, index) for index in files] if archive_path else None
+
+    def run(self) -> Dict[str, int]:
+        """Reshard; returns players and sessions moved"""
+        self.prepare()
+        before = self.count_players()
+
+        moved = {'players': 0, 'sessions': 0, 'puzzles_renumbered': 0}
+        for index in range(self.old_shards):
+            moved['puzzles_renumbered'] += self.align_puzzle_ids(self.paths[index])
+
+        for bucket in range(SHARD_BUCKETS):
+            src = shard_for_bucket(bucket, self.old_shards)
+            dst = shard_for_bucket(bucket, self.new_shards)
+            if src != dst:
+                moved['players'] += self.move_bucket(src, dst, bucket)
+
+        for index in range(len(self.paths)):
+            moved['sessions'] += self.move_sessions(index)
+
+        after = self.count_players()
+        if after != before:
+            raise RuntimeError(f"Player count changed from {before} to {after}")
+        return moved
+
+    def prepare(self):
+        """Create and migrate every shard (and archive) file involved"""
+        for index, path in enumerate(self.paths):
+            Database(path, pool_size=1, rank_index=False, sharded=True).close()
+            if self.archive_paths:
+                ArchiveStore(self.archive_paths[index], readers=0).close()
+
+    def count_players(self) -> int:
+        total = 0
+        for path in self.paths:
+            conn = sqlite3.connect(path)
+            try:
+                total += conn.execute('SELECT COUNT(*) FROM players').fetchone()[0]
+            finally:
+                conn.close()
+        return total
+
+    def align_puzzle_ids(self, path: str) -> int:
+        """Give puzzles created before sharding ids in their player's bucket"""
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            with write_transaction(conn):
+                misplaced = conn.execute(f'''
+                    SELECT id, player_id FROM puzzles
+                    WHERE id % {SHARD_BUCKETS} != player_id % {SHARD_BUCKETS}
+                    ORDER BY id
+                ''').fetchall()
+
+                last_id = None
+                for puzzle_id, player_id in misplaced:
+                    last_id = next_bucket_id(conn, 'puzzles', bucket_for_id(player_id), last_id)
+                    conn.execute('UPDATE puzzles SET id = ? WHERE id = ?', (last_id, puzzle_id))
+                    conn.execute('UPDATE submissions SET puzzle_id = ? WHERE puzzle_id = ?',
+                                 (last_id, puzzle_id))
+                    conn.execute('UPDATE puzzle_blobs SET puzzle_id = ? WHERE puzzle_id = ?',
+                                 (last_id, puzzle_id))
+        finally:
+            conn.close()
+
+        if misplaced:
+            logger.info(f"{path}: renumbered {len(misplaced)} puzzles into their player's bucket")
+        return len(misplaced)
+
+    # ==================== PLAYERS ====================
+
+    def move_bucket(self, src: int, dst: int, bucket: int) -> int:
+        """Copy a bucket's players to shard dst, then delete them from shard src"""
+        with attached(self.paths[dst], self.paths[src]) as conn:
+            conn.execute(f'''
+                INSERT INTO temp.moving SELECT id FROM src.players
+                WHERE id % {SHARD_BUCKETS} = ?
+            ''', (bucket,))
+            player_ids = [row[0] for row in conn.execute(MOVING_PLAYERS)]
+            if not player_ids:
+                return 0
+
+            with write_transaction(conn):
+                # Copies left by an interrupted run; the source is authoritative
+                self.delete_players(conn, 'main')
+                self.copy_players(conn)
+
+            if self.archive_paths:
+                self.move_archive(src, dst, player_ids)
+
+            with write_transaction(conn):
+                self.delete_players(conn, 'src')
+
+        logger.info(f"Bucket {bucket}: moved {len(player_ids)} players from shard {src} to {dst}")
+        return len(player_ids)
+
+    def copy_players(self, conn: sqlite3.Connection):
+        # Puzzles before players: the solved-count triggers must not count twice
+        puzzles = table_columns(conn, 'puzzles')
+        conn.execute(f'''
+            INSERT INTO main.puzzles ({puzzles}) SELECT {puzzles} FROM src.puzzles
+            WHERE player_id IN ({MOVING_PLAYERS})
+        ''')
+        conn.execute(f'''
+            INSERT OR IGNORE INTO main.puzzle_blobs (puzzle_id, hash)
+            SELECT puzzle_id, hash FROM src.puzzle_blobs
+            WHERE puzzle_id IN ({MOVING_PUZZLES.format(schema='src')})
+        ''')
+        blobs = table_columns(conn, 'blobs')
+        conn.execute(f'''
+            INSERT OR IGNORE INTO main.blobs ({blobs}) SELECT {blobs} FROM src.blobs
+            WHERE hash IN (SELECT hash FROM main.puzzle_blobs
+                           WHERE puzzle_id IN ({MOVING_PUZZLES.format(schema='main')}))
+        ''')
+
+        players = table_columns(conn, 'players')
+        conn.execute(f'''
+            INSERT INTO main.players ({players}) SELECT {players} FROM src.players
+            WHERE id IN ({MOVING_PLAYERS})
+        ''')
+        for table in HISTORY_TABLES:
+            columns = table_columns(conn, table, with_id=False)
+            conn.execute(f'''
+                INSERT INTO main.{table} ({columns}) SELECT {columns} FROM src.{table}
+                WHERE player_id IN ({MOVING_PLAYERS})
+            ''')
+
+    def delete_players(self, conn: sqlite3.Connection, schema: str):
+        # Players first, so puzzle deletes do not re-create leaderboard rows
+        conn.execute(f'DELETE FROM {schema}.players WHERE id IN ({MOVING_PLAYERS})')
+        conn.execute(f'''
+            DELETE FROM {schema}.puzzle_blobs
+            WHERE puzzle_id IN ({MOVING_PUZZLES.format(schema=schema)})
+        ''')
+        conn.execute(f'DELETE FROM {schema}.puzzles WHERE player_id IN ({MOVING_PLAYERS})')
+        for table in HISTORY_TABLES:
+            conn.execute(f'DELETE FROM {schema}.{table} WHERE player_id IN ({MOVING_PLAYERS})')
+
+    def move_archive(self, src: int, dst: int, player_ids: List[int]):
+        """Move the players' archived segments along with them"""
+        with attached(self.archive_paths[dst], self.archive_paths[src]) as conn:
+            conn.executemany('INSERT INTO temp.moving (id) VALUES (?)',
+                             [(player_id,) for player_id in player_ids])
+            columns = table_columns(conn, 'segments', with_id=False)
+            with write_transaction(conn):
+                conn.execute(f'DELETE FROM main.segments WHERE player_id IN ({MOVING_PLAYERS})')
+                conn.execute(f'''
+                    INSERT INTO main.segments ({columns}) SELECT {columns} FROM src.segments
+                    WHERE player_id IN ({MOVING_PLAYERS})
+                ''')
+            with write_transaction(conn):
+                conn.execute(f'DELETE FROM src.segments WHERE player_id IN ({MOVING_PLAYERS})')
+
+    # ==================== SESSIONS ====================
+
+    def move_sessions(self, index: int) -> int:
+        """Move sessions of one file to the shards their hashes now route to"""
+        conn = sqlite3.connect(self.paths[index])
+        try:
+            targets: Dict[int, List[int]] = {}
+            for session_id, session_hash in conn.execute('SELECT id, session_hash FROM sessions'):
+                target = shard_for_bucket(bucket_for_key(session_hash), self.new_shards)
+                if target != index:
+                    targets.setdefault(target, []).append(session_id)
+        finally:
+            conn.close()
+
+        for target, session_ids in targets.items():
+            with attached(self.paths[target], self.paths[index]) as conn:
+                conn.executemany('INSERT INTO temp.moving (id) VALUES (?)',
+                                 [(session_id,) for session_id in session_ids])
+                columns = table_columns(conn, 'sessions', with_id=False)
+                with write_transaction(conn):
+                    conn.execute(f'''
+                        INSERT OR IGNORE INTO main.sessions ({columns})
+                        SELECT {columns} FROM src.sessions WHERE id IN ({MOVING_PLAYERS})
+                    ''')
+                with write_transaction(conn):
+                    conn.execute(f'DELETE FROM src.sessions WHERE id IN ({MOVING_PLAYERS})')
+
+        return sum(len(session_ids) for session_ids in targets.values())
+
+# ==================== MAIN ====================
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Chimera-VX shard rebalancing")
+    parser.add_argument('--db', default='data/chimera.db', help='path of shard 0')
+    parser.add_argument('--from', dest='old_shards', type=int, required=True)
+    parser.add_argument('--to', dest='new_shards', type=int, required=True)
+    parser.add_argument('--archive', help='archive path (database.archive_path), if enabled')
+    parser.add_argument('--yes', action='store_true', help='do not ask for confirmation')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    if not args.yes:
+        answer = input(f"Reshard {args.db} from {args.old_shards} to {args.new_shards} shards? "
+                       f"The server must be stopped. [y/N] ")
+        if answer.strip().lower() != 'y':
+            print("Aborted")
+            return 1
+
+    resharder = Resharder(args.db, args.old_shards, args.new_shards, args.archive)
+    moved = resharder.run()
+
+    print(f"Moved {moved['players']} players and {moved['sessions']} sessions "
+          f"({moved['puzzles_renumbered']} puzzles renumbered)")
+    if args.new_shards < args.old_shards:
+        print("Now empty and no longer used: "
+              + ', '.join(resharder.paths[args.new_shards:]))
+    print(f"Set database.shards to {args.new_shards} before starting the server")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# chimera-vx/server/session_cache.py
+# In-process cache of authenticated sessions for Chimera-VX
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SessionCache:
+    """LRU map of session hash -> player row, each entry bounded by a TTL
+
+    An entry never outlives its session's expires_at. Entries are dropped
+    explicitly when the session is deleted or the player's row changes;
+    the TTL only bounds staleness from writes made outside this process.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()  # session_hash -> (player, deadline)
+        self.by_player: Dict[int, Set[str]] = {}
+        self.lock = threading.Lock()
+
+        # Bumped by every invalidation; a put() whose read started before the
+        # last invalidation may carry a stale row and is dropped
+        self.generation = 0
+
+        # Statistics
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def get(self, session_hash: str) -> Optional[Dict]:
+        """Cached player for a live session (a copy), or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(session_hash)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            player, deadline = entry
+            if deadline <= now:
+                self._remove(session_hash)
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(session_hash)
+            self.stats['hits'] += 1
+            return dict(player)
+
+    def put(self, session_hash: str, player: Dict, expires_at: int, generation: int):
+        """Cache a player read while self.generation was generation"""
+        deadline = min(time.time() + self.ttl, expires_at)
+        with self.lock:
+            if generation != self.generation:
+                return
+            self._remove(session_hash)
+            self.entries[session_hash] = (dict(player), deadline)
+            self.by_player.setdefault(player['id'], set()).add(session_hash)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+
+    def invalidate(self, session_hash: str):
+        """Forget one session (logout)"""
+        with self.lock:
+            self.generation += 1
+            self.stats['invalidations'] += self._remove(session_hash)
+
+    def invalidate_player(self, player_id: int):
+        """Forget every session of a player (row changed, reset, banned or purged)"""
+        with self.lock:
+            self.generation += 1
+            for session_hash in self.by_player.get(player_id, set()).copy():
+                self.stats['invalidations'] += self._remove(session_hash)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.by_player.clear()
+
+    def _remove(self, session_hash: str) -> int:
+        entry = self.entries.pop(session_hash, None)
+        if entry is None:
+            return 0
+        player_id = entry[0]['id']
+        sessions = self.by_player.get(player_id)
+        if sessions:
+            sessions.discard(session_hash)
+            if not sessions:
+                del self.by_player[player_id]
+        return 1
+
+    def hit_rate(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def to_prometheus(self) -> str:
+        """Render cache counters in Prometheus text exposition format"""
+        lines = [
+            '# HELP chimera_session_cache_requests_total Session cache lookups',
+            '# TYPE chimera_session_cache_requests_total counter',
+            f'chimera_session_cache_requests_total{{result="hit"}} {self.stats["hits"]}',
+            f'chimera_session_cache_requests_total{{result="miss"}} {self.stats["misses"]}',
+            '# HELP chimera_session_cache_hit_ratio Session cache hits per lookup',
+            '# TYPE chimera_session_cache_hit_ratio gauge',
+            f'chimera_session_cache_hit_ratio {self.hit_rate():.4f}',
+            '# HELP chimera_session_cache_entries Cached sessions',
+            '# TYPE chimera_session_cache_entries gauge',
+            f'chimera_session_cache_entries {len(self.entries)}',
+            '# HELP chimera_session_cache_evictions_total Entries evicted by the LRU bound',
+            '# TYPE chimera_session_cache_evictions_total counter',
+            f'chimera_session_cache_evictions_total {self.stats["evictions"]}',
+            '# HELP chimera_session_cache_invalidations_total Entries dropped by invalidation',
+            '# TYPE chimera_session_cache_invalidations_total counter',
+            f'chimera_session_cache_invalidations_total {self.stats["invalidations"]}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# chimera-vx/server/session_tokens.py
+# Stateless, HMAC-signed session tokens and their revocation set
+#
+# A signed token is <payload>.<signature>, both base64url. The payload is
+# compact JSON {"p": player_id, "e": expires_at, "k": key_version,
+# "i": token_id, "t": issued_at_ms}; the signature is HMAC-SHA256 over the
+# encoded payload with a key derived from the server secret_key and the key
+# version. Verifying one needs no storage, so revocations (logout, reset,
+# ban) are checked against RevocationSet, an in-memory mirror of the
+# revocations table that every worker syncs. Issue times and per-player
+# not_before times are in milliseconds (see token_clock), so a reset revokes
+# tokens issued earlier in the same second but not the one it hands out.
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+def b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def token_clock() -> int:
+    """Current time in milliseconds, the unit of issue and not_before times"""
+    return int(time.time() * 1000)
+
+def is_signed_token(token: str) -> bool:
+    """Signed tokens contain a '.'; opaque session tokens are plain hex"""
+    return '.' in token
+
+
+class TokenSigner:
+    """Issue and verify signed session tokens"""
+
+    def __init__(self, secret_key: str, lifetime: int = 86400, key_version: int = 1,
+                 min_key_version: int = 1):
+        self.secret_key = secret_key.encode()
+        self.lifetime = lifetime
+        # New tokens use key_version; older versions down to min_key_version
+        # still verify, so raising min_key_version revokes every older token
+        self.key_version = key_version
+        self.min_key_version = min_key_version
+        self.keys: Dict[int, bytes] = {}
+
+    def key(self, version: int) -> bytes:
+        """Signing key for a key version"""
+        if version not in self.keys:
+            self.keys[version] = hmac.new(self.secret_key, f"chimera-session-v{version}".encode(),
+                                          hashlib.sha256).digest()
+        return self.keys[version]
+
+    def issue(self, player_id: int) -> Tuple[str, Dict]:
+        """New token for a player; returns the token and its claims"""
+        now = int(time.time())
+        claims = {
+            'p': player_id,
+            'e': now + self.lifetime,
+            'k': self.key_version,
+            'i': secrets.token_hex(8),
+            't': token_clock()
+        }
+        payload = b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        signature = hmac.new(self.key(self.key_version), payload.encode(), hashlib.sha256).digest()
+        return f"{payload}.{b64encode(signature)}", claims
+
+    def verify(self, token: str) -> Optional[Dict]:
+        """Claims of a well-signed, unexpired token, else None (revocation not checked)"""
+        try:
+            payload, signature = token.split('.')
+            claims = json.loads(b64decode(payload))
+            version = claims['k']
+            if not self.min_key_version <= version <= self.key_version:
+                return None
+            expected = hmac.new(self.key(version), payload.encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, b64decode(signature)):
+                return None
+            if not all(isinstance(claims[claim], int) for claim in ('p', 'e', 't')):
+                return None
+            if claims['e'] <= time.time():
+                return None
+            claims['i'] = str(claims['i'])
+        except (ValueError, KeyError, TypeError):
+            return None
+        return claims
+
+
+class RevocationSet:
+    """Revoked token ids and per-player not-before times, pruned at expiry"""
+
+    def __init__(self):
+        self.tokens: Dict[str, int] = {}         # token_id -> expires_at
+        self.players: Dict[int, Tuple[int, int]] = {}  # player_id -> (not_before ms, expires_at)
+        self.last_id = 0  # Newest revocations row applied
+        self.lock = threading.Lock()
+
+    def apply(self, rows: Iterable[Dict]):
+        """Add rows synced from the revocations table (Database.get_revocations)"""
+        with self.lock:
+            for row in rows:
+                self._add(row)
+                self.last_id = max(self.last_id, row['id'])
+
+    def add(self, row: Dict):
+        """Add a revocation this worker just stored; sync still fetches the rest"""
+        with self.lock:
+            self._add(row)
+
+    def _add(self, row: Dict):
+        if row['token_id']:
+            self.tokens[row['token_id']] = row['expires_at']
+        else:
+            not_before, expires_at = self.players.get(row['player_id'], (0, 0))
+            self.players[row['player_id']] = (max(not_before, row['not_before']),
+                                              max(expires_at, row['expires_at']))
+
+    def is_revoked(self, claims: Dict) -> bool:
+        with self.lock:
+            if claims['i'] in self.tokens:
+                return True
+            revoked = self.players.get(claims['p'])
+            return revoked is not None and claims['t'] < revoked[0]
+
+    def prune(self) -> int:
+        """Drop revocations of tokens that have expired anyway"""
+        now = time.time()
+        with self.lock:
+            expired_tokens = [token_id for token_id, expires_at in self.tokens.items()
+                              if expires_at <= now]
+            expired_players = [player_id for player_id, (_, expires_at) in self.players.items()
+                               if expires_at <= now]
+            for token_id in expired_tokens:
+                del self.tokens[token_id]
+            for player_id in expired_players:
+                del self.players[player_id]
+        return len(expired_tokens) + len(expired_players)
+
+    def __len__(self) -> int:
+        return len(self.tokens) + len(self.players)
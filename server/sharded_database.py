@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# chimera-vx/server/sharded_database.py
+# Player-sharded database for Chimera-VX
+#
+# Every shard is a complete Database in its own file with its own writer, so
+# submits for players on different shards commit in parallel. Player-scoped
+# calls route to the player's shard (see sharding.py); global views such as
+# the leaderboard, player counts and statistics are merged across shards.
+
+import heapq
+import sqlite3
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+import logging
+
+from database import Database, SESSION_LIFETIME
+from query_metrics import QueryMetrics
+from session_cache import SessionCache
+from session_tokens import token_clock
+from sharding import (bucket_for_id, bucket_for_key, shard_for_bucket, shard_path,
+                      validate_shard_count)
+
+logger = logging.getLogger(__name__)
+
+# Methods routed by their first argument: player id, puzzle id or session hash
+PLAYER_METHODS = {
+    'get_player',
+    'update_player_progress',
+    'update_player_last_active',
+    'reset_player',
+    'deactivate_player',
+    'create_puzzle',
+    'get_current_puzzle',
+    'get_solved_puzzles',
+    'get_last_challenge_request',
+    'create_submission',
+    'get_submissions',
+    'update_hardware_profile',
+    'get_hardware_profile',
+    'increment_suspicious_count',
+    'log_cheat_event',
+    'get_cheat_logs',
+    'update_leaderboard',
+    'record_completion',
+    'add_achievement',
+    'update_player_metadata'
+}
+
+PUZZLE_METHODS = {
+    'get_puzzle',
+    'increment_puzzle_attempts',
+    'mark_puzzle_solved',
+    'update_puzzle'
+}
+
+SESSION_METHODS = {
+    'get_session',
+    'delete_session'
+}
+
+ROUTING_ARGUMENTS = {
+    **{name: 'player_id' for name in PLAYER_METHODS},
+    **{name: 'puzzle_id' for name in PUZZLE_METHODS},
+    **{name: 'session_hash' for name in SESSION_METHODS}
+}
+
+# Other writes that commit on one shard: (argument, position) of the key
+# that picks it. AsyncDatabase queues a write behind earlier writes to the
+# same shard (see write_shard)
+WRITE_ROUTING_ARGUMENTS = {
+    'create_player': ('username', 0),
+    'create_session': ('session_hash', 1),
+    'unit_of_work': ('player_id', 1)
+}
+
+# Global state lives on shard 0: counters (reads still sum every shard)
+# and signed-token revocations
+GLOBAL_METHODS = {
+    'update_statistic',
+    'increment_statistic',
+    'count_statistic',
+    'add_revocation',
+    'get_revocations',
+    'prune_revocations',
+    'claim_hardware',
+    'bind_hardware',
+    'release_hardware'
+}
+
+# Methods run on every shard, results merged by merge_results
+BROADCAST_METHODS = {
+    'get_total_players',
+    'count_ranked_ahead',
+    'get_statistic',
+    'get_statistics',
+    'clean_old_sessions',
+    'expire_sessions',
+    'load_session_expiry_rows',
+    'get_player_sessions',
+    'delete_player_sessions',
+    'flush_activity',
+    'flush_statistics',
+    'externalize_puzzle_blobs',
+    'gc_blobs',
+    'archive_old_rows',
+    'check_leaderboard',
+    'rebuild_leaderboard',
+    'load_rank_rows',
+    'vacuum',
+    'get_database_size'
+}
+
+def merge_results(results: List[Any]) -> Any:
+    """Combine per-shard results: sum numbers, sum dicts per key, concatenate lists"""
+    present = [result for result in results if result is not None]
+    if not present:
+        return None
+    if isinstance(present[0], dict):
+        merged: Dict = {}
+        for result in present:
+            for key, value in result.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+    if isinstance(present[0], list):
+        return [item for result in present for item in result]
+    return sum(present)
+
+def leaderboard_key(row: Dict):
+    """Sort key matching get_leaderboard's ORDER BY (NULL completed_at first)"""
+    completed_at = row['completed_at']
+    return (-(row['progress'] or 0), row['total_time'] or 0,
+            completed_at is not None, completed_at or 0)
+
+LEADERBOARD_SORT_COLUMNS = ('progress', 'total_time', 'completed_at')
+
+class ShardedDatabase:
+    """Database facade that spreads players over N shard files"""
+
+    def __init__(self, db_path: str = "data/chimera.db", shards: int = 1, pool_size: int = 4,
+                 pragmas: Optional[Dict] = None, rank_index: bool = True,
+                 query_metrics: bool = False, schema_version: Optional[int] = None,
+                 archive_path: Optional[str] = None, session_cache_size: int = 10000,
+                 session_cache_ttl: int = 30, max_sessions_per_player: int = 5):
+        validate_shard_count(shards)
+        self.db_path = db_path
+        self.max_sessions_per_player = max_sessions_per_player
+        self.shards = [
+            Database(
+                shard_path(db_path, index),
+                pool_size=pool_size,
+                pragmas=pragmas,
+                rank_index=rank_index,
+                schema_version=schema_version,
+                archive_path=shard_path(archive_path, index) if archive_path else None,
+                sharded=shards > 1,
+                session_cache_size=0,
+                max_sessions_per_player=max_sessions_per_player
+            )
+            for index in range(shards)
+        ]
+
+        # One session cache: a session and its player may live on different
+        # shards, and either shard's writes must invalidate it
+        self.session_cache = (SessionCache(session_cache_size, session_cache_ttl)
+                              if session_cache_size else None)
+        for shard in self.shards:
+            shard.session_cache = self.session_cache
+
+        # One set of timings for all shards
+        self.metrics = QueryMetrics() if query_metrics else None
+        if self.metrics:
+            for shard in self.shards:
+                shard.metrics = self.metrics
+                shard.instrument_methods()
+
+        logger.info(f"Sharded database ready with {shards} shards")
+
+    # ==================== ROUTING ====================
+
+    def shard_for_player(self, player_id: int) -> Database:
+        """Shard holding a player (and their puzzles)"""
+        return self.shards[shard_for_bucket(bucket_for_id(player_id), len(self.shards))]
+
+    def shard_for_key(self, key: str) -> Database:
+        """Shard a string key hashes to (new usernames, session hashes)"""
+        return self.shards[shard_for_bucket(bucket_for_key(key), len(self.shards))]
+
+    def write_shard(self, name: str, args: Sequence, kwargs: Dict) -> int:
+        """Index of the shard a write call commits to (shard 0 for global and broadcast calls)"""
+        if name in ROUTING_ARGUMENTS:
+            argument, position = ROUTING_ARGUMENTS[name], 0
+        elif name in WRITE_ROUTING_ARGUMENTS:
+            argument, position = WRITE_ROUTING_ARGUMENTS[name]
+        else:
+            return 0
+        key = args[position] if len(args) > position else kwargs.get(argument)
+        if key is None:
+            return 0
+        bucket = bucket_for_id(key) if argument in ('player_id', 'puzzle_id') else bucket_for_key(key)
+        return shard_for_bucket(bucket, len(self.shards))
+
+    def __getattr__(self, name: str):
+        if name in ROUTING_ARGUMENTS:
+            argument = ROUTING_ARGUMENTS[name]
+            route = self.shard_for_key if argument == 'session_hash' else self.shard_for_player
+
+            def call(*args, **kwargs):
+                key = args[0] if args else kwargs[argument]
+                return getattr(route(key), name)(*args, **kwargs)
+        elif name in GLOBAL_METHODS:
+            def call(*args, **kwargs):
+                return getattr(self.shards[0], name)(*args, **kwargs)
+        elif name in BROADCAST_METHODS:
+            def call(*args, **kwargs):
+                return merge_results([getattr(shard, name)(*args, **kwargs)
+                                      for shard in self.shards])
+        else:
+            raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+        call.__name__ = name
+        call.__doc__ = getattr(Database, name).__doc__
+        setattr(self, name, call)
+        return call
+
+    # ==================== UNITS OF WORK ====================
+
+    @contextmanager
+    def transaction(self, player_id: int) -> Iterator[Database]:
+        """Transaction on a player's shard; yields that shard's Database"""
+        shard = self.shard_for_player(player_id)
+        with shard.transaction():
+            yield shard
+
+    def unit_of_work(self, work: Callable[[Database], Any],
+                     player_id: Optional[int] = None) -> Any:
+        """Run work(shard) in one transaction on the player's shard
+
+        Work may only touch that player's rows: there are no cross-shard
+        transactions.
+        """
+        if player_id is None:
+            if len(self.shards) > 1:
+                raise ValueError("unit_of_work needs player_id on a sharded database")
+            player_id = 0
+        return self.shard_for_player(player_id).unit_of_work(work)
+
+    # ==================== PLAYERS AND SESSIONS ====================
+
+    def create_player(self, username: str, email: str, hardware_fingerprint: str) -> int:
+        """Create a player on the username's shard
+
+        Usernames are unique because a name always hashes to the same shard.
+        UNIQUE(hardware_fingerprint) only covers one shard, so with several
+        shards the fingerprint is first claimed on shard 0, which serializes
+        concurrent registrations in every process. Raises IntegrityError
+        for a taken fingerprint, like the single-shard constraint.
+        """
+        home = self.shard_for_key(username)
+        if len(self.shards) == 1:
+            return home.create_player(username, email, hardware_fingerprint)
+
+        if not self.claim_hardware(hardware_fingerprint):
+            raise sqlite3.IntegrityError('UNIQUE constraint failed: players.hardware_fingerprint')
+        try:
+            # Players registered before claims existed have none
+            if self.get_player_by_hardware(hardware_fingerprint):
+                raise sqlite3.IntegrityError('UNIQUE constraint failed: players.hardware_fingerprint')
+            player_id = home.create_player(username, email, hardware_fingerprint)
+        except Exception:
+            self.release_hardware(hardware_fingerprint)
+            raise
+        self.bind_hardware(hardware_fingerprint, player_id)
+        return player_id
+
+    def get_player_by_username(self, username: str) -> Optional[Dict]:
+        """Get player by username (players created before sharding may be on any shard)"""
+        home = self.shard_for_key(username)
+        for shard in [home] + [shard for shard in self.shards if shard is not home]:
+            player = shard.get_player_by_username(username)
+            if player:
+                return player
+        return None
+
+    def get_player_by_hardware(self, hardware_fingerprint: str) -> Optional[Dict]:
+        """Get player by hardware fingerprint, searching every shard"""
+        for shard in self.shards:
+            player = shard.get_player_by_hardware(hardware_fingerprint)
+            if player:
+                return player
+        return None
+
+    def create_session(self, player_id: int, session_hash: str, ip_address: str = None):
+        """Create a session on the session hash's shard
+        
+        A player's sessions hash to different shards, so the session cap is
+        enforced here across all of them (newest first, this one always kept).
+        """
+        if len(self.shards) == 1:
+            self.shards[0].create_session(player_id, session_hash, ip_address)
+            return
+        
+        self.shard_for_key(session_hash).create_session(player_id, session_hash, ip_address,
+                                                        max_sessions=0)
+        if self.max_sessions_per_player:
+            sessions = self.get_player_sessions(player_id)
+            sessions.sort(key=lambda session: (session['session_hash'] == session_hash,
+                                               session['created_at']), reverse=True)
+            for session in sessions[self.max_sessions_per_player:]:
+                self.delete_session(session['session_hash'])
+
+    def get_player_by_session(self, session_hash: str) -> Optional[Dict]:
+        """Get player by session hash (session and player may be on different shards)"""
+        if len(self.shards) == 1:
+            return self.shards[0].get_player_by_session(session_hash)
+
+        session_shard = self.shard_for_key(session_hash)
+        if self.session_cache is not None:
+            player = self.session_cache.get(session_hash)
+            if player:
+                session_shard.last_used_buffer.put(session_hash, int(time.time()))
+                return player
+            generation = self.session_cache.generation
+
+        session = session_shard.get_session(session_hash)
+        if session is None:
+            return None
+        player = self.shard_for_player(session['player_id']).get_player(session['player_id'])
+        if not player or not player['is_active']:
+            return None
+
+        if self.session_cache is not None:
+            self.session_cache.put(session_hash, player, session['expires_at'], generation)
+        return player
+
+    def get_player_by_token(self, token_id: str, player_id: int, expires_at: int) -> Optional[Dict]:
+        return self.shard_for_player(player_id).get_player_by_token(token_id, player_id, expires_at)
+    
+    def get_player_rank(self, player_id: int) -> Optional[int]:
+        """Global rank: one plus the players ahead on every shard"""
+        if len(self.shards) == 1:
+            return self.shards[0].get_player_rank(player_id)
+
+        player = self.get_player(player_id)
+        if not player or not player['is_active']:
+            return None
+        return 1 + self.count_ranked_ahead(player['progress'], player['total_time'], player_id)
+
+    def purge_players(self, player_ids: List[int], chunk_size: int = 500, pause: float = 0.002,
+                      on_progress: Optional[Callable[[Dict], None]] = None) -> Dict[str, int]:
+        """Purge players shard by shard, then drop their sessions on every shard
+        
+        Their signed tokens are revoked as well, for workers that still
+        hold the player in their session cache.
+        """
+        by_shard: Dict[int, List[int]] = {}
+        for player_id in player_ids:
+            by_shard.setdefault(id(self.shard_for_player(player_id)), []).append(player_id)
+
+        totals: Dict[str, int] = {}
+        done = 0
+        for shard in self.shards:
+            shard_ids = by_shard.get(id(shard))
+            if not shard_ids:
+                continue
+
+            def report(progress: Dict, offset: int = done):
+                if on_progress:
+                    on_progress({**progress, 'players_done': offset + progress['players_done'],
+                                 'players_total': len(player_ids)})
+
+            totals = merge_results([totals, shard.purge_players(shard_ids, chunk_size, pause, report)])
+            done += len(shard_ids)
+
+        if len(self.shards) > 1 and player_ids:
+            self.delete_player_sessions(player_ids)
+            self.release_hardware(player_ids=player_ids)
+        now, not_before = int(time.time()), token_clock() + 1
+        for player_id in player_ids:
+            self.add_revocation(now + SESSION_LIFETIME, player_id=player_id, not_before=not_before)
+        return totals
+
+    # ==================== PUZZLES ====================
+
+    def load_puzzle_data(self, puzzle_data: str, files: Optional[List[str]] = None,
+                         player_id: Optional[int] = None) -> Dict:
+        """Load a puzzle's file bodies from its owner's shard"""
+        if player_id is not None or len(self.shards) == 1:
+            return self.shard_for_player(player_id or 0).load_puzzle_data(puzzle_data, files)
+
+        for shard in self.shards[:-1]:
+            try:
+                return shard.load_puzzle_data(puzzle_data, files)
+            except KeyError:
+                continue
+        return self.shards[-1].load_puzzle_data(puzzle_data, files)
+
+    # ==================== GLOBAL VIEWS ====================
+
+    def get_leaderboard(self, limit: int = 100, offset: int = 0,
+                        columns: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Merge the shards' ordered leaderboards
+
+        Each shard returns its top offset + limit rows, so deep pages cost
+        shards * (offset + limit) rows.
+        """
+        if len(self.shards) == 1:
+            return self.shards[0].get_leaderboard(limit, offset, columns)
+
+        fetch = columns
+        if columns is not None:
+            fetch = list(columns) + [column for column in LEADERBOARD_SORT_COLUMNS
+                                     if column not in columns]
+
+        merged = heapq.merge(
+            *(shard.get_leaderboard(offset + limit, 0, fetch) for shard in self.shards),
+            key=leaderboard_key
+        )
+        rows = list(islice(merged, offset, offset + limit))
+        if columns is not None and len(fetch) > len(columns):
+            rows = [{column: row[column] for column in columns} for row in rows]
+        return rows
+
+    def get_completions(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Merge the shards' completions, earliest first"""
+        merged = heapq.merge(
+            *(shard.get_completions(offset + limit, 0) for shard in self.shards),
+            key=lambda row: row['completed_at']
+        )
+        return list(islice(merged, offset, offset + limit))
+
+    # ==================== MAINTENANCE ====================
+
+    def migrate(self, target_version: Optional[int] = None) -> List[int]:
+        """Migrate every shard; returns the versions applied anywhere"""
+        return sorted({version for shard in self.shards for version in shard.migrate(target_version)})
+
+    def get_schema_version(self) -> int:
+        """Lowest schema version over all shards"""
+        return min(shard.get_schema_version() for shard in self.shards)
+
+    def close(self):
+        """Flush and close every shard"""
+        for shard in self.shards:
+            shard.close()
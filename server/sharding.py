@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# chimera-vx/server/sharding.py
+# Player-to-shard routing for Chimera-VX
+#
+# Rows are placed by bucket, not directly by shard: there are SHARD_BUCKETS
+# fixed buckets and bucket b lives in shard b % shards. Player and puzzle ids
+# carry their bucket (id % SHARD_BUCKETS), so any id routes without a lookup,
+# and resharding moves whole buckets between files without renumbering.
+
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import Optional
+
+SHARD_BUCKETS = 64  # Upper bound on the shard count
+
+def bucket_for_key(key: str) -> int:
+    """Bucket of a string key (new players by username, sessions by hash)"""
+    return zlib.crc32(key.encode()) % SHARD_BUCKETS
+
+def bucket_for_id(row_id: int) -> int:
+    """Bucket encoded in a player or puzzle id"""
+    return row_id % SHARD_BUCKETS
+
+def shard_for_bucket(bucket: int, shards: int) -> int:
+    """Shard index holding a bucket"""
+    return bucket % shards
+
+def shard_path(base_path: str, index: int) -> str:
+    """File of shard index; shard 0 is the unsharded database file itself"""
+    if index == 0:
+        return base_path
+    path = Path(base_path)
+    return str(path.with_name(f"{path.stem}.shard{index}{path.suffix}"))
+
+def validate_shard_count(shards: int):
+    if not 1 <= shards <= SHARD_BUCKETS:
+        raise ValueError(f"Shard count must be between 1 and {SHARD_BUCKETS}, not {shards}")
+
+def next_bucket_id(conn: sqlite3.Connection, table: str, bucket: int,
+                   after: Optional[int] = None) -> int:
+    """Smallest unused id of table in bucket (call while holding the writer)
+
+    after defaults to the table's AUTOINCREMENT high-water mark, so ids of
+    deleted rows are never handed out again.
+    """
+    if after is None:
+        after = conn.execute(f'''
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0),
+                       COALESCE((SELECT MAX(id) FROM {table}), 0))
+        ''', (table,)).fetchone()[0]
+    candidate = after + 1
+    return candidate + (bucket - candidate) % SHARD_BUCKETS
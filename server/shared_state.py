@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# chimera-vx/server/shared_state.py
+# Rate limits, bans and cooldowns shared by every worker on a node
+#
+# With no shared store configured everything stays in-process: requests go
+# through the exact token buckets of RateLimiter, and bans/cooldowns live in
+# a MemoryStore. With security.shared_state set, every worker consults the
+# same RESP store (state_server.py or a Redis-compatible server). Requests
+# are then counted with a sliding-window counter built from atomic INCRs:
+# the estimate is this window's count plus the previous window's count,
+# weighted by how much of it still overlaps the sliding window. Each request
+# is one pipelined round trip.
+#
+# Request sources are also counted in fixed memory (heavy_hitters.py) per
+# IP and per subnet; an IP whose decayed request count reaches the flood
+# threshold is banned for a while on every worker.
+
+import time
+from typing import Dict, Hashable, Optional
+import logging
+
+from heavy_hitters import HeavyHitters, subnet_of
+from rate_limiter import RateLimiter, RatePolicy
+from state_store import MemoryStore, StoreError, store_from_url
+
+logger = logging.getLogger(__name__)
+
+class SharedState:
+    """Rate limiting, ban list and cooldowns over a MemoryStore or RESP store"""
+
+    def __init__(self, store, limiter: RateLimiter, prefix: str = 'chimera:',
+                 flood_threshold: int = 0, flood_block: float = 600, flood_half_life: float = 60,
+                 tracked: int = 100):
+        self.store = store
+        self.limiter = limiter
+        self.prefix = prefix
+        self.local = isinstance(store, MemoryStore)
+
+        # Heaviest request sources in fixed memory; an IP reaching
+        # flood_threshold (0 disables) is banned for flood_block seconds
+        self.clients = HeavyHitters(k=tracked, half_life=flood_half_life)
+        self.subnets = HeavyHitters(k=tracked, half_life=flood_half_life)
+        self.flood_threshold = flood_threshold
+        self.flood_block = flood_block
+        self.blocked: Dict[str, float] = {}  # IP -> end of its automatic block
+
+        # Statistics
+        self.stats = {
+            'banned': 0,
+            'auto_blocks': 0,
+            'store_errors': 0
+        }
+
+    @classmethod
+    def from_config(cls, security: Dict) -> 'SharedState':
+        """Shared state from the server's security config section"""
+        return cls(store_from_url(security['shared_state']), RateLimiter.from_config(security),
+                   flood_threshold=security['flood_block_threshold'],
+                   flood_block=security['flood_block_duration'],
+                   flood_half_life=security['flood_half_life'])
+
+    def add_policy(self, route: str, policy: RatePolicy):
+        """Register a rate policy for a route or action name"""
+        self.limiter.routes[route] = policy
+
+    async def _pipeline(self, commands) -> Optional[list]:
+        """Run commands on the store; None (fail open) if it is unreachable"""
+        try:
+            results = await self.store.pipeline(commands)
+        except (OSError, ConnectionError, StoreError) as e:
+            self.stats['store_errors'] += 1
+            logger.error(f"Shared state store unavailable: {e}")
+            return None
+        for result in results:
+            if isinstance(result, StoreError):
+                self.stats['store_errors'] += 1
+                logger.error(f"Shared state command failed: {result}")
+                return None
+        return results
+
+    # ==================== RATE LIMITS ====================
+
+    async def check_request(self, ip_address: str, route: Optional[str] = None) -> float:
+        """check_rate for an HTTP request, also tracking and blocking floods by IP"""
+        count = self.clients.add(ip_address)
+        self.subnets.add(subnet_of(ip_address))
+
+        if self.flood_threshold and count >= self.flood_threshold:
+            now = time.time()
+            if self.blocked.get(ip_address, 0) <= now:
+                self.blocked[ip_address] = now + self.flood_block
+                self.stats['auto_blocks'] += 1
+                logger.warning(f"Request flood from {ip_address} (~{count} recent requests)")
+                await self.ban(ip_address, self.flood_block)
+                return self.flood_block
+        return await self.check_rate(ip_address, route)
+
+    async def check_rate(self, client: Hashable, route: Optional[str] = None) -> float:
+        """Count a request; 0 if allowed, else seconds until the client may retry
+
+        Banned clients are refused for the rest of their ban.
+        """
+        ban_key = f"{self.prefix}ban:{client}"
+        if self.local:
+            remaining = self.store.run([('PTTL', ban_key)])[0]
+            if remaining > 0 or remaining == -1:
+                self.stats['banned'] += 1
+                return remaining / 1000 if remaining > 0 else float('inf')
+            return self.limiter.check(client, route)
+
+        namespace, policy = self.limiter.policy(route)
+        window_ms = int(policy.window * 1000)
+        now_ms = int(time.time() * 1000)
+        index, offset = divmod(now_ms, window_ms)
+        key = f"{self.prefix}rate:{namespace or 'default'}:{client}:"
+        results = await self._pipeline([
+            ('PTTL', ban_key),
+            ('INCR', f"{key}{index}"),
+            ('PEXPIRE', f"{key}{index}", 2 * window_ms),
+            ('GET', f"{key}{index - 1}")
+        ])
+        if results is None:
+            return 0.0
+
+        remaining, current, _, previous = results
+        if remaining > 0 or remaining == -1:
+            self.stats['banned'] += 1
+            return remaining / 1000 if remaining > 0 else float('inf')
+
+        previous = int(previous or 0)
+        elapsed = offset / window_ms
+        if previous * (1 - elapsed) + current <= policy.max_requests:
+            self.limiter.stats['allowed'] += 1
+            return 0.0
+        self.limiter.stats['limited'] += 1
+        if current > policy.max_requests:
+            # Over budget on this window alone: wait for the next one
+            return (window_ms - offset) / 1000
+        # Wait until enough of the previous window slides out
+        needed = 1 - (policy.max_requests - current) / previous
+        return max(needed - elapsed, 0) * policy.window
+
+    # ==================== BANS ====================
+
+    async def ban(self, client: Hashable, seconds: Optional[float] = None) -> bool:
+        """Refuse client's requests for seconds (forever if None)"""
+        command = ['SET', f"{self.prefix}ban:{client}", int(time.time())]
+        if seconds:
+            command += ['PX', max(int(seconds * 1000), 1)]
+        logger.warning(f"Banned {client} for {f'{seconds:.0f}s' if seconds else 'good'}")
+        return await self._pipeline([command]) is not None
+
+    async def unban(self, client: Hashable) -> bool:
+        return await self._pipeline([('DEL', f"{self.prefix}ban:{client}")]) is not None
+
+    async def is_banned(self, client: Hashable) -> bool:
+        results = await self._pipeline([('EXISTS', f"{self.prefix}ban:{client}")])
+        return bool(results and results[0])
+
+    # ==================== COOLDOWNS ====================
+
+    async def acquire_cooldown(self, key: str, seconds: float) -> bool:
+        """Start a cooldown unless one is running; True if the caller may proceed
+
+        Atomic across workers (SET NX), so concurrent requests get one winner.
+        """
+        results = await self._pipeline([
+            ('SET', f"{self.prefix}cooldown:{key}", 1, 'NX', 'PX', max(int(seconds * 1000), 1))
+        ])
+        return results is None or results[0] is not None
+
+    # ==================== MAINTENANCE ====================
+
+    def prune(self) -> int:
+        """Drop idle in-process state (remote stores expire keys themselves)"""
+        pruned = self.limiter.prune()
+        now = time.time()
+        for ip_address in [ip for ip, until in self.blocked.items() if until <= now]:
+            del self.blocked[ip_address]
+        if self.local:
+            pruned += self.store.sweep()
+        return pruned
+
+    async def close(self):
+        await self.store.close()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# chimera-vx/server/state_server.py
+# Node-local shared state daemon for Chimera-VX workers
+#
+# Usage:
+#   python state_server.py --unix /run/chimera/state.sock
+#   python state_server.py --port 6390
+#
+# Serves a MemoryStore over RESP, so workers configured with
+# security.shared_state = 'unix:///run/chimera/state.sock' (or
+# 'redis://127.0.0.1:6390') share rate limits, bans and cooldowns. Any
+# Redis-compatible server can be used instead. Each command runs
+# atomically; state is in memory only and starts empty on restart.
+
+import argparse
+import asyncio
+import os
+import signal
+from typing import Any, List, Optional, Tuple
+import logging
+
+from state_store import MemoryStore, StoreError
+
+logger = logging.getLogger(__name__)
+
+def encode_reply(value: Any) -> bytes:
+    """Encode a MemoryStore result as a RESP reply"""
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, StoreError):
+        return b'-%s\r\n' % str(value).encode()
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(encode_reply(item) for item in value)
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def parse_command(buffer: bytes, start: int) -> Optional[Tuple[List[bytes], int]]:
+    """Parse one RESP command array at start: (arguments, end), or None if incomplete"""
+    end = buffer.find(b'\r\n', start)
+    if end < 0:
+        return None
+    if buffer[start:start + 1] != b'*':
+        # Inline command (e.g. typed into telnet)
+        return buffer[start:end].split(), end + 2
+    count = int(buffer[start + 1:end])
+    position = end + 2
+    args = []
+    for _ in range(count):
+        end = buffer.find(b'\r\n', position)
+        if end < 0:
+            return None
+        if buffer[position:position + 1] != b'$':
+            raise ValueError('expected a bulk string')
+        length = int(buffer[position + 1:end])
+        position = end + 2
+        if len(buffer) < position + length + 2:
+            return None
+        args.append(buffer[position:position + length])
+        position += length + 2
+    return args, position
+
+
+class StateServer:
+    """RESP front end for a MemoryStore"""
+
+    def __init__(self, store: MemoryStore, sweep_interval: float = 0.1):
+        self.store = store
+        self.sweep_interval = sweep_interval
+        self.clients = 0
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients += 1
+        buffer = b''
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                buffer += data
+                
+                # Answer every complete command received, pipelined batches in one write
+                replies = []
+                position = 0
+                quit = False
+                while not quit:
+                    try:
+                        parsed = parse_command(buffer, position)
+                    except ValueError:
+                        replies.append(b'-ERR protocol error\r\n')
+                        quit = True
+                        break
+                    if parsed is None:
+                        break
+                    command, position = parsed
+                    if not command:
+                        continue
+                    name = command[0].upper()
+                    if name in (b'SELECT', b'AUTH'):
+                        # One keyspace, trusted local clients
+                        replies.append(b'+OK\r\n')
+                    elif name == b'QUIT':
+                        replies.append(b'+OK\r\n')
+                        quit = True
+                    else:
+                        replies.append(encode_reply(self.store.run([command])[0]))
+                buffer = buffer[position:]
+                
+                writer.write(b''.join(replies))
+                await writer.drain()
+                if quit:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def sweep(self):
+        """Actively expire keys nobody reads any more"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.store.sweep()
+
+    async def serve(self, unix_path: str = None, host: str = '127.0.0.1', port: int = 6390):
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            server = await asyncio.start_unix_server(self.handle_client, unix_path)
+            os.chmod(unix_path, 0o660)
+            logger.info(f"State server listening on {unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+            logger.info(f"State server listening on {host}:{port}")
+
+        sweeper = asyncio.create_task(self.sweep())
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        async with server:
+            await stop.wait()
+        sweeper.cancel()
+        if unix_path and os.path.exists(unix_path):
+            os.unlink(unix_path)
+        logger.info("State server stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chimera-VX shared state daemon")
+    parser.add_argument('--unix', help="Unix socket path (preferred on one node)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(StateServer(MemoryStore()).serve(args.unix, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
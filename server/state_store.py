@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# chimera-vx/server/state_store.py
+# Key-value stores behind SharedState: in-process, or shared over RESP
+#
+# Both speak the same small subset of Redis commands (GET, SET with NX/XX
+# and EX/PX, DEL, EXISTS, INCR, INCRBY, EXPIRE, PEXPIRE, TTL, PTTL, DBSIZE,
+# FLUSHDB, PING), so SharedState works the same against MemoryStore in one
+# process, state_server.py (a MemoryStore behind a socket) shared by the
+# workers of a node, or any Redis-compatible server.
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StoreError(Exception):
+    """Command rejected by the store (a RESP error reply)"""
+
+
+class MemoryStore:
+    """In-memory Redis command subset with per-key expiry"""
+
+    def __init__(self):
+        self.values: Dict[bytes, bytes] = {}
+        self.expires: Dict[bytes, float] = {}  # key -> deadline (time.time())
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _bytes(value: Any) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def _live(self, key: bytes, now: float) -> bool:
+        """Whether key exists, deleting it first if it has expired"""
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= now:
+            del self.expires[key]
+            del self.values[key]
+            return False
+        return key in self.values
+
+    def run(self, commands: Sequence[Sequence]) -> List[Any]:
+        """Run commands atomically in order; errors are returned in place"""
+        now = time.time()
+        results = []
+        with self.lock:
+            for command in commands:
+                try:
+                    results.append(self._execute([self._bytes(arg) for arg in command], now))
+                except StoreError as e:
+                    results.append(e)
+        return results
+
+    async def pipeline(self, commands: Sequence[Sequence]) -> List[Any]:
+        return self.run(commands)
+
+    async def execute(self, *args) -> Any:
+        result = self.run([args])[0]
+        if isinstance(result, StoreError):
+            raise result
+        return result
+
+    def _execute(self, args: List[bytes], now: float) -> Any:
+        if not args:
+            raise StoreError('ERR empty command')
+        name = args[0].upper()
+        handler = self.COMMANDS.get(name)
+        if handler is None:
+            raise StoreError(f"ERR unknown command '{args[0].decode(errors='replace')}'")
+        try:
+            return handler(self, args[1:], now)
+        except (IndexError, ValueError):
+            raise StoreError(f"ERR syntax error in '{name.decode(errors='replace')}'")
+
+    def _ping(self, args, now):
+        return args[0] if args else 'PONG'
+
+    def _get(self, args, now):
+        key = args[0]
+        return self.values[key] if self._live(key, now) else None
+
+    def _set(self, args, now):
+        key, value = args[0], args[1]
+        options = [arg.upper() for arg in args[2:]]
+        ttl = None
+        i = 0
+        while i < len(options):
+            if options[i] in (b'EX', b'PX'):
+                amount = int(args[3 + i])
+                if amount <= 0:
+                    raise StoreError('ERR invalid expire time in set')
+                ttl = amount if options[i] == b'EX' else amount / 1000
+                i += 2
+            elif options[i] in (b'NX', b'XX'):
+                i += 1
+            else:
+                raise ValueError(options[i])
+        exists = self._live(key, now)
+        if (b'NX' in options and exists) or (b'XX' in options and not exists):
+            return None
+        self.values[key] = value
+        if ttl is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = now + ttl
+        return 'OK'
+
+    def _delete(self, args, now):
+        deleted = 0
+        for key in args:
+            if self._live(key, now):
+                del self.values[key]
+                self.expires.pop(key, None)
+                deleted += 1
+        return deleted
+
+    def _exists(self, args, now):
+        return sum(self._live(key, now) for key in args)
+
+    def _incrby(self, key: bytes, amount: int, now: float) -> int:
+        current = self.values[key] if self._live(key, now) else b'0'
+        try:
+            value = int(current) + amount
+        except ValueError:
+            raise StoreError('ERR value is not an integer or out of range')
+        self.values[key] = str(value).encode()
+        return value
+
+    def _incr(self, args, now):
+        return self._incrby(args[0], 1, now)
+
+    def _incrby_command(self, args, now):
+        return self._incrby(args[0], int(args[1]), now)
+
+    def _expire_in(self, key: bytes, seconds: float, now: float) -> int:
+        if not self._live(key, now):
+            return 0
+        self.expires[key] = now + seconds
+        return 1
+
+    def _expire(self, args, now):
+        return self._expire_in(args[0], int(args[1]), now)
+
+    def _pexpire(self, args, now):
+        return self._expire_in(args[0], int(args[1]) / 1000, now)
+
+    def _remaining(self, key: bytes, now: float, scale: int) -> int:
+        if not self._live(key, now):
+            return -2
+        deadline = self.expires.get(key)
+        if deadline is None:
+            return -1
+        return int((deadline - now) * scale + 0.5)
+
+    def _ttl(self, args, now):
+        return self._remaining(args[0], now, 1)
+
+    def _pttl(self, args, now):
+        return self._remaining(args[0], now, 1000)
+
+    def _dbsize(self, args, now):
+        return len(self.values)
+
+    def _flushdb(self, args, now):
+        self.values.clear()
+        self.expires.clear()
+        return 'OK'
+
+    COMMANDS = {
+        b'PING': _ping,
+        b'GET': _get,
+        b'SET': _set,
+        b'DEL': _delete,
+        b'EXISTS': _exists,
+        b'INCR': _incr,
+        b'INCRBY': _incrby_command,
+        b'EXPIRE': _expire,
+        b'PEXPIRE': _pexpire,
+        b'TTL': _ttl,
+        b'PTTL': _pttl,
+        b'DBSIZE': _dbsize,
+        b'FLUSHDB': _flushdb
+    }
+
+    def sweep(self, limit: int = 1000) -> int:
+        """Delete expired keys among the next limit keys with a TTL; returns how many
+
+        Live keys go to the back, so repeated sweeps rotate through all of
+        them; keys that are read expire lazily anyway.
+        """
+        removed = 0
+        now = time.time()
+        with self.lock:
+            for _ in range(min(limit, len(self.expires))):
+                key = next(iter(self.expires))
+                deadline = self.expires.pop(key)
+                if deadline <= now:
+                    del self.values[key]
+                    removed += 1
+                else:
+                    self.expires[key] = deadline
+        return removed
+
+    async def close(self):
+        pass
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+# ==================== RESP CLIENT ====================
+
+def encode_command(args: Sequence) -> bytes:
+    """Encode one command as a RESP array of bulk strings"""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = MemoryStore._bytes(arg)
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP reply; error replies are returned as StoreError"""
+    line = await reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('Connection closed by state store')
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode()
+    if kind == b'-':
+        return StoreError(body.decode(errors='replace'))
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(body)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected RESP reply {line[:32]!r}")
+
+
+class RespStore:
+    """Async client for state_server.py or a Redis-compatible server"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 6379, path: Optional[str] = None,
+                 db: int = 0, password: Optional[str] = None, timeout: float = 1.0):
+        self.host = host
+        self.port = port
+        self.path = path  # Unix socket instead of TCP
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 1.0) -> 'RespStore':
+        """redis://[:password@]host[:port][/db] or unix:///path/to.sock[?db=n]"""
+        parsed = urlparse(url)
+        if parsed.scheme == 'unix':
+            db = int(parse_qs(parsed.query).get('db', ['0'])[0])
+            return cls(path=parsed.path, db=db, password=parsed.password, timeout=timeout)
+        if parsed.scheme != 'redis':
+            raise ValueError(f"Unsupported state store URL: {url}")
+        db = int(parsed.path.lstrip('/') or 0)
+        return cls(parsed.hostname or '127.0.0.1', parsed.port or 6379, db=db,
+                   password=parsed.password, timeout=timeout)
+
+    async def connect(self):
+        if self.path:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        for result in await self._roundtrip(setup):
+            if isinstance(result, StoreError):
+                raise result
+
+    async def _roundtrip(self, commands: Sequence[Sequence]) -> List[Any]:
+        self.writer.write(b''.join(encode_command(command) for command in commands))
+        await self.writer.drain()
+        return [await read_reply(self.reader) for _ in commands]
+
+    async def pipeline(self, commands: Sequence[Sequence]) -> List[Any]:
+        """Send commands in one write and read their replies (errors returned in place)"""
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.writer is None:
+                        await asyncio.wait_for(self.connect(), self.timeout)
+                    # Cheaper than wait_for on the hot path: a stuck store gets
+                    # its connection aborted, which fails the pending read
+                    deadline = asyncio.get_running_loop().call_later(
+                        self.timeout, self.writer.transport.abort
+                    )
+                    try:
+                        return await self._roundtrip(commands)
+                    finally:
+                        deadline.cancel()
+                except (OSError, ConnectionError, asyncio.IncompleteReadError,
+                        asyncio.TimeoutError):
+                    # A half-read reply leaves the stream unusable; reconnect once
+                    await self._disconnect()
+                    if attempt:
+                        raise
+
+    async def execute(self, *args) -> Any:
+        result = (await self.pipeline([args]))[0]
+        if isinstance(result, StoreError):
+            raise result
+        return result
+
+    async def _disconnect(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (OSError, ConnectionError):
+                pass
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.lock is None:
+            return
+        async with self.lock:
+            await self._disconnect()
+
+
+def store_from_url(url: Optional[str]):
+    """MemoryStore when url is empty (single process), else a RespStore"""
+    return RespStore.from_url(url) if url else MemoryStore()
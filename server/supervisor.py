@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# chimera-vx/server/supervisor.py
+# Multi-process serving for Chimera-VX: worker supervision and leader election
+#
+# The supervisor forks N workers that each bind the listening port with
+# SO_REUSEPORT, so the kernel spreads connections across them. It restarts
+# workers that die, backing off while they keep crashing right after start,
+# and stops them all on SIGTERM/SIGINT. Node-wide background jobs run in one
+# elected worker: the holder of an exclusive flock on a lock file. The lock
+# dies with its holder, so another worker takes over after a crash.
+
+import asyncio
+import fcntl
+import os
+import signal
+import time
+import traceback
+from typing import Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Supervisor:
+    """Fork, watch and restart worker processes"""
+
+    POLL_INTERVAL = 0.5   # seconds between reaping checks
+    STABLE_AFTER = 10.0   # A worker alive this long resets its restart backoff
+    STOP_TIMEOUT = 30.0   # seconds to wait for workers before SIGKILL
+
+    def __init__(self, workers: int, run_worker: Callable[[int], None],
+                 restart_delay: float = 1.0, max_restart_delay: float = 30.0):
+        self.workers = workers
+        self.run_worker = run_worker  # Called in the child with the worker index
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+
+        self.pids: Dict[int, int] = {}          # pid -> worker index
+        self.started: Dict[int, float] = {}     # worker index -> start time
+        self.delays: Dict[int, float] = {}      # worker index -> next restart delay
+        self.restart_at: Dict[int, float] = {}  # worker index -> when to restart it
+        self.stopping = False
+
+        # Statistics
+        self.stats = {
+            'started': 0,
+            'crashed': 0
+        }
+
+    def spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            # Child: default signal handling, run the worker, never return
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self.run_worker(index)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+
+        self.pids[pid] = index
+        self.started[index] = time.monotonic()
+        self.stats['started'] += 1
+        logger.info(f"Started worker {index} (pid {pid})")
+
+    def stop(self, signum=None, frame=None):
+        """Stop restarting and ask every worker to shut down"""
+        if not self.stopping:
+            logger.info("Stopping workers")
+        self.stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        """Collect exited workers and schedule restarts for unexpected exits"""
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.pids.clear()
+                return
+            if pid == 0:
+                return
+            index = self.pids.pop(pid, None)
+            if index is None:
+                continue
+            if self.stopping:
+                continue
+
+            self.stats['crashed'] += 1
+            if os.WIFSIGNALED(status):
+                reason = f"killed by signal {os.WTERMSIG(status)}"
+            else:
+                reason = f"exit code {os.waitstatus_to_exitcode(status)}"
+            uptime = time.monotonic() - self.started[index]
+            delay = self.restart_delay
+            if uptime < self.STABLE_AFTER:
+                # Crashing right after start: back off exponentially
+                delay = min(self.delays.get(index, self.restart_delay / 2) * 2,
+                            self.max_restart_delay)
+            self.delays[index] = delay
+            self.restart_at[index] = time.monotonic() + delay
+            logger.error(f"Worker {index} (pid {pid}) died after {uptime:.0f}s ({reason}); "
+                         f"restarting in {delay:.1f}s")
+
+    def run(self) -> int:
+        """Run until stopped; returns the exit code for the supervisor"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"Supervisor (pid {os.getpid()}) starting {self.workers} workers")
+        for index in range(self.workers):
+            self.spawn(index)
+
+        deadline: Optional[float] = None
+        while self.pids or (not self.stopping and self.restart_at):
+            time.sleep(self.POLL_INTERVAL)
+            self.reap()
+
+            if self.stopping:
+                self.restart_at.clear()
+                if deadline is None:
+                    deadline = time.monotonic() + self.STOP_TIMEOUT
+                elif time.monotonic() > deadline:
+                    for pid in self.pids:
+                        logger.warning(f"Worker pid {pid} did not stop; killing it")
+                        os.kill(pid, signal.SIGKILL)
+                    deadline = float('inf')
+                continue
+
+            now = time.monotonic()
+            for index, restart_at in list(self.restart_at.items()):
+                if restart_at <= now:
+                    del self.restart_at[index]
+                    self.spawn(index)
+
+        logger.info(f"Supervisor stopped ({self.stats['crashed']} worker crashes)")
+        return 0
+
+
+class LeaderElection:
+    """One leader among the processes sharing a lock file (exclusive flock)"""
+
+    def __init__(self, lock_path: str, poll_interval: float = 2.0):
+        self.lock_path = lock_path
+        self.poll_interval = poll_interval
+        self.fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.fd is not None
+
+    def try_acquire(self) -> bool:
+        """Become leader if nobody holds the lock; never blocks"""
+        if self.fd is not None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self.fd = fd
+        return True
+
+    async def wait_elected(self):
+        """Return once this process is the leader"""
+        while not self.try_acquire():
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
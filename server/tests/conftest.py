@@ -0,0 +1,7 @@
+# chimera-vx/server/tests/conftest.py
+# Server modules import each other by name; make them importable from tests
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
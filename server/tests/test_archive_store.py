@@ -0,0 +1,43 @@
+# chimera-vx/server/tests/test_archive_store.py
+# Archive segments: round trip, duplicate rows, and indexed per-player deletes
+
+import pytest
+
+from archive_store import ArchiveStore
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ArchiveStore(str(tmp_path / 'archive.db'))
+    yield archive
+    archive.close()
+
+
+def submissions(player_id, ids):
+    return [{'id': i, 'player_id': player_id, 'submitted_at': 1000 + i} for i in ids]
+
+
+def test_fetch_newest_first_without_duplicates(archive):
+    archive.append('submissions', submissions(1, range(1, 6)) + submissions(2, [6]))
+    # A batch interrupted between archive and delete is archived again
+    archive.append('submissions', submissions(1, range(4, 9)))
+
+    rows = archive.fetch('submissions', 1, limit=4)
+    assert [row['id'] for row in rows] == [8, 7, 6, 5]
+    assert [row['id'] for row in archive.fetch('submissions', 1, limit=10, exclude_ids=[8])] == \
+        [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_delete_player_uses_the_segment_index(archive):
+    archive.append('submissions', submissions(1, [1, 2]) + submissions(2, [3]))
+    archive.append('cheat_logs', [{'id': 1, 'player_id': 1, 'detected_at': 1000}])
+
+    with archive.pool.read() as conn:
+        plan = conn.execute('EXPLAIN QUERY PLAN DELETE FROM segments WHERE source = ? AND player_id = ?',
+                            ('submissions', 1)).fetchall()
+    assert any('idx_segments_player' in row['detail'] for row in plan)
+
+    assert archive.delete_player(1) == 2
+    assert archive.fetch('submissions', 1, limit=10) == []
+    assert archive.fetch('cheat_logs', 1, limit=10) == []
+    assert [row['id'] for row in archive.fetch('submissions', 2, limit=10)] == [3]
@@ -0,0 +1,54 @@
+# chimera-vx/server/tests/test_blob_store.py
+# Puzzle blobs: large files stored once, hydrated on read, collected when unused
+
+import json
+import time
+
+import pytest
+
+from blob_store import BLOB_KEY, BLOB_MIN_SIZE
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'chimera.db'))
+    yield db
+    db.close()
+
+
+def blob_count(db):
+    with db.get_connection(readonly=True) as conn:
+        return conn.execute('SELECT COUNT(*) FROM blobs').fetchone()[0]
+
+
+def test_shared_files_are_stored_once_and_hydrated(db):
+    shared = 'q' * (BLOB_MIN_SIZE * 4)
+    puzzle = {'files': {'circuit.qasm': shared, 'README': 'short'}, 'hint': 'none'}
+    players = [db.create_player(f'p{index}', 'p@example.com', f'hw-{index}') for index in range(3)]
+    puzzle_ids = [db.create_puzzle(player_id, 1, 'quantum', json.dumps(puzzle), 'hash', int(time.time()))
+                  for player_id in players]
+    assert blob_count(db) == 1
+
+    stored = db.get_puzzle(puzzle_ids[0])
+    manifest = json.loads(stored['puzzle_data'])
+    assert BLOB_KEY in manifest['files']['circuit.qasm']
+    assert manifest['files']['README'] == 'short'
+
+    assert db.load_puzzle_data(stored['puzzle_data']) == puzzle
+    only = db.load_puzzle_data(stored['puzzle_data'], files=['README'])
+    assert BLOB_KEY in only['files']['circuit.qasm']
+
+
+def test_gc_removes_blobs_only_after_their_last_puzzle(db):
+    first = db.create_player('first', 'first@example.com', 'hw-first')
+    second = db.create_player('second', 'second@example.com', 'hw-second')
+    for player_id in (first, second):
+        db.create_puzzle(player_id, 1, 'quantum',
+                         json.dumps({'files': {'data.bin': 'x' * BLOB_MIN_SIZE}}), 'hash', int(time.time()))
+
+    db.reset_player(first)
+    assert db.gc_blobs() == 0
+    db.reset_player(second)
+    assert db.gc_blobs() == 1
+    assert blob_count(db) == 0
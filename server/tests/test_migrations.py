@@ -0,0 +1,27 @@
+# chimera-vx/server/tests/test_migrations.py
+# Schema migrations: databases created at an older version catch up
+
+from database import Database
+from migrations import LATEST_VERSION, MIGRATIONS
+
+
+def indexes(db):
+    with db.get_connection(readonly=True) as conn:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_versions_are_contiguous():
+    assert [m.version for m in MIGRATIONS] == list(range(1, LATEST_VERSION + 1))
+
+
+def test_older_database_gets_later_indexes(tmp_path):
+    path = str(tmp_path / 'chimera.db')
+    old = Database(path, schema_version=9)
+    assert old.get_schema_version() == 9
+    assert 'idx_players_rank' not in indexes(old)
+    old.close()
+
+    db = Database(path)
+    assert db.get_schema_version() == LATEST_VERSION
+    assert 'idx_players_rank' in indexes(db)
+    db.close()
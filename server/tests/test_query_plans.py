@@ -0,0 +1,27 @@
+# chimera-vx/server/tests/test_query_plans.py
+# Query plan regressions: every Database scenario must use indexes
+#
+# A smaller event than query_plan_check.py's default keeps the run short.
+# The seed runs ANALYZE, so plans depend on table sizes: with much fewer
+# players SQLite prefers scanning the small tables.
+
+import pytest
+
+from query_plan_check import ALLOWED, KNOWN_ISSUES, SCENARIOS, run_check
+
+PLAYERS = 2000
+
+
+@pytest.fixture(scope='module')
+def plan_results():
+    return run_check(PLAYERS)
+
+
+@pytest.mark.parametrize('method', [method for method, _ in SCENARIOS])
+def test_query_plan(plan_results, method):
+    statements, errors, violations = plan_results
+    assert method not in errors, errors.get(method)
+    if method in KNOWN_ISSUES:
+        assert method in violations, f"{method} is fixed: remove it from KNOWN_ISSUES"
+    elif method not in ALLOWED:
+        assert method not in violations, '; '.join(sorted(violations[method]))
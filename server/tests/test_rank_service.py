@@ -0,0 +1,61 @@
+# chimera-vx/server/tests/test_rank_service.py
+# Rank index: order against a sorted reference, and only committed changes
+
+import random
+
+import pytest
+
+from database import Database
+from rank_service import RankService, rank_key
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'chimera.db'))
+    yield db
+    db.close()
+
+
+def test_ranks_match_sorted_reference():
+    rng = random.Random(7)
+    players = {player_id: (rng.randint(0, 20), rng.randint(0, 5000)) for player_id in range(1, 401)}
+    ranks = RankService()
+    ranks.rebuild([(player_id, *row) for player_id, row in list(players.items())[:200]])
+    for player_id, row in list(players.items())[200:]:
+        ranks.update(player_id, *row)
+
+    # Move some players and drop others, as progress and bans would
+    for player_id in rng.sample(sorted(players), 100):
+        players[player_id] = (rng.randint(0, 20), rng.randint(0, 5000))
+        ranks.update(player_id, *players[player_id])
+    for player_id in rng.sample(sorted(players), 50):
+        del players[player_id]
+        ranks.remove(player_id)
+
+    reference = sorted(players, key=lambda player_id: rank_key(player_id, *players[player_id]))
+    assert len(ranks) == len(reference)
+    for position, player_id in enumerate(reference, 1):
+        assert ranks.rank(player_id) == position
+    assert ranks.count_ahead(0, 21, 0) == 0
+    assert ranks.count_ahead(10**6, -1, 10**9) == len(reference)
+
+
+def test_rolled_back_create_is_not_ranked(db):
+    db.get_player_rank(0)  # Build the index so updates apply directly
+    with pytest.raises(RuntimeError):
+        with db.get_connection():
+            player_id = db.create_player('ghost', 'ghost@example.com', 'hw-ghost')
+            raise RuntimeError
+    assert db.get_player(player_id) is None
+    assert db.get_player_rank(player_id) is None
+    assert len(db.ranks) == 0
+
+
+def test_reset_ranks_after_commit(db):
+    first = db.create_player('first', 'first@example.com', 'hw-1')
+    second = db.create_player('second', 'second@example.com', 'hw-2')
+    db.update_player_progress(second, None, 30)
+    assert [db.get_player_rank(first), db.get_player_rank(second)] == [2, 1]
+
+    db.reset_player(second)
+    assert [db.get_player_rank(first), db.get_player_rank(second)] == [1, 2]
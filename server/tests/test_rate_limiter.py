@@ -0,0 +1,58 @@
+# chimera-vx/server/tests/test_rate_limiter.py
+# Token buckets and heavy-hitter tracking
+
+import pytest
+
+from heavy_hitters import HeavyHitters, subnet_of
+from rate_limiter import RateLimiter, RatePolicy
+
+
+def test_burst_then_steady_rate():
+    limiter = RateLimiter(RatePolicy(max_requests=10, window=10, burst=3))
+    assert [limiter.check('ip', now=0) for _ in range(3)] == [0, 0, 0]
+    assert limiter.check('ip', now=0) == pytest.approx(1.0)  # One token per second
+    assert limiter.check('ip', now=0.5) == pytest.approx(0.5)
+    assert limiter.check('ip', now=1.0) == 0
+    assert limiter.check('other', now=1.0) == 0
+
+
+def test_routes_have_their_own_buckets():
+    limiter = RateLimiter(RatePolicy(100, 60, 100), {'submit': RatePolicy(1, 60, 1)})
+    assert limiter.check('ip', 'submit', now=0) == 0
+    assert limiter.check('ip', 'submit', now=1) > 0
+    assert limiter.check('ip', 'challenge', now=1) == 0  # Unlisted route: default policy
+
+
+def test_key_table_is_bounded_and_keeps_busy_clients():
+    limiter = RateLimiter(RatePolicy(1, 1, 2), max_keys=4)
+    for index in range(10):
+        # busy drains its bucket every second; a one-off client refills in one
+        limiter.check('busy', now=index)
+        limiter.check('busy', now=index)
+        limiter.check(f'once-{index}', now=index)
+    assert len(limiter) == 4
+    assert limiter.check('busy', now=9) > 0  # Its drained bucket was kept
+    assert limiter.prune(now=10**6) == 4
+
+
+def test_heavy_hitters_find_the_flood():
+    hitters = HeavyHitters(k=5, width=512, half_life=60)
+    for index in range(2000):
+        hitters.add(f'10.0.{index % 250}.{index % 7}', now=0)
+        if index % 4 == 0:
+            hitters.add('203.0.113.9', now=0)
+    heaviest = hitters.heaviest(1)[0]
+    assert heaviest[0] == '203.0.113.9'
+    assert heaviest[1] >= 500
+
+
+def test_heavy_hitters_decay_by_half_lives():
+    hitters = HeavyHitters(k=5, half_life=10)
+    start = hitters.decayed_at
+    hitters.add('a', 64, now=start)
+    assert hitters.add('a', 0, now=start + 20) == 16  # Two half-lives
+
+
+def test_subnets():
+    assert subnet_of('198.51.100.7') == '198.51.100.0/24'
+    assert subnet_of('2001:db8:1:2::1') == '2001:db8:1::/48'
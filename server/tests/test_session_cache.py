@@ -0,0 +1,103 @@
+# chimera-vx/server/tests/test_session_cache.py
+# Session cache: stale reads are dropped, and writes invalidate once committed
+
+import threading
+import time
+
+import pytest
+
+from database import Database
+from session_cache import SessionCache
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'chimera.db'), session_cache_size=100)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def player(db):
+    player_id = db.create_player('cached', 'cached@example.com', 'hw-cached')
+    db.create_session(player_id, 'session-a')
+    db.create_session(player_id, 'session-b')
+    assert db.get_player_by_session('session-a')['id'] == player_id
+    assert db.get_player_by_session('session-b')['id'] == player_id
+    assert len(db.session_cache) == 2
+    return player_id
+
+
+def test_put_after_invalidation_is_dropped():
+    cache = SessionCache(ttl=60)
+    generation = cache.generation
+    cache.invalidate_player(1)  # A write committed while the row was read
+    cache.put('s', {'id': 1}, time.time() + 60, generation)
+    assert cache.get('s') is None
+
+    cache.put('s', {'id': 1}, time.time() + 60, cache.generation)
+    assert cache.get('s') == {'id': 1}
+
+
+def test_entries_end_at_session_expiry_and_lru_bound():
+    cache = SessionCache(max_entries=2, ttl=60)
+    cache.put('expired', {'id': 1}, time.time() - 1, cache.generation)
+    assert cache.get('expired') is None
+
+    for name in ('a', 'b', 'c'):
+        cache.put(name, {'id': 2}, time.time() + 60, cache.generation)
+    assert cache.get('a') is None
+    assert cache.get('c') == {'id': 2}
+    assert cache.stats['evictions'] == 1
+
+
+def test_logout_invalidates_one_session(db, player):
+    db.delete_session('session-a')
+    assert db.get_player_by_session('session-a') is None
+    assert db.get_player_by_session('session-b')['id'] == player
+
+
+def test_deactivate_invalidates_every_session(db, player):
+    assert db.deactivate_player(player)
+    assert db.get_player_by_session('session-a') is None
+    assert db.get_player_by_session('session-b') is None
+    assert not db.deactivate_player(player)
+
+
+def test_progress_refreshes_cached_player(db, player):
+    db.update_player_progress(player, None, 10)
+    assert db.get_player_by_session('session-a')['current_circle'] == 2
+
+
+def test_rolled_back_logout_keeps_the_session(db, player):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.delete_session('session-a')
+            raise RuntimeError
+    assert db.get_player_by_session('session-a')['id'] == player
+
+
+def test_logout_is_not_lost_with_another_threads_rollback(db, player):
+    entered, release = threading.Event(), threading.Event()
+
+    def failing_unit():
+        try:
+            with db.transaction():
+                db.create_player('other', 'other@example.com', 'hw-other')
+                entered.set()
+                release.wait()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+    unit = threading.Thread(target=failing_unit)
+    unit.start()
+    entered.wait()
+    logout = threading.Thread(target=db.delete_session, args=('session-a',))
+    logout.start()
+    time.sleep(0.1)  # The logout now waits for the writer
+    release.set()
+    unit.join()
+    logout.join()
+
+    assert db.get_player_by_session('session-a') is None
@@ -0,0 +1,75 @@
+# chimera-vx/server/tests/test_session_tokens.py
+# Signed tokens and the revocation set, including same-second boundaries
+
+import pytest
+
+import session_tokens
+from session_tokens import RevocationSet, TokenSigner, token_clock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable time.time() for the session_tokens module"""
+    now = [1_700_000_000.25]
+    monkeypatch.setattr(session_tokens.time, 'time', lambda: now[0])
+    return now
+
+
+def revocation(row_id, not_before=None, token_id=None, player_id=None, expires_at=1_800_000_000):
+    return {'id': row_id, 'token_id': token_id, 'player_id': player_id,
+            'not_before': not_before, 'expires_at': expires_at}
+
+
+def test_verify_rejects_tampering_and_retired_keys():
+    signer = TokenSigner('secret')
+    token, claims = signer.issue(42)
+    assert signer.verify(token) == claims
+
+    payload, signature = token.split('.')
+    assert signer.verify(f"{payload}x.{signature}") is None
+    assert TokenSigner('other').verify(token) is None
+    assert TokenSigner('secret', key_version=2, min_key_version=2).verify(token) is None
+
+
+def test_reset_revokes_tokens_issued_earlier_in_the_same_second(clock):
+    signer = TokenSigner('secret')
+    revocations = RevocationSet()
+    _, before = signer.issue(7)
+
+    clock[0] += 0.5  # Same whole second
+    revocations.add(revocation(1, not_before=token_clock(), player_id=7))
+    _, replacement = signer.issue(7)
+    _, other_player = signer.issue(8)
+
+    assert before['t'] // 1000 == replacement['t'] // 1000
+    assert revocations.is_revoked(before)
+    assert not revocations.is_revoked(replacement)
+    assert not revocations.is_revoked(other_player)
+
+
+def test_not_before_only_moves_forward(clock):
+    signer = TokenSigner('secret')
+    revocations = RevocationSet()
+    revocations.apply([revocation(1, not_before=token_clock() + 1000, player_id=7),
+                       revocation(2, not_before=token_clock(), player_id=7)])
+    clock[0] += 0.5
+    _, claims = signer.issue(7)
+
+    assert revocations.is_revoked(claims)
+    assert revocations.last_id == 2
+
+
+def test_token_revocation_and_prune(clock):
+    signer = TokenSigner('secret', lifetime=60)
+    revocations = RevocationSet()
+    _, kept = signer.issue(7)
+    _, logged_out = signer.issue(7)
+    revocations.add(revocation(1, token_id=logged_out['i'], expires_at=logged_out['e']))
+    revocations.add(revocation(2, not_before=0, player_id=9, expires_at=int(clock[0]) + 3600))
+
+    assert revocations.is_revoked(logged_out)
+    assert not revocations.is_revoked(kept)
+
+    clock[0] += 61
+    assert revocations.prune() == 1
+    assert len(revocations) == 1
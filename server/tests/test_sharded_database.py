@@ -0,0 +1,82 @@
+# chimera-vx/server/tests/test_sharded_database.py
+# Sharded routing: cross-shard session cap, fingerprint claims, per-shard write queues
+
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from async_database import AsyncDatabase
+from sharded_database import ShardedDatabase
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    db = ShardedDatabase(str(tmp_path / 'chimera.db'), shards=4, max_sessions_per_player=3)
+    yield db
+    db.close()
+
+
+def test_session_cap_spans_shards(sharded, monkeypatch):
+    player_id = sharded.create_player('capped', 'capped@example.com', 'hw-capped')
+    hashes = [f'session-{index:02d}' for index in range(8)]
+    assert len({sharded.shard_for_key(session_hash).db_path for session_hash in hashes}) > 1
+
+    # One login per second, so created_at orders them
+    now = [1_700_000_000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    for session_hash in hashes:
+        now[0] += 1
+        sharded.create_session(player_id, session_hash)
+
+    live = {session['session_hash'] for session in sharded.get_player_sessions(player_id)}
+    assert live == set(hashes[-3:])
+    assert sharded.get_player_by_session(hashes[0]) is None
+    assert sharded.get_player_by_session(hashes[-1])['id'] == player_id
+
+
+def test_fingerprint_is_unique_across_shards(sharded):
+    results = []
+
+    def register(index):
+        try:
+            results.append(sharded.create_player(f'racer{index}', 'racer@example.com', 'hw-shared'))
+        except sqlite3.IntegrityError:
+            results.append(None)
+
+    threads = [threading.Thread(target=register, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = [player_id for player_id in results if player_id is not None]
+    assert len(winners) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        sharded.create_player('late', 'late@example.com', 'hw-shared')
+
+    # Purging the owner frees the fingerprint
+    sharded.purge_players(winners)
+    assert sharded.create_player('next', 'next@example.com', 'hw-shared')
+
+
+def test_writes_to_a_shard_run_in_submission_order(sharded):
+    player_ids = [sharded.create_player(f'fifo{index}', 'fifo@example.com', f'hw-fifo{index}')
+                  for index in range(4)]
+
+    async def scenario():
+        db = AsyncDatabase(sharded)
+        assert len(db.write_executors) == 4
+        await asyncio.gather(*[
+            db.update_player_metadata(player_id, {'step': step})
+            for step in range(30) for player_id in player_ids
+        ])
+        for executor in db.write_executors + [db.read_executor, db.maintenance_executor]:
+            executor.shutdown()
+
+    asyncio.run(scenario())
+    for player_id in player_ids:
+        assert sharded.write_shard('update_player_metadata', (player_id, {}), {}) == \
+            sharded.shards.index(sharded.shard_for_player(player_id))
+        assert '"step":29' in sharded.get_player(player_id)['metadata']
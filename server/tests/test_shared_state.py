@@ -0,0 +1,135 @@
+# chimera-vx/server/tests/test_shared_state.py
+# Rate limits, bans and cooldowns, in-process and over a state server socket
+
+import asyncio
+
+import pytest
+
+import state_store
+from rate_limiter import RateLimiter, RatePolicy
+from shared_state import SharedState
+from state_server import StateServer
+from state_store import MemoryStore, RespStore, StoreError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable time.time() for the stores and SharedState"""
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(state_store.time, 'time', lambda: now[0])
+    return now
+
+
+def test_memory_store_set_nx_px_and_expiry(clock):
+    store = MemoryStore()
+    assert store.run([('SET', 'k', 'v', 'NX', 'PX', 1500)]) == ['OK']
+    assert store.run([('SET', 'k', 'w', 'NX')]) == [None]
+    assert store.run([('GET', 'k'), ('PTTL', 'k'), ('PTTL', 'missing')]) == [b'v', 1500, -2]
+
+    clock[0] += 1.5
+    assert store.run([('GET', 'k'), ('EXISTS', 'k')]) == [None, 0]
+    assert store.run([('INCR', 'n'), ('INCR', 'n'), ('INCRBY', 'n', 5)]) == [1, 2, 7]
+
+    # Errors come back in place; the other commands still run
+    results = store.run([('SET', 'x', 1, 'PX', 0), ('BOGUS',), ('GET', 'n')])
+    assert isinstance(results[0], StoreError)
+    assert isinstance(results[1], StoreError)
+    assert results[2] == b'7'
+
+
+def test_local_bans_and_cooldowns(clock):
+    async def scenario():
+        state = SharedState(MemoryStore(), RateLimiter(RatePolicy(2, 60, 2)))
+        assert await state.check_rate('ip') == 0
+        assert await state.check_rate('ip') == 0
+        assert await state.check_rate('ip') > 0
+
+        assert await state.ban('cheater', 30)
+        assert await state.check_rate('cheater') == pytest.approx(30)
+        assert await state.is_banned('cheater')
+        assert await state.unban('cheater')
+        assert await state.check_rate('cheater') == 0
+
+        assert await state.ban('forever')
+        assert await state.check_rate('forever') == float('inf')
+
+        winners = await asyncio.gather(*[state.acquire_cooldown('challenge:7', 5) for _ in range(5)])
+        assert winners.count(True) == 1
+        clock[0] += 5
+        assert await state.acquire_cooldown('challenge:7', 5)
+
+    asyncio.run(scenario())
+
+
+def test_workers_share_state_over_the_socket(tmp_path, clock):
+    path = str(tmp_path / 'state.sock')
+
+    async def scenario():
+        server = await asyncio.start_unix_server(StateServer(MemoryStore()).handle_client, path)
+        workers = [
+            SharedState(RespStore(path=path), RateLimiter(RatePolicy(3, 60, 3)))
+            for _ in range(2)
+        ]
+        try:
+            # One sliding window across both workers
+            first, second = workers
+            assert [await first.check_rate('ip') for _ in range(2)] == [0, 0]
+            assert await second.check_rate('ip') == 0
+            assert await second.check_rate('ip') > 0
+            assert await first.check_rate('ip') > 0
+            assert await first.check_rate('other') == 0
+
+            # A ban set by one worker is enforced by the other
+            assert await first.ban('cheater', 30)
+            assert await second.is_banned('cheater')
+            assert await second.check_rate('cheater') == pytest.approx(30, abs=0.01)
+
+            # Concurrent cooldowns on two workers: one winner
+            results = await asyncio.gather(*[
+                worker.acquire_cooldown('challenge:7', 5) for worker in workers for _ in range(3)
+            ])
+            assert results.count(True) == 1
+        finally:
+            for worker in workers:
+                await worker.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_window_slides_between_fixed_windows(tmp_path, clock):
+    path = str(tmp_path / 'state.sock')
+    clock[0] = 1_700_000_040.0  # 0s into a 60s window
+
+    async def scenario():
+        server = await asyncio.start_unix_server(StateServer(MemoryStore()).handle_client, path)
+        state = SharedState(RespStore(path=path), RateLimiter(RatePolicy(4, 60, 4)))
+        try:
+            assert [await state.check_rate('ip') for _ in range(4)] == [0, 0, 0, 0]
+
+            # Half the previous window still counts: 4 * 0.5 + 2 fits, a third does not
+            clock[0] += 90
+            assert await state.check_rate('ip') == 0
+            assert await state.check_rate('ip') == 0
+            assert await state.check_rate('ip') == pytest.approx(15)
+        finally:
+            await state.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_flood_blocks_the_source(clock):
+    async def scenario():
+        state = SharedState(MemoryStore(), RateLimiter(RatePolicy(1000, 60, 1000)),
+                            flood_threshold=20, flood_block=600)
+        for _ in range(19):
+            assert await state.check_request('203.0.113.9') == 0
+        assert await state.check_request('203.0.113.9') == 600
+        assert await state.check_rate('203.0.113.9') == pytest.approx(600)
+        assert await state.check_request('198.51.100.7') == 0
+        assert state.stats['auto_blocks'] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+# chimera-vx/server/tests/test_submit_outcome.py
+# The submit unit of work: only one of two concurrent solves applies (the
+# other raises WriteConflict, which handle_submit answers with 409)
+
+import json
+import threading
+import time
+
+import pytest
+
+from database import Database, WriteConflict
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'chimera.db'))
+    yield db
+    db.close()
+
+
+def record_outcome(puzzle_id, player_id):
+    """The correct-solution path of handle_submit's unit of work"""
+    def work(db):
+        db.increment_puzzle_attempts(puzzle_id)
+        if not db.mark_puzzle_solved(puzzle_id=puzzle_id, solved_at=int(time.time()),
+                                     solution='answer'):
+            raise WriteConflict(f"Puzzle {puzzle_id} is no longer active")
+        return db.update_player_progress(player_id=player_id, new_circle=None, time_spent=30)
+    return work
+
+
+def test_second_solve_conflicts_and_rolls_back(db):
+    player_id = db.create_player('solver', 'solver@example.com', 'hw-solver')
+    puzzle_id = db.create_puzzle(player_id, 1, 'quantum', json.dumps({'files': {}}),
+                                 'hash', int(time.time()))
+    outcomes = []
+
+    def submit():
+        try:
+            outcomes.append(db.unit_of_work(record_outcome(puzzle_id, player_id), player_id=player_id))
+        except WriteConflict:
+            outcomes.append(409)
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes, key=str).count(409) == 3
+    progress = next(outcome for outcome in outcomes if outcome != 409)
+    assert progress == {'current_circle': 2, 'total_time': 30}
+
+    player = db.get_player(player_id)
+    assert (player['progress'], player['current_circle'], player['total_time']) == (1, 2, 30)
+    puzzle = db.get_puzzle(puzzle_id)
+    assert puzzle['status'] == 'solved'
+    assert puzzle['attempts'] == 1  # Conflicting attempts rolled back
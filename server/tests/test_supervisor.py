@@ -0,0 +1,57 @@
+# chimera-vx/server/tests/test_supervisor.py
+# Worker restarts with backoff, and leader election over a lock file
+
+import os
+import time
+
+from supervisor import LeaderElection, Supervisor
+
+
+def wait_reaped(supervisor: Supervisor, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while supervisor.pids and time.monotonic() < deadline:
+        supervisor.reap()
+        time.sleep(0.01)
+    assert not supervisor.pids
+
+
+def crash(index: int):
+    raise SystemExit(3)
+
+
+def test_crashing_worker_restarts_with_backoff():
+    supervisor = Supervisor(1, crash, restart_delay=1.0, max_restart_delay=3.0)
+    delays = []
+    for _ in range(4):
+        supervisor.spawn(0)
+        wait_reaped(supervisor)
+        delays.append(supervisor.restart_at.pop(0) - time.monotonic())
+
+    # Each crash right after start doubles the delay, up to the maximum
+    assert [round(delay) for delay in delays] == [1, 2, 3, 3]
+    assert supervisor.stats == {'started': 4, 'crashed': 4}
+
+
+def test_stopped_workers_are_not_restarted():
+    supervisor = Supervisor(1, lambda index: time.sleep(60))
+    supervisor.spawn(0)
+    supervisor.stop()
+    wait_reaped(supervisor)
+    assert supervisor.restart_at == {}
+    assert supervisor.stats['crashed'] == 0
+
+
+def test_one_leader_per_lock_file(tmp_path):
+    lock_path = str(tmp_path / 'leader.lock')
+    first, second = LeaderElection(lock_path), LeaderElection(lock_path)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert first.is_leader and not second.is_leader
+    with open(lock_path) as f:
+        assert f.read() == f"{os.getpid()}\n"
+
+    first.release()
+    assert second.try_acquire()
+    assert not first.try_acquire()
+    second.release()
@@ -0,0 +1,64 @@
+# chimera-vx/server/tests/test_timer_wheel.py
+# Timer wheel: keys fire in deadline order, across cascades and the overflow set
+
+import math
+import random
+
+from timer_wheel import TimerWheel
+
+
+class SmallWheel(TimerWheel):
+    """4 slots x 2 levels: cascades every 4 ticks, overflow beyond 16"""
+    SLOTS = 4
+    LEVELS = 2
+
+
+def fire_all(wheel, start, end):
+    """(tick, key) for every key fired while stepping one tick at a time"""
+    fired = []
+    for now in range(start, end + 1):
+        fired += [(now, key) for key in wheel.advance(now)]
+    return fired
+
+
+def test_keys_fire_at_their_deadline_in_order():
+    rng = random.Random(3)
+    wheel = SmallWheel(now=0)
+    deadlines = {f'k{index}': rng.uniform(0, 100) for index in range(300)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+
+    fired = fire_all(wheel, 0, 101)
+    assert sorted(key for _, key in fired) == sorted(deadlines)
+    for tick, key in fired:
+        assert tick == math.ceil(deadlines[key])
+    assert [tick for tick, _ in fired] == sorted(tick for tick, _ in fired)
+    assert len(wheel) == 0
+
+
+def test_reschedule_and_cancel():
+    wheel = SmallWheel(now=0)
+    wheel.schedule('moved', 5)
+    wheel.schedule('moved', 40)  # Later: the old slot must not fire it
+    wheel.schedule('early', 30)
+    wheel.schedule('early', 2)
+    wheel.schedule('cancelled', 3)
+    wheel.cancel('cancelled')
+
+    assert fire_all(wheel, 0, 50) == [(2, 'early'), (40, 'moved')]
+
+
+def test_past_deadlines_fire_on_the_next_advance():
+    wheel = TimerWheel(now=1000)
+    wheel.advance(1010)
+    wheel.schedule('late', 1005)
+    assert wheel.advance(1010) == []
+    assert wheel.advance(1011) == ['late']
+
+
+def test_jumping_far_ahead_fires_everything_due():
+    wheel = TimerWheel(now=0)
+    for deadline in (1, 70, 5000, 300000):
+        wheel.schedule(deadline, deadline)
+    assert wheel.advance(6000) == [1, 70, 5000]
+    assert wheel.advance(300000) == [300000]
@@ -0,0 +1,76 @@
+# chimera-vx/server/tests/test_write_behind.py
+# Write-behind buffers: coalescing, failed flushes, and counters visible while in flight
+
+import sqlite3
+
+import pytest
+
+from database import Database
+from write_behind import CoalescingBuffer, CounterBuffer
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'chimera.db'))
+    yield db
+    db.close()
+
+
+def test_restore_keeps_newer_values():
+    buffer = CoalescingBuffer('test')
+    buffer.put('a', 1)
+    buffer.put('a', 2)
+    buffer.put('b', 1)
+    drained = buffer.drain()
+    assert drained == {'a': 2, 'b': 1}
+
+    buffer.put('a', 3)  # Written while the flush was failing
+    buffer.restore(drained)
+    assert buffer.drain() == {'a': 3, 'b': 1}
+
+
+def test_counters_stay_visible_until_committed():
+    buffer = CounterBuffer('test')
+    buffer.add('m', 2)
+    assert buffer.drain() == {'m': 2}
+    buffer.add('m', 1)
+    assert buffer.peek('m') == 3  # In flight plus pending
+
+    buffer.restore()
+    assert buffer.peek('m') == 3
+    assert buffer.drain() == {'m': 3}
+    buffer.committed()
+    assert buffer.peek('m') == 0
+
+
+def test_statistics_flush(db):
+    db.count_statistic('solutions_submitted', 3)
+    assert db.get_statistics(['solutions_submitted']) == {'solutions_submitted': 3}
+    assert db.flush_statistics() == 1
+    assert db.get_statistic('solutions_submitted') == 3
+    db.count_statistic('solutions_submitted')
+    assert db.get_statistics(['solutions_submitted', 'unknown']) == \
+        {'solutions_submitted': 4, 'unknown': 0}
+
+
+def test_failed_statistics_flush_keeps_deltas(db):
+    db.count_statistic('solutions_submitted', 2)
+    with db.get_connection() as conn:
+        conn.execute('ALTER TABLE statistics RENAME TO statistics_moved')
+    with pytest.raises(sqlite3.Error):
+        db.flush_statistics()
+    assert db.statistics_buffer.peek('solutions_submitted') == 2
+
+    with db.get_connection() as conn:
+        conn.execute('ALTER TABLE statistics_moved RENAME TO statistics')
+    assert db.flush_statistics() == 1
+    assert db.get_statistics(['solutions_submitted']) == {'solutions_submitted': 2}
+
+
+def test_activity_flush_never_moves_last_active_back(db):
+    player_id = db.create_player('active', 'active@example.com', 'hw-active')
+    with db.get_connection() as conn:
+        conn.execute('UPDATE players SET last_active = ? WHERE id = ?', (2_000_000_000, player_id))
+    db.update_player_last_active(player_id)
+    assert db.flush_activity() == 1
+    assert db.get_player(player_id)['last_active'] == 2_000_000_000
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# chimera-vx/server/timer_wheel.py
+# Hierarchical timer wheel for Chimera-VX session expiry
+#
+# Level 0 has one slot per tick for the current block of SLOTS ticks, level 1
+# one slot per block of SLOTS ticks, and so on. A deadline sits on the lowest
+# level whose enclosing block it shares with the current tick; when the clock
+# enters a block, that block's slot cascades one level down. Scheduling and
+# firing are O(1) per key; keys further out than the top level wait in an
+# overflow set that is re-examined at each top-level rollover.
+
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TimerWheel:
+    """Keys scheduled to expire at a deadline, collected in tick order by advance()"""
+
+    SLOTS = 64   # Slots per level (a power of two)
+    LEVELS = 4   # 64**4 one-second ticks is about 194 days
+
+    def __init__(self, tick: float = 1.0, now: float = None):
+        self.tick = tick
+        self.bits = self.SLOTS.bit_length() - 1
+        self.current = self._tick_of(time.time() if now is None else now)  # Next tick to fire
+        self.wheels: List[List[Set[Hashable]]] = [
+            [set() for _ in range(self.SLOTS)] for _ in range(self.LEVELS)
+        ]
+        self.overflow: Set[Hashable] = set()
+
+        # key -> deadline tick; cancelled or rescheduled keys are dropped
+        # lazily when their old slot comes up
+        self.deadlines: Dict[Hashable, int] = {}
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.loaded = False
+
+        # Statistics
+        self.stats = {
+            'scheduled': 0,
+            'fired': 0,
+            'cascaded': 0
+        }
+
+    def _tick_of(self, timestamp: float) -> int:
+        return math.ceil(timestamp / self.tick)
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[Tuple[Hashable, float]]]):
+        """Schedule existing (key, deadline) rows on first use"""
+        if self.loaded:
+            return
+        with self.build_lock:
+            if not self.loaded:
+                rows = loader()
+                with self.lock:
+                    for key, deadline in rows:
+                        self._schedule(key, self._tick_of(deadline))
+                self.loaded = True
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Expire key at deadline (a timestamp), replacing any earlier schedule
+        
+        A deadline that has already passed fires on the next tick.
+        """
+        with self.lock:
+            self._schedule(key, self._tick_of(deadline))
+
+    def cancel(self, key: Hashable):
+        with self.lock:
+            self.deadlines.pop(key, None)
+
+    def _schedule(self, key: Hashable, deadline: int):
+        self.deadlines[key] = deadline
+        self._place(key, max(deadline, self.current))
+        self.stats['scheduled'] += 1
+
+    def _place(self, key: Hashable, deadline: int):
+        for level in range(self.LEVELS):
+            shift = self.bits * (level + 1)
+            if deadline >> shift == self.current >> shift:
+                slot = (deadline >> (self.bits * level)) & (self.SLOTS - 1)
+                self.wheels[level][slot].add(key)
+                return
+        self.overflow.add(key)
+
+    def advance(self, now: float = None) -> List[Hashable]:
+        """Fire every tick up to now; returns the keys that expired"""
+        target = self._tick_of(time.time() if now is None else now)
+        expired: List[Hashable] = []
+        with self.lock:
+            if not self.deadlines:
+                self.current = max(self.current, target + 1)
+                self._clear_stale()
+                return expired
+            while self.current <= target:
+                self._cascade()
+                slot = self.wheels[0][self.current & (self.SLOTS - 1)]
+                for key in slot:
+                    deadline = self.deadlines.get(key)
+                    if deadline is not None and deadline <= self.current:
+                        del self.deadlines[key]
+                        expired.append(key)
+                slot.clear()
+                self.current += 1
+            self.stats['fired'] += len(expired)
+        return expired
+
+    def _cascade(self):
+        """Move the slots of blocks the current tick just entered one level down"""
+        mask = self.SLOTS - 1
+        if self.current & ((1 << (self.bits * self.LEVELS)) - 1) == 0:
+            keys, self.overflow = self.overflow, set()
+            self._replace(keys)
+        for level in range(self.LEVELS - 1, 0, -1):
+            if self.current & ((1 << (self.bits * level)) - 1) == 0:
+                slot = self.wheels[level][(self.current >> (self.bits * level)) & mask]
+                keys = set(slot)
+                slot.clear()
+                self._replace(keys)
+
+    def _replace(self, keys: Iterable[Hashable]):
+        for key in keys:
+            deadline = self.deadlines.get(key)
+            if deadline is not None:
+                self._place(key, max(deadline, self.current))
+                self.stats['cascaded'] += 1
+
+    def _clear_stale(self):
+        """Nothing is scheduled: drop leftovers of cancelled keys"""
+        for wheel in self.wheels:
+            for slot in wheel:
+                slot.clear()
+        self.overflow.clear()
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
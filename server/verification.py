@@ -884,4 +884,3 @@ measure q -> c;'''
         print(f"Verification data: {json.dumps(data, indent=2)}")
     
     asyncio.run(test())
-```
\ No newline at end of file
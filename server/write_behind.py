@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# chimera-vx/server/write_behind.py
+# Coalescing write-behind buffer for high-frequency, last-value-wins updates
+
+import threading
+from typing import Any, Dict, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CoalescingBuffer:
+    """Thread-safe map of pending updates keeping only the latest value per key"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pending: Dict[Hashable, Any] = {}
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.stats = {
+            'updates': 0,
+            'flushed': 0
+        }
+
+    def put(self, key: Hashable, value: Any):
+        """Record an update, replacing any pending value for key"""
+        with self.lock:
+            self.pending[key] = value
+            self.stats['updates'] += 1
+
+    def discard(self, key: Hashable):
+        """Drop a pending update (e.g. the row was deleted)"""
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def drain(self) -> Dict[Hashable, Any]:
+        """Take all pending updates"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.stats['flushed'] += len(pending)
+            return pending
+
+    def restore(self, pending: Dict[Hashable, Any]):
+        """Put back drained updates after a failed flush without clobbering newer ones"""
+        with self.lock:
+            for key, value in pending.items():
+                self.pending.setdefault(key, value)
+            self.stats['flushed'] -= len(pending)
+        logger.warning(f"Restored {len(pending)} unflushed {self.name} updates")
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+
+class CounterBuffer:
+    """Thread-safe additive counters whose deltas are flushed in batches
+
+    Drained deltas stay in flight, and still count in peek(), until the
+    flush calls committed() or restore(). A flush holds flush_lock from
+    drain to committed so that readers holding it see each delta exactly
+    once, either in the database or in the buffer.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pending: Dict[Hashable, int] = {}
+        self.in_flight: Dict[Hashable, int] = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+    def add(self, key: Hashable, amount: int = 1):
+        """Add amount to a counter"""
+        with self.lock:
+            self.pending[key] = self.pending.get(key, 0) + amount
+
+    def peek(self, key: Hashable) -> int:
+        """Unflushed delta for a counter, including one being flushed"""
+        with self.lock:
+            return self.pending.get(key, 0) + self.in_flight.get(key, 0)
+
+    def drain(self) -> Dict[Hashable, int]:
+        """Take all pending deltas for flushing"""
+        with self.lock:
+            for key, amount in self.pending.items():
+                self.in_flight[key] = self.in_flight.get(key, 0) + amount
+            self.pending = {}
+            return dict(self.in_flight)
+
+    def committed(self):
+        """Forget the in-flight deltas once their flush has committed"""
+        with self.lock:
+            self.in_flight = {}
+
+    def restore(self):
+        """Return the in-flight deltas to pending after a failed flush"""
+        with self.lock:
+            in_flight, self.in_flight = self.in_flight, {}
+            for key, amount in in_flight.items():
+                self.pending[key] = self.pending.get(key, 0) + amount
+        logger.warning(f"Restored {len(in_flight)} unflushed {self.name} counters")
+
+    def __len__(self) -> int:
+        return len(self.pending)